@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Benchmark: C1 image matching of scrape-tile-images.py
+======================================================
+Times the original extract_c1_images_from_html / filter_own_c1 /
+get_best_c1 chain against cesantoni_tools.c1match.C1Page on large
+WordPress-like pages (srcset variants, related products, galleries: hundreds
+of image URLs) for the lookups one product makes: its own name, the first
+word of the name (strategy D) and a name that is not on the page.
+
+Checks that both find the same set of URLs and pick the same one. When the
+old code has a tie between equal scores, its choice depends on set order, so
+there only "same score" is required.
+
+Uso:
+  python3 benchmarks/bench_c1match.py [--pages 50] [--images 400] [--repeat 5] [--fuzz 2000]
+"""
+
+import argparse
+import random
+import re
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cesantoni_tools.c1match import C1Page, name_tokens, score_c1
+
+UPLOADS = 'https://www.cesantoni.com.mx/wp-content/uploads/'
+SIZES = ['150x150', '300x300', '600x600', '768x768', '1024x1024', '1024x512']
+WORDS = ['CALACATTA', 'BLACK', 'SUNSET', 'MAPLE', 'LEGACY', 'WOOD', 'BIANCO', 'QUARTZ',
+         'CABO', 'NOBU', 'RIVIERA', 'PIATRA', 'ROMAGNI', 'FIORENTINO', 'MARE', 'LIVIA']
+
+
+# --- El código original de scrape-tile-images.py ---------------------------
+
+def legacy_extract(html):
+    pattern = r'https?://[^\s"\'<>]+?_C1[^\s"\'<>]*\.(?:jpg|jpeg|png|webp)'
+    matches = re.findall(pattern, html, re.IGNORECASE)
+    return list(set(matches))
+
+
+def legacy_filter(images, product_name):
+    name_upper = product_name.upper().strip()
+    name_underscore = name_upper.replace(" ", "_")
+    name_nospace = name_upper.replace(" ", "")
+    results = []
+    for img in images:
+        img_upper = img.upper()
+        if name_underscore in img_upper or name_nospace in img_upper:
+            results.append(img)
+    return results
+
+
+def legacy_best(images):
+    if not images:
+        return None
+    scored = []
+    for img in images:
+        score = 0
+        if re.search(r'_C1[^0-9]', img) or re.search(r'_C1\.(jpg|jpeg|png|webp)', img, re.IGNORECASE):
+            score += 100
+        elif re.search(r'_C1-', img):
+            score += 90
+        if re.search(r'-\d+x\d+\.', img):
+            score -= 50
+        cleaned = img.replace("https://", "").replace("http://", "")
+        if "//" not in cleaned:
+            score += 10
+        if img.lower().endswith('.jpg') or img.lower().endswith('.jpeg'):
+            score += 5
+        elif img.lower().endswith('.webp'):
+            score += 3
+        scored.append((score, img))
+    scored.sort(key=lambda x: -x[0])
+    return scored[0][1]
+
+
+def legacy_lookups(html, name):
+    all_c1 = legacy_extract(html)
+    own = legacy_best(legacy_filter(all_c1, name))
+    first_word = name.split()[0].upper()
+    partial = legacy_best([img for img in all_c1 if first_word in img.upper()])
+    missing = legacy_best(legacy_filter(all_c1, 'Producto Inexistente'))
+    return set(all_c1), own, partial, missing
+
+
+def new_lookups(html, name):
+    page = C1Page(html)
+    own = page.best(name_tokens(name))
+    partial = page.best((name.split()[0].upper(),))
+    missing = page.best(name_tokens('Producto Inexistente'))
+    return set(page), own, partial, missing
+
+
+# --- Páginas -----------------------------------------------------------------
+
+def image_url(rng, name, c1=True):
+    stem = name.replace(' ', rng.choice(['_', '_', '']))
+    if rng.random() < 0.3:
+        stem = f'{rng.choice(["PORCELANATO", "VXL_0024_LD", "RENDER"])}_{stem}_{rng.randint(20, 80)}X{rng.randint(60, 160)}CM'
+    marker = rng.choice(['_C1', '_C1', '_C1-1', '_C12', '_c1', '_C2', '_C3']) if c1 else '_SALA'
+    ext = rng.choice(['.jpg', '.jpg', '.png', '.webp', '.jpeg', '.JPG'])
+    size = f'-{rng.choice(SIZES)}' if rng.random() < 0.6 else ''
+    path = rng.choice(['', '', '2024/05/', '/2023/11/'])
+    return f'{UPLOADS}{path}{stem}{marker}{size}{ext}'
+
+
+def wordpress_page(rng, name, images):
+    """Página de producto con galería, srcset y productos relacionados"""
+    names = [name] + [' '.join(rng.sample(WORDS, rng.randint(1, 2))).title() for _ in range(12)]
+    parts = ['<!DOCTYPE html><html><head><title>', name, '</title>']
+    parts += [f'<link rel="preload" as="image" href="{image_url(rng, name)}">' for _ in range(3)]
+    parts.append('</head><body><nav>' + ''.join(f'<a href="/c/{i}">Categoría {i}</a>' for i in range(80)) + '</nav>')
+    for i in range(images):
+        product = rng.choice(names)
+        url = image_url(rng, product.upper(), c1=rng.random() < 0.5)
+        srcset = ', '.join(f'{url.rsplit(".", 1)[0]}-{size}.{url.rsplit(".", 1)[1]} {size.split("x")[0]}w'
+                           for size in rng.sample(SIZES, 3))
+        parts.append(f'<figure class="item-{i}"><img src="{url}" srcset="{srcset}" '
+                     f'data-large_image=\'{url}\' alt="{product}"><figcaption>{product} '
+                     f'{"lorem ipsum " * rng.randint(2, 20)}</figcaption></figure>\n')
+    parts.append('<script>var gallery = ["' + '","'.join(image_url(rng, name) for _ in range(20)) + '"];</script>')
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def fuzz_token(rng):
+    """Trozos de URL raros: varios esquemas, _C1 repetidos, extensiones encadenadas, no ASCII"""
+    pieces = ['http://', 'https://', 'HTTPS://', 'httpx', '_C1', '_c1', '_C12', '.jpg', '.JPEG',
+              '.png', '.webp', '.jpgx', '.', '/', 'ñ', 'é', 'a', 'B', '-300x300', '?v=1', '//', '_']
+    return ''.join(rng.choice(pieces) for _ in range(rng.randint(1, 12)))
+
+
+def fuzz(count, seed):
+    rng = random.Random(seed)
+    separators = [' ', '"', "'", '<', '>', '\n', '\t', ' ', ' ']
+    for _ in range(count):
+        html = ''.join(fuzz_token(rng) + rng.choice(separators) for _ in range(rng.randint(1, 8)))
+        want = legacy_extract(html)
+        got = list(C1Page(html))
+        if sorted(want) != sorted(got):
+            return html, want, got
+    return None
+
+
+def same_choice(old, new):
+    return old == new or (old is not None and new is not None and score_c1(old) == score_c1(new))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--images', type=int, default=400, help='Imágenes (con srcset) por página')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--fuzz', type=int, default=2000, help='Documentos aleatorios para comparar la extracción')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = []
+    for _ in range(args.pages):
+        name = ' '.join(rng.sample(WORDS, rng.randint(1, 2))).title()
+        pages.append((name, wordpress_page(rng, name, args.images)))
+    size = sum(len(html) for _, html in pages) / len(pages)
+
+    identical = ties = 0
+    for name, html in pages:
+        old, new = legacy_lookups(html, name), new_lookups(html, name)
+        if old[0] != new[0]:
+            print(f"  ❌ URLs distintas en la página de {name}")
+            sys.exit(1)
+        for a, b in zip(old[1:], new[1:]):
+            if a == b:
+                identical += 1
+            elif same_choice(a, b):
+                ties += 1
+            else:
+                print(f"  ❌ {name}: {a} != {b}")
+                sys.exit(1)
+
+    timings = {}
+    for label, fn in (('original', legacy_lookups), ('c1match', new_lookups)):
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for name, html in pages:
+                fn(html, name)
+            best = min(best, time.perf_counter() - start)
+        timings[label] = best / len(pages)
+
+    urls = sum(len(C1Page(html)) for _, html in pages) / len(pages)
+    print(f"{len(pages)} páginas, {size / 1024:.0f} KB y {urls:.0f} URLs C1 únicas de media, 3 búsquedas por página\n")
+    for label, seconds in timings.items():
+        print(f"  {label:<10} {seconds * 1000:8.2f} ms/página")
+    print(f"  speedup    {timings['original'] / timings['c1match']:8.1f}x")
+    print(f"\n  elecciones idénticas: {identical}, empates resueltos por orden en la página: {ties}")
+
+    bad = fuzz(args.fuzz, args.seed)
+    if bad:
+        html, want, got = bad
+        print(f"  ❌ extracción distinta en {html!r}: {want} vs {got}")
+        sys.exit(1)
+    print(f"  extracción idéntica en {args.fuzz} documentos aleatorios")
+
+
+if __name__ == '__main__':
+    main()
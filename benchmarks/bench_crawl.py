@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sequential vs concurrent crawl of scraper-cesantoni.py
+==================================================================
+Runs `scrape_product` over the real PRODUCT_URLS slugs, served by a local
+stub server with simulated latency, once sequentially and once with
+--concurrency N, and checks that both runs produce byte-identical JSON.
+
+Uso:
+  python3 benchmarks/bench_crawl.py [--latency 0.3] [--concurrency 8] [--rate 20]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cesantoni_tools.scripts import load_script
+from cesantoni_tools.stubserver import StubServer
+
+
+def run(scraper, urls, concurrency, rate):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        products, errors = scraper.scrape_all(urls, concurrency=concurrency, rate=rate)
+    elapsed = time.perf_counter() - start
+    output = json.dumps(products, ensure_ascii=False, indent=2)
+    return elapsed, output, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.3, help='Latencia simulada por petición (s)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=20.0, help='Peticiones por segundo por host')
+    parser.add_argument('--limit', type=int, default=None, help='Usar solo las primeras N URLs')
+    args = parser.parse_args()
+
+    scraper = load_script("scraper")
+    slugs = [scraper.extract_slug(u) for u in scraper.PRODUCT_URLS][:args.limit]
+
+    with StubServer(latency=args.latency) as server:
+        urls = [server.url(f"/producto/{slug}/") for slug in slugs]
+        seq_time, seq_out, seq_err = run(scraper, urls, 1, args.rate)
+        par_time, par_out, par_err = run(scraper, urls, args.concurrency, args.rate)
+
+    print(f"URLs: {len(urls)} | latencia simulada: {args.latency}s | rate: {args.rate} req/s")
+    print(f"  secuencial      : {seq_time:7.2f}s  ({len(seq_err)} errores)")
+    print(f"  concurrencia {args.concurrency:<2} : {par_time:7.2f}s  ({len(par_err)} errores)")
+    print(f"  speedup         : {seq_time / par_time:7.2f}x")
+    print(f"  salida idéntica : {'sí' if seq_out == par_out else 'NO'}")
+    if seq_out != par_out:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dimensions of C1 candidates by Range probe vs full download
+======================================================================
+Serves N synthetic JPEG/PNG/WebP "renders" of 0.5-4 MB (real headers,
+random filler; a fraction with a large EXIF block before the frame header)
+from the stub server with simulated latency, and reads their size twice:
+downloading each file whole, and with cesantoni_tools.imageprobe's
+DimensionProbe (first 16 KB with a Range request, concurrently). Checks
+that both give the same width x height and reports time and bytes.
+
+Uso:
+  python3 benchmarks/bench_dimensions.py [--images 60] [--latency 0.05] [--concurrency 6]
+"""
+
+import argparse
+import base64
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cesantoni_tools.fixtures import Cassette
+from cesantoni_tools.httpclient import HttpClient
+from cesantoni_tools.imageprobe import DimensionProbe, image_dimensions
+from cesantoni_tools.stubserver import StubServer
+
+UPLOADS = 'https://www.cesantoni.com.mx/wp-content/uploads/'
+
+
+def jpeg(rng, width, height, size):
+    exif = b''
+    if rng.random() < 0.2:
+        # EXIF de cámara/Photoshop: empuja el SOF más allá de los primeros 16 KB
+        exif = b'\xff\xe1' + struct.pack('>H', 60000) + os.urandom(59998)
+    app0 = b'\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+    sof = b'\xff\xc0\x00\x11\x08' + struct.pack('>HH', height, width) + b'\x03\x01\x22\x00\x02\x11\x01\x03\x11\x01'
+    head = b'\xff\xd8' + app0 + exif + sof + b'\xff\xda'
+    return head + os.urandom(max(0, size - len(head) - 2)) + b'\xff\xd9'
+
+
+def png(width, height, size):
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    head = (b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + ihdr
+            + struct.pack('>I', zlib.crc32(b'IHDR' + ihdr)))
+    return head + os.urandom(max(0, size - len(head)))
+
+
+def webp(width, height, size):
+    vp8x = b'VP8X' + struct.pack('<I', 10) + b'\x00\x00\x00\x00' \
+        + (width - 1).to_bytes(3, 'little') + (height - 1).to_bytes(3, 'little')
+    head = b'RIFF' + struct.pack('<I', size - 8) + b'WEBP' + vp8x
+    return head + os.urandom(max(0, size - len(head)))
+
+
+def synthetic_images(n, seed):
+    rng = random.Random(seed)
+    images = {}
+    for i in range(n):
+        width, height = rng.choice([(4096, 4096), (2400, 1200), (1024, 1024), (800, 1600)])
+        size = rng.randint(512 * 1024, 4 * 1024 * 1024)
+        kind = rng.choice(['jpg', 'jpg', 'jpg', 'png', 'webp'])
+        body = (jpeg(rng, width, height, size) if kind == 'jpg' else
+                png(width, height, size) if kind == 'png' else webp(width, height, size))
+        images[f'{UPLOADS}RENDER_{i:04d}_C1.{kind}'] = (body, (width, height))
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.05, help='Latencia simulada por petición (s)')
+    parser.add_argument('--concurrency', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    images = synthetic_images(args.images, args.seed)
+    cassette = Cassette({'method': 'GET', 'url': url, 'status': 200, 'headers': {'Content-Type': 'image/jpeg'},
+                         'body_b64': base64.b64encode(body).decode('ascii')}
+                        for url, (body, _) in images.items())
+
+    with StubServer(cassette=cassette, latency=args.latency) as server:
+        client = HttpClient(proxy=server.base_url)
+        start = time.perf_counter()
+        full = {}
+        received = 0
+        for url in images:
+            content = client.get(url).content
+            received += len(content)
+            full[url] = image_dimensions(content)[1:]
+        full_time = time.perf_counter() - start
+
+        client = HttpClient(proxy=server.base_url)
+        probe = DimensionProbe(client)
+        start = time.perf_counter()
+        infos = probe.probe_all(images, concurrency=args.concurrency)
+        probe_time = time.perf_counter() - start
+
+    wrong = [url for url, (_, dims) in images.items()
+             if infos[url] is None or (infos[url].width, infos[url].height) != dims or full[url] != dims]
+    sizes_ok = all(infos[url].size == len(body) for url, (body, _) in images.items() if infos[url])
+
+    print(f"{len(images)} imágenes, {received / 1024 / 1024:.0f} MB en total, latencia {args.latency}s\n")
+    print(f"  descarga completa   {full_time:7.2f}s  {received / 1024 / 1024:9.1f} MB")
+    print(f"  probe con Range     {probe_time:7.2f}s  {probe.bytes_read / 1024 / 1024:9.1f} MB  "
+          f"(concurrencia {args.concurrency})")
+    print(f"  speedup             {full_time / probe_time:7.1f}x")
+    print(f"\n  dimensiones correctas: {len(images) - len(wrong)}/{len(images)}, "
+          f"tamaño de archivo desde Content-Range: {'sí' if sizes_ok else 'NO'}")
+    if wrong or not sizes_ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sitemap-driven discovery (scraper-cesantoni.py --discover)
+======================================================================
+Serves a catalog through the stub server's sitemap index and runs the
+scraper with --discover several "nights" in a row against the same state
+file, checking from the stub's request count that each run fetches exactly
+what changed, and that --output still holds the whole catalog after it:
+
+  1. first run            -> every product is new
+  2. nothing changed      -> nothing queued, the product sitemap is not even read
+  3. --changed modified, --added new, --removed deleted
+                          -> only the modified and new products are scraped
+
+Uso:
+  python3 benchmarks/bench_discover.py [--products 1000] [--changed 5] [--added 3] [--removed 2]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cesantoni_tools.scripts import load_script
+from cesantoni_tools.stubserver import StubServer
+
+
+def night(scraper, server, tmp, label):
+    """(productos scrapeados, peticiones al stub, slugs en el catálogo de --output)"""
+    before = server.requests
+    out = os.path.join(tmp, 'productos.json')
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        scraper.main(['--discover', server.url('/sitemap_index.xml'), '--rate', '1000',
+                      '--concurrency', '8', '--output', out,
+                      '--cache', os.path.join(tmp, 'pages.sqlite'),
+                      '--sitemap-state', os.path.join(tmp, 'sitemap.sqlite'),
+                      '--checkpoint', os.path.join(tmp, 'checkpoint.jsonl')])
+    elapsed = time.perf_counter() - start
+    requests = server.requests - before
+    with open(os.path.join(tmp, 'productos.metrics.json'), encoding='utf-8') as f:
+        scraped = json.load(f)['counters'].get('products', 0)
+    with open(out, encoding='utf-8') as f:
+        catalog = sorted(p['slug'] for p in json.load(f))
+    print(f"  {label:<34} {scraped:>10} {requests:>10} {len(catalog):>9} {elapsed:>8.2f}s")
+    return scraped, requests, catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--changed', type=int, default=5)
+    parser.add_argument('--added', type=int, default=3)
+    parser.add_argument('--removed', type=int, default=2)
+    args = parser.parse_args()
+
+    scraper = load_script('scraper')
+    tmp = tempfile.mkdtemp(prefix='bench-discover-')
+    catalog = {f'producto-{i:05d}': '2025-01-01T00:00:00+00:00' for i in range(args.products)}
+
+    print(f"{args.products} productos en el sitemap\n")
+    print(f"  {'corrida':<34} {'scrapeados':>10} {'peticiones':>10} {'catálogo':>9} {'tiempo':>9}")
+    ok = True
+    with StubServer(catalog=catalog) as server:
+        # Índice + sitemap de productos + una página por producto
+        first = night(scraper, server, tmp, 'primera (todo nuevo)')
+        ok &= first == (len(catalog), len(catalog) + 2, sorted(catalog))
+
+        # Solo el índice: el sitemap de productos no cambió
+        second = night(scraper, server, tmp, 'sin cambios')
+        ok &= second == (0, 1, sorted(catalog))
+
+        slugs = list(catalog)
+        changed = slugs[:args.changed]
+        for slug in changed:
+            catalog[slug] = '2025-02-01T00:00:00+00:00'
+        for slug in slugs[-args.removed:] if args.removed else []:
+            del catalog[slug]
+        added = [f'nuevo-{i:03d}' for i in range(args.added)]
+        for slug in added:
+            catalog[slug] = '2025-02-01T00:00:00+00:00'
+        label = f'{args.changed} modif., {args.added} nuevos, {args.removed} borrados'
+        third = night(scraper, server, tmp, label)
+        fetched = len(changed) + len(added)
+        ok &= third == (fetched, fetched + 2, sorted(catalog))
+
+    print(f"\n  solo lo que cambió: {'sí' if ok else 'NO'}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
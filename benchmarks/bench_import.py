@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark: UPSERT import vs the old row-by-row loop of import-products.py
+==========================================================================
+Builds a temporary database with the products schema of data/cesantoni.db,
+seeds half of a synthetic catalog as existing rows and imports the full
+catalog in merge mode: once with the old SELECT-per-row loop (only for
+sizes up to --legacy-max, it is quadratic without an index on slug) and
+once with `ensure_schema` + `bulk_import`. Both must leave the same rows
+behind.
+
+Uso:
+  python3 benchmarks/bench_import.py [--sizes 1000,10000,100000]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cesantoni_tools.scripts import ROOT, load_script
+
+SOURCE_DB = os.path.join(ROOT, 'data', 'cesantoni.db')
+FORMATS = ['20 x 120 cm', '60 x 60 cm', '60 x 120 cm', '15 x 90 cm', None]
+FINISHES = ['Mate', 'Pulido', 'Satinado', None]
+
+# SQL del importador original, para el bucle de referencia
+LEGACY_UPDATE_SQL = """
+    UPDATE products SET
+        name = ?, url = ?, image_url = ?,
+        category = COALESCE(?, category), format = COALESCE(?, format),
+        finish = COALESCE(?, finish), type = COALESCE(?, type), usage = COALESCE(?, usage),
+        pieces_per_box = COALESCE(?, pieces_per_box), sqm_per_box = COALESCE(?, sqm_per_box),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id = ?
+"""
+LEGACY_INSERT_SQL = """
+    INSERT INTO products (sku, slug, name, url, image_url, category, format, finish, type, usage, pieces_per_box, sqm_per_box, base_price, active)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+"""
+
+
+def synthetic_catalog(n, seed=42):
+    """n productos con la forma de productos_cesantoni.json"""
+    rng = random.Random(seed)
+    products = []
+    for i in range(n):
+        slug = f'producto-{i:06d}'
+        products.append({
+            'slug': slug,
+            'url': f'https://www.cesantoni.com.mx/producto/{slug}/',
+            'name': f'Producto {i:06d}',
+            'sku': f'CES-P{i:06d}' if rng.random() < 0.9 else None,
+            'category': None,
+            'format': rng.choice(FORMATS),
+            'finish': rng.choice(FINISHES),
+            'type': 'Porcelanato',
+            'usage': None,
+            'pieces_per_box': rng.choice([4, 6, 8, None]),
+            'sqm_per_box': rng.choice([1.44, 1.08, None]),
+            'image_url': f'https://www.cesantoni.com.mx/wp-content/uploads/{slug}.jpg',
+            'images': [],
+            'specs': {},
+        })
+    return products
+
+
+def make_db(path, seed_products):
+    """DB vacía con el esquema real de products, sembrada con `seed_products`"""
+    with sqlite3.connect(SOURCE_DB) as src:
+        schema = src.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'products'").fetchone()[0]
+    conn = sqlite3.connect(path)
+    conn.execute(schema)
+    conn.executemany(LEGACY_INSERT_SQL, [
+        (f"CES-{p['slug'].upper()}" if p['sku'] is None else p['sku'], p['slug'], p['name'], None,
+         None, 'Pisos', None, None, None, None, None, None, 450.0)
+        for p in seed_products
+    ])
+    conn.commit()
+    return conn
+
+
+def legacy_import(conn, products):
+    """El bucle original: SELECT ... WHERE sku = ? OR slug = ? y UPDATE/INSERT por fila"""
+    cursor = conn.cursor()
+    for p in products:
+        sku = p.get('sku') or f"CES-{p['slug'].upper()}"
+        name = p.get('name') or p['slug'].replace('-', ' ').title()
+        cursor.execute("SELECT id FROM products WHERE sku = ? OR slug = ?", (sku, p['slug']))
+        existing = cursor.fetchone()
+        fields = (p.get('url'), p.get('image_url'))
+        merged = (p.get('format'), p.get('finish'), p.get('type'), p.get('usage'),
+                  p.get('pieces_per_box'), p.get('sqm_per_box'))
+        if existing:
+            cursor.execute(LEGACY_UPDATE_SQL,
+                           (name,) + fields + (p.get('category'),) + merged + (existing[0],))
+        else:
+            cursor.execute(LEGACY_INSERT_SQL,
+                           (sku, p['slug'], name) + fields + (p.get('category') or 'Pisos',)
+                           + merged + (450.00,))
+    conn.commit()
+
+
+def snapshot(conn):
+    return conn.execute(
+        "SELECT sku, slug, name, url, image_url, category, format, finish, type, usage, "
+        "pieces_per_box, sqm_per_box FROM products ORDER BY sku").fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--legacy-max', type=int, default=10000,
+                        help='Tamaño máximo para correr el bucle original')
+    args = parser.parse_args()
+
+    importer = load_script('importer')
+    tmp = tempfile.mkdtemp(prefix='bench-import-')
+
+    print(f"{'productos':>10} {'fila por fila':>14} {'upsert':>10} {'filas/s':>14}  iguales")
+    for n in [int(x) for x in args.sizes.split(',')]:
+        products = synthetic_catalog(n)
+        seed = products[::2]
+
+        legacy_time = legacy_rows = None
+        if n <= args.legacy_max:
+            conn = make_db(os.path.join(tmp, f'legacy-{n}.db'), seed)
+            start = time.perf_counter()
+            legacy_import(conn, products)
+            legacy_time = time.perf_counter() - start
+            legacy_rows = snapshot(conn)
+            conn.close()
+
+        conn = make_db(os.path.join(tmp, f'bulk-{n}.db'), seed)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            importer.ensure_schema(conn.cursor())
+            importer.bulk_import(conn, products, 'merge')
+        bulk_time = time.perf_counter() - start
+        bulk_rows = snapshot(conn)
+        conn.close()
+
+        same = '-' if legacy_rows is None else ('sí' if legacy_rows == bulk_rows else 'NO')
+        legacy = f'{legacy_time:.2f}s' if legacy_time is not None else 'omitido'
+        print(f"{n:>10} {legacy:>14} {bulk_time:>9.2f}s {n / bulk_time:>14,.0f}  {same}")
+        if same == 'NO':
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
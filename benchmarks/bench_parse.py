@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Benchmark: HTML extraction of scraper-cesantoni.py
+===================================================
+Times `extract_product` per page with each available parser backend against
+the original multi-scan BeautifulSoup extraction, reports peak Python heap
+per page (tracemalloc; lxml's own C tree is not counted) and checks that
+every backend extracts exactly the same product as the original.
+
+Páginas de muestra, en orden de preferencia:
+  --pages DIR   archivos *.html guardados (el slug se toma del nombre)
+  la caché de páginas (.cache/pages.sqlite) si existe y tiene productos
+  páginas sintéticas del stub server con variantes de marcado
+
+Uso:
+  python3 benchmarks/bench_parse.py [--pages DIR] [--limit 100] [--repeat 3]
+"""
+
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from cesantoni_tools import pagecache
+from cesantoni_tools.scripts import load_script
+from cesantoni_tools.stubserver import product_page
+
+BASE = 'https://www.cesantoni.com.mx'
+
+# Cabecera/menú típicos de una página WordPress, para que el documento tenga el
+# tamaño y la forma de una página real y no sólo la ficha del producto
+CHROME = """<header class="site-header"><div class="logo"><img src="/logo.svg"></div>
+<nav class="menu">{links}</nav></header>
+<div class="elementor-widget-image"><img src="{base}/wp-content/uploads/banner-{slug}.jpg"></div>
+"""
+
+
+def legacy_extract(html, url):
+    """La extracción original de scrape_product (html.parser, un recorrido por selector)"""
+    soup = BeautifulSoup(html, 'html.parser')
+    product = {
+        'slug': url.rstrip('/').split('/')[-1],
+        'url': url, 'name': None, 'sku': None, 'category': None, 'format': None,
+        'finish': None, 'type': None, 'usage': None, 'pieces_per_box': None,
+        'sqm_per_box': None, 'image_url': None, 'images': [], 'specs': {}
+    }
+    h1 = soup.find('h1')
+    if h1:
+        product['name'] = h1.text.strip()
+    for selector in ['img.wp-post-image', '.product-image img', '.woocommerce-product-gallery img',
+                     'img[src*="producto"]', 'img[src*="cesantoni"]', '.elementor-widget-image img',
+                     'figure img']:
+        img = soup.select_one(selector)
+        if img:
+            src = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
+            if src and ('cesantoni' in src or 'wp-content' in src):
+                product['image_url'] = src
+                break
+    for img in soup.find_all('img'):
+        src = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
+        if src and ('cesantoni' in src or 'wp-content' in src) and 'producto' in src.lower():
+            if src not in product['images']:
+                product['images'].append(src)
+    for table in soup.find_all('table'):
+        for row in table.find_all('tr'):
+            cells = row.find_all(['td', 'th'])
+            if len(cells) >= 2:
+                key = cells[0].text.strip().lower()
+                value = cells[1].text.strip()
+                product['specs'][key] = value
+                if 'formato' in key or 'size' in key:
+                    product['format'] = value
+                elif 'sku' in key or 'código' in key or 'codigo' in key:
+                    product['sku'] = value
+                elif 'acabado' in key or 'finish' in key:
+                    product['finish'] = value
+                elif 'tipo' in key or 'type' in key:
+                    product['type'] = value
+                elif 'uso' in key or 'usage' in key:
+                    product['usage'] = value
+                elif 'piezas' in key:
+                    try:
+                        product['pieces_per_box'] = int(re.search(r'\d+', value).group())
+                    except:
+                        pass
+                elif 'm2' in key or 'm²' in key or 'metros' in key:
+                    try:
+                        product['sqm_per_box'] = float(re.search(r'[\d.]+', value).group())
+                    except:
+                        pass
+    spec_divs = soup.find_all(['div', 'ul', 'dl'], class_=lambda x: x and (
+        'spec' in str(x).lower() or 'detail' in str(x).lower() or 'caracteristica' in str(x).lower()))
+    for div in spec_divs:
+        for line in div.get_text(separator='\n').split('\n'):
+            line = line.strip()
+            if ':' in line:
+                key, value = line.split(':', 1)
+                key, value = key.strip().lower(), value.strip()
+                if key and value:
+                    product['specs'][key] = value
+    if not product['sku'] and product['name']:
+        product['sku'] = f"CES-{product['name'].upper().replace(' ', '-')[:15]}"
+    return product
+
+
+def synthetic_pages(slugs):
+    """Páginas del stub con variantes que ejercitan el orden de los selectores"""
+    links = ''.join(f'<a class="menu-item" href="/cat/{i}/">Categoría {i}</a>' for i in range(300))
+    pages = []
+    for i, slug in enumerate(slugs):
+        html = product_page(slug, BASE)
+        if i % 3 == 1:
+            # Sin imagen destacada: gana la galería / el src con "producto"
+            html = html.replace('class="wp-post-image" ', '')
+        elif i % 3 == 2:
+            # Imágenes lazy dentro de <figure>, tabla con SKU
+            html = html.replace('<img src=', '<figure><img data-src=').replace('.jpg">', '.jpg"></figure>', 2)
+            html = html.replace('<table>', '<table><tr><th>Código</th><td>CES-%05d</td></tr>' % i)
+        chrome = CHROME.format(links=links, base=BASE, slug=slug)
+        html = html.replace('<body>', '<body>' + chrome, 1)
+        pages.append((f'{BASE}/producto/{slug}/', html))
+    return pages
+
+
+def cached_pages(path, limit):
+    if not os.path.exists(path):
+        return []
+    db = sqlite3.connect(path)
+    try:
+        rows = db.execute("SELECT url, body FROM pages WHERE url LIKE '%/producto/%' LIMIT ?",
+                          (limit,)).fetchall()
+    finally:
+        db.close()
+    return [(url, body.decode('utf-8', 'replace')) for url, body in rows]
+
+
+def file_pages(directory, limit):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.html')))[:limit]:
+        slug = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding='utf-8', errors='replace') as f:
+            pages.append((f'{BASE}/producto/{slug}/', f.read()))
+    return pages
+
+
+def measure(extract, pages, repeat):
+    """(ms por página, pico de memoria en KB, productos extraídos)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        products = [extract(html, url) for url, html in pages]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    peak = 0
+    for url, html in pages[:20]:
+        tracemalloc.start()
+        extract(html, url)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return best * 1000 / len(pages), peak / 1024, products
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', help='Directorio con páginas *.html guardadas')
+    parser.add_argument('--limit', type=int, default=100, help='Máximo de páginas')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones (se toma la mejor)')
+    args = parser.parse_args()
+
+    scraper = load_script('scraper')
+
+    if args.pages:
+        pages, source = file_pages(args.pages, args.limit), args.pages
+    else:
+        pages, source = cached_pages(pagecache.DEFAULT_PATH, args.limit), 'caché de páginas'
+        if not pages:
+            slugs = [scraper.extract_slug(u) for u in scraper.PRODUCT_URLS][:args.limit]
+            pages, source = synthetic_pages(slugs), 'stub sintético'
+    if not pages:
+        sys.exit('No hay páginas para medir')
+    size = sum(len(html) for _, html in pages) / len(pages) / 1024
+    print(f"{len(pages)} páginas ({source}), {size:.0f} KB de media\n")
+
+    backends = ['html.parser']
+    if scraper.have_lxml():
+        backends.insert(0, 'lxml')
+
+    legacy_ms, legacy_kb, reference = measure(legacy_extract, pages, args.repeat)
+    print(f"{'extracción':<26} {'ms/página':>10} {'pico KB':>9} {'speedup':>8}  idéntico")
+    print(f"{'original (html.parser)':<26} {legacy_ms:>10.2f} {legacy_kb:>9.0f} {'1.0x':>8}  -")
+
+    failed = False
+    for backend in backends:
+        ms, kb, products = measure(
+            lambda html, url: scraper.extract_product(html, url, parser=backend), pages, args.repeat)
+        same = sum(a == b for a, b in zip(products, reference))
+        failed = failed or same != len(pages)
+        label = f'una pasada ({backend})'
+        print(f"{label:<26} {ms:>10.2f} {kb:>9.0f} {legacy_ms / ms:>7.1f}x  {same}/{len(pages)}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
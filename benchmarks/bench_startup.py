@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark: startup time of the cesantoni-tools CLI and the scripts
+==================================================================
+Runs `python3 -m cesantoni_tools [COMMAND] --help` and the same scripts
+called directly, --repeat times each in a fresh interpreter, and reports the
+median wall time. One extra run per case with `python3 -X importtime` gives
+the import time split into the interpreter's own startup (`site`, the same
+for any Python program) and the rest, the slowest top-level imports, and
+the heavy modules that were loaded: none of bs4, lxml, PIL, asyncio or
+multiprocessing is needed to print a --help, and the run fails if one is.
+
+--budget MS also fails when a case spends more than MS milliseconds in
+imports outside `site`, so it can gate changes in CI.
+
+Uso:
+  python3 benchmarks/bench_startup.py [--repeat 10] [--top 3] [--budget 150]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ('python3 -c pass', ['-c', 'pass']),
+    ('cesantoni-tools --help', ['-m', 'cesantoni_tools', '--help']),
+    ('cesantoni-tools scrape --help', ['-m', 'cesantoni_tools', 'scrape', '--help']),
+    ('cesantoni-tools tiles --help', ['-m', 'cesantoni_tools', 'tiles', '--help']),
+    ('cesantoni-tools import --help', ['-m', 'cesantoni_tools', 'import', '--help']),
+    ('cesantoni-tools mirror --help', ['-m', 'cesantoni_tools', 'mirror', '--help']),
+    ('scraper-cesantoni.py --help', ['scraper-cesantoni.py', '--help']),
+    ('scrape-tile-images.py --help', ['scripts/scrape-tile-images.py', '--help']),
+]
+
+# Cargados solo al trabajar de verdad (parseo, imágenes, etapas, procesos)
+HEAVY = ('bs4', 'lxml', 'PIL', 'asyncio', 'multiprocessing')
+
+
+def run_once(argv, importtime=False):
+    """(segundos, stderr) de una corrida en un intérprete nuevo"""
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + argv
+    start = time.perf_counter()
+    done = subprocess.run(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                          text=True, check=True)
+    return time.perf_counter() - start, done.stderr
+
+
+def parse_importtime(stderr):
+    """{módulo de primer nivel: microsegundos acumulados} y todos los módulos importados"""
+    top = {}
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        modules.add(name.strip())
+        # La sangría marca la profundidad: sin sangría extra es un import de primer nivel
+        if not name[1:].startswith(' '):
+            top[name.strip()] = int(cumulative)
+    return top, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10, help='Corridas por caso (se toma la mediana)')
+    parser.add_argument('--top', type=int, default=3, help='Imports más lentos a mostrar por caso')
+    parser.add_argument('--budget', type=float, default=None,
+                        help='Fallar si un caso pasa más de estos ms en imports fuera de site')
+    args = parser.parse_args()
+
+    print(f"Python {sys.version.split()[0]}, mediana de {args.repeat} corridas\n")
+    print(f"  {'caso':<32} {'tiempo':>9} {'imports':>9} {'site':>7} {'propios':>8}  más lentos")
+    problems = []
+    for name, argv in CASES:
+        times = [run_once(argv)[0] for _ in range(args.repeat)]
+        top, modules = parse_importtime(run_once(argv, importtime=True)[1])
+        total = sum(top.values()) / 1000
+        site = top.get('site', 0) / 1000
+        slowest = sorted(((us, mod) for mod, us in top.items() if mod != 'site'), reverse=True)[:args.top]
+        print(f"  {name:<32} {statistics.median(times) * 1000:>7.1f}ms {total:>7.1f}ms {site:>5.1f}ms "
+              f"{total - site:>6.1f}ms  " + ', '.join(f"{mod} {us / 1000:.1f}" for us, mod in slowest))
+        heavy = sorted(mod for mod in modules if mod.split('.')[0] in HEAVY and '.' not in mod)
+        if heavy and name.startswith('cesantoni-tools'):
+            problems.append(f"{name}: carga {', '.join(heavy)}")
+        if args.budget is not None and name.startswith('cesantoni-tools') and total - site > args.budget:
+            problems.append(f"{name}: {total - site:.1f}ms en imports (límite {args.budget:g}ms)")
+
+    print()
+    if problems:
+        for problem in problems:
+            print(f"  ✗ {problem}")
+        sys.exit(1)
+    print(f"  Ningún --help de cesantoni-tools carga {', '.join(HEAVY)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: end-to-end runs of the three scripts, fully offline
+=====================================================================
+For each catalog size, starts the stub server (cesantoni_tools.stubserver)
+and runs the real scripts against it through --proxy, so their URLs and code
+paths are the production ones:
+
+  scrape   scraper-cesantoni.py --discover --stream over a sitemap of N products
+  import   import-products.py --mode merge of that stream into a fresh DB
+           (half of the catalog already present)
+  tiles    scrape-tile-images.py over an API of N products, 1% missing C1
+  replay   scraper-cesantoni.py against a recorded cassette (--cassette)
+
+and reports wall time, requests issued and throughput. The stub's latency,
+jitter and injected errors (--latency, --jitter, --errors, --seed) apply to
+every run. End-to-end scraping is limited to sizes up to --scrape-max; larger
+sizes import a synthetic stream of the same shape instead.
+
+--save FILE writes the results; --baseline FILE compares against a saved run
+and exits 1 when a time got more than --tolerance slower or a run issued
+more requests than before, so it can gate changes in CI without network.
+
+The same scrape/import/tiles scenarios run under pytest as
+tests/test_benchmarks.py (n=100 by default, timed by pytest-benchmark when
+it is installed), with --bench-sizes, --bench-save, --bench-baseline and
+--bench-tolerance playing the same roles.
+
+Uso:
+  python3 benchmarks/suite.py [--sizes 100,10000,100000] [--scrape-max 10000]
+  python3 benchmarks/suite.py --sizes 100,1000 --save base.json
+  python3 benchmarks/suite.py --sizes 100,1000 --baseline base.json --tolerance 0.25
+  python3 benchmarks/suite.py --cassette fixtures/site.jsonl
+  python3 -m pytest tests --bench-sizes 100,1000 --bench-baseline base.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_import import make_db, synthetic_catalog
+from cesantoni_tools.fixtures import Cassette
+from cesantoni_tools.jsonl import JsonlWriter
+from cesantoni_tools.scripts import load_script
+from cesantoni_tools.stubserver import StubServer
+
+SITE = 'https://www.cesantoni.com.mx'
+
+
+def stub(args, **kwargs):
+    return StubServer(latency=args.latency, jitter=args.jitter, errors=args.errors,
+                      seed=args.seed, **kwargs)
+
+
+def timed(fn, *fn_args):
+    """Run fn with its output silenced; returns the seconds it took."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            fn(*fn_args)
+        except SystemExit:
+            pass
+    return time.perf_counter() - start
+
+
+def scrape(args, tmp, n):
+    scraper = load_script('scraper')
+    catalog = {f'producto-{i:06d}': '2025-01-01T00:00:00+00:00' for i in range(n)}
+    out = os.path.join(tmp, f'productos-{n}.json')
+    with stub(args, catalog=catalog) as server:
+        seconds = timed(scraper.main, [
+            '--proxy', server.base_url, '--discover', f'{SITE}/sitemap_index.xml',
+            '--no-cache', '--stream', '--output', out,
+            '--rate', str(args.rate), '--concurrency', str(args.concurrency),
+            '--parse-workers', str(args.parse_workers),
+            '--sitemap-state', os.path.join(tmp, f'sitemap-{n}.sqlite'),
+            '--checkpoint', os.path.join(tmp, f'checkpoint-{n}.jsonl')])
+        requests = server.requests
+    with open(os.path.splitext(out)[0] + '.metrics.json', encoding='utf-8') as f:
+        items = json.load(f)['counters'].get('products', 0)
+    return {'seconds': seconds, 'requests': requests, 'items': items,
+            'stream': os.path.splitext(out)[0] + '.jsonl'}
+
+
+def synthetic_stream(tmp, n):
+    path = os.path.join(tmp, f'synthetic-{n}.jsonl')
+    with JsonlWriter(path, fsync_every=10 ** 9) as writer:
+        for product in synthetic_catalog(n):
+            writer.write(product)
+    return path
+
+
+def import_stream(tmp, n, stream):
+    importer = load_script('importer')
+    db = os.path.join(tmp, f'import-{n}.db')
+    with open(stream, encoding='utf-8') as f:
+        seed = [json.loads(line) for _, line in zip(range(n // 2), f)]
+    make_db(db, seed).close()
+    seconds = timed(importer.main, ['--mode', 'merge', '--db', db, '--json', stream])
+    return {'seconds': seconds, 'requests': 0, 'items': n}
+
+
+def api_products(n):
+    """Render API records: one in a hundred has no C1 image in its gallery."""
+    products = []
+    for i in range(n):
+        slug = f'producto-{i:06d}'
+        name = slug.replace('-', ' ').title()
+        gallery = [] if i % 100 == 0 else [f'{SITE}/wp-content/uploads/{slug}_C1.jpg']
+        products.append({'id': i + 1, 'name': name, 'slug': slug, 'format': '60x60',
+                         'gallery': json.dumps(gallery)})
+    return products
+
+
+def tiles(args, tmp, n):
+    script = load_script('tiles')
+    products = api_products(n)
+    out = os.path.join(tmp, f'tiles-{n}.json')
+    with stub(args, products=products) as server:
+        seconds = timed(script.main, [
+            '--proxy', server.base_url, '--no-cache', '--delay', '0', '--output', out,
+            '--rate', str(args.rate), '--concurrency', str(args.concurrency),
+            '--checkpoint', os.path.join(tmp, f'tiles-checkpoint-{n}.jsonl')])
+        requests = server.requests
+    with open(out, encoding='utf-8') as f:
+        found = len(json.load(f))
+    return {'seconds': seconds, 'requests': requests, 'items': found}
+
+
+def replay(args, tmp):
+    scraper = load_script('scraper')
+    cassette = Cassette.load(args.cassette)
+    out = os.path.join(tmp, 'replay.json')
+    with stub(args, cassette=cassette) as server:
+        seconds = timed(scraper.main, [
+            '--proxy', server.base_url, '--no-cache', '--output', out,
+            '--rate', str(args.rate), '--concurrency', str(args.concurrency),
+            '--checkpoint', os.path.join(tmp, 'replay-checkpoint.jsonl')])
+        requests, misses = server.requests, server.misses
+    with open(out, encoding='utf-8') as f:
+        items = len(json.load(f))
+    return {'seconds': seconds, 'requests': requests, 'items': items, 'misses': misses}
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of `results` against `baseline`, as printable lines."""
+    problems = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['seconds'] > before['seconds'] * (1 + tolerance):
+            problems.append(f"{name}: {result['seconds']:.2f}s vs {before['seconds']:.2f}s")
+        if result['requests'] > before['requests']:
+            problems.append(f"{name}: {result['requests']} requests vs {before['requests']}")
+        if result['items'] < before['items']:
+            problems.append(f"{name}: {result['items']} items vs {before['items']}")
+    return problems
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='100,10000,100000')
+    parser.add_argument('--scrape-max', type=int, default=10000,
+                        help='Tamaño máximo para scrapear de punta a punta (los mayores importan un stream sintético)')
+    parser.add_argument('--only', default='scrape,import,tiles',
+                        help='Escenarios a correr (default: scrape,import,tiles)')
+    parser.add_argument('--cassette', default=None, help='Cassette grabado con --record para el escenario replay')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latencia del stub por petición (s)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Latencia extra aleatoria hasta este valor (s)')
+    parser.add_argument('--errors', type=float, default=0.0, help='Fracción de peticiones con 503 inyectado')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--rate', type=float, default=10000.0, help='Peticiones por segundo por host')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='Procesos de extracción del scraper (default: 0, en los hilos de descarga)')
+    parser.add_argument('--save', default=None, help='Guardar los resultados en este JSON')
+    parser.add_argument('--baseline', default=None, help='Comparar contra resultados guardados con --save')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Lentitud permitida contra el baseline (default: 0.2 = 20%%)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    only = set(args.only.split(','))
+    tmp = tempfile.mkdtemp(prefix='bench-suite-')
+    results = {}
+
+    print(f"  {'escenario':<16} {'tiempo':>9} {'peticiones':>10} {'items':>8} {'items/s':>10}")
+
+    def report(name, result):
+        results[name] = {k: v for k, v in result.items() if k != 'stream'}
+        rate = result['items'] / result['seconds'] if result['seconds'] else 0.0
+        extra = f"  ({result['misses']} sin grabar)" if result.get('misses') else ''
+        print(f"  {name:<16} {result['seconds']:>8.2f}s {result['requests']:>10} "
+              f"{result['items']:>8} {rate:>10,.0f}{extra}")
+
+    for n in [int(x) for x in args.sizes.split(',')]:
+        stream = None
+        if 'scrape' in only and n <= args.scrape_max:
+            result = scrape(args, tmp, n)
+            stream = result['stream']
+            report(f'scrape/{n}', result)
+        if 'import' in only:
+            report(f'import/{n}', import_stream(tmp, n, stream or synthetic_stream(tmp, n)))
+        if 'tiles' in only:
+            report(f'tiles/{n}', tiles(args, tmp, n))
+    if args.cassette:
+        report('replay', replay(args, tmp))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n  resultados guardados en {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        if problems:
+            print("\n  REGRESIONES:")
+            for line in problems:
+                print(f"    {line}")
+            sys.exit(1)
+        print(f"\n  sin regresiones contra {args.baseline} (tolerancia {args.tolerance:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+"""
+Shared helpers for the Cesantoni Python tooling (scrapers and importer).
+
+The scripts themselves stay where they always were (scraper-cesantoni.py,
+import-products.py, scripts/scrape-tile-images.py); this package only holds
+the pieces they have in common, plus `python3 -m cesantoni_tools COMMAND`,
+a single entry point that runs them as subcommands (cli.py).
+"""
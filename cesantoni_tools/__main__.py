@@ -0,0 +1,7 @@
+"""python3 -m cesantoni_tools COMMAND ... (see cli.py)"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
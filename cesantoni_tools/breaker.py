@@ -0,0 +1,155 @@
+"""
+Per-host circuit breaker for the scrapers.
+
+When a host starts failing (timeouts, connection errors, 5xx/429), hammering
+it with the rest of the crawl only burns one full timeout per request. The
+breaker watches the outcome of the last `window` requests to each host; once
+at least `min_requests` have been seen and the failure rate reaches
+`threshold`, it trips open and every worker going to that host pauses for
+`cooldown` seconds. After the pause one trial request is let through
+(half-open): success closes the circuit, failure re-opens it with the
+cooldown doubled (up to `max_cooldown`).
+
+A `Retry-After` answer holds the host the same way, for the time the server
+asked for, so concurrent workers honour it too.
+
+    breaker = HostBreaker(threshold=0.5, cooldown=30)
+    breaker.before(url)          # blocks while the host's circuit is open
+    breaker.record(url, ok)
+"""
+
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """Rolling-window failure-rate breaker for one host."""
+
+    def __init__(self, threshold=0.5, window=20, min_requests=10, cooldown=30.0,
+                 max_cooldown=120.0, clock=time.monotonic, sleep=time.sleep):
+        self.threshold = threshold
+        self.min_requests = min_requests
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = CLOSED
+        self.trips = 0
+        self.paused = 0.0
+        self._cooldown = cooldown
+        self._outcomes = deque(maxlen=window)
+        self._open_until = 0.0
+        self._trial = None
+        self._tripped = False
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def before(self):
+        """Block while the circuit is open; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                if self.state == CLOSED:
+                    break
+                if now < self._open_until:
+                    delay = self._open_until - now
+                elif self._trial is None:
+                    # Cooldown over: this caller is the half-open trial request
+                    self.state = HALF_OPEN
+                    self._trial = threading.get_ident()
+                    break
+                else:
+                    delay = min(1.0, self._cooldown)
+            self._sleep(delay)
+            waited += delay
+        if waited:
+            with self._lock:
+                self.paused += waited
+        return waited
+
+    def tripped(self):
+        """True while the circuit is open because of the error rate (not a Retry-After hold)."""
+        with self._lock:
+            return self.state == OPEN and self._tripped and self._clock() < self._open_until
+
+    def record(self, ok):
+        with self._lock:
+            if self.state == HALF_OPEN and self._trial == threading.get_ident():
+                self._trial = None
+                if ok:
+                    self.state = CLOSED
+                    self._cooldown = self.base_cooldown
+                    self._outcomes.clear()
+                else:
+                    self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+                    self._trip()
+                return
+            self._outcomes.append(bool(ok))
+            failures = self._outcomes.count(False)
+            if (self.state == CLOSED and len(self._outcomes) >= self.min_requests
+                    and failures / len(self._outcomes) >= self.threshold):
+                self._trip()
+
+    def hold(self, seconds):
+        """Pause the host for `seconds` (e.g. from Retry-After) without counting a trip."""
+        with self._lock:
+            until = self._clock() + seconds
+            if until > self._open_until:
+                self._open_until = until
+                if self.state == CLOSED:
+                    self.state = OPEN
+                    self._tripped = False
+
+    def _trip(self):
+        self.state = OPEN
+        self._tripped = True
+        self.trips += 1
+        self._open_until = self._clock() + self._cooldown
+        self._outcomes.clear()
+
+
+class HostBreaker:
+    """One CircuitBreaker per host, created lazily with the same settings."""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, host):
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(**self.settings)
+            return breaker
+
+    def before(self, url):
+        return self.breaker(urlsplit(url).netloc).before()
+
+    def record(self, url, ok):
+        self.breaker(urlsplit(url).netloc).record(ok)
+
+    def hold(self, url, seconds):
+        self.breaker(urlsplit(url).netloc).hold(seconds)
+
+    def tripped(self, url):
+        return self.breaker(urlsplit(url).netloc).tripped()
+
+    @property
+    def trips(self):
+        with self._lock:
+            return sum(b.trips for b in self._breakers.values())
+
+    @property
+    def paused(self):
+        with self._lock:
+            return sum(b.paused for b in self._breakers.values())
+
+    def format_summary(self):
+        return f"{self.trips} breaker trips ({self.paused:.1f}s paused)"
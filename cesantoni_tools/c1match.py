@@ -0,0 +1,210 @@
+"""
+C1 (tile close-up) image matching for scrape-tile-images.py.
+
+The tile scraper used to run a case-insensitive lazy regex over each whole
+product page, then upper-case every URL again for each product name it
+tried and score each candidate with five regex searches before sorting.
+Here a page is scanned once: `C1Page(html)` finds the `_C1` markers with
+plain `str.find`, cuts out the URL around each one, and scores every unique
+URL at most once, the first time a lookup matches it. Each product lookup
+then only does substring tests of the name tokens against the upper-cased
+URLs and picks the winners with a heap:
+
+    page = C1Page(html)
+    url = page.best(name_tokens("Calacatta Black"))    # or None
+
+The URLs found and the scores are exactly those of the old
+extract_c1_images_from_html() / get_best_c1(). Ties used to be broken by
+set iteration order (which changes from run to run); here the URL that
+appears first on the page wins.
+"""
+
+import heapq
+import re
+from collections import namedtuple
+
+# The historical pattern; still used for tokens that are not plain ASCII
+C1_URL_RE = re.compile(r'https?://[^\s"\'<>]+?_C1[^\s"\'<>]*\.(?:jpg|jpeg|png|webp)', re.IGNORECASE)
+EXTENSIONS = ("jpg", "jpeg", "png", "webp")
+# Run boundaries: the characters C1_URL_RE cannot cross
+_SEPARATOR_RE = re.compile(r'[\s"\'<>]')
+_LAST_SEPARATOR_RE = re.compile(r'.*[\s"\'<>]', re.DOTALL)
+# How far back to look for the start of a run before widening the search
+LOOKBEHIND = 512
+
+_EXACT_C1_RE = re.compile(r'_C1[^0-9]')
+_C1_EXT_RE = re.compile(r'_C1\.(jpg|jpeg|png|webp)', re.IGNORECASE)
+_C1_DASH_RE = re.compile(r'_C1-')
+_RESIZED_RE = re.compile(r'-\d+x\d+\.')
+
+C1Candidate = namedtuple("C1Candidate", "url upper order")
+
+
+def name_tokens(product_name):
+    """Upper-case spellings of a product name as they appear in C1 file names."""
+    name_upper = product_name.upper().strip()
+    return (name_upper.replace(" ", "_"), name_upper.replace(" ", ""))
+
+
+def marker_score(url):
+    """The _C1 part of score_c1(): 100 for an exact _C1, 90 for _C1-..., else 0 (_C12...)."""
+    # Prefer exact _C1 (not _C12, _C14, etc.)
+    if _EXACT_C1_RE.search(url) or _C1_EXT_RE.search(url):
+        return 100
+    if _C1_DASH_RE.search(url):
+        return 90  # _C1-1, _C1-e... are still C1
+    return 0
+
+
+def score_c1(url):
+    """Ranking score of a C1 URL: exact _C1, full size, single slash, .jpg first."""
+    score = marker_score(url)
+    # Penalize resized versions (e.g., -1024x512, -300x150)
+    if _RESIZED_RE.search(url):
+        score -= 50
+    # Prefer no double-slash in path
+    if "//" not in url.replace("https://", "").replace("http://", ""):
+        score += 10
+    lower = url.lower()
+    if lower.endswith(".jpg") or lower.endswith(".jpeg"):
+        score += 5
+    elif lower.endswith(".webp"):
+        score += 3
+    return score
+
+
+def find_c1_urls(html):
+    """Unique C1 image URLs on the page, in order of first appearance.
+
+    Same matches as C1_URL_RE.findall(html): every match lies inside one run
+    of non-separator characters containing "_C1", so only the runs around a
+    "_C1"/"_c1" found by str.find are looked at.
+    """
+    found = {}
+    seen = set()
+    end = 0
+    for pos in _markers(html):
+        if pos < end:
+            continue  # inside a run already handled
+        start = _run_start(html, end, pos)
+        after = _SEPARATOR_RE.search(html, pos + 3)
+        end = after.start() if after else len(html)
+        token = html[start:end]
+        if token in seen:
+            continue  # the same URL in src, data-large_image, the gallery...
+        seen.add(token)
+        if token.isascii():
+            url = _match_token(token)
+            if url:
+                found.setdefault(url, None)
+        else:
+            for url in C1_URL_RE.findall(token):
+                found.setdefault(url, None)
+    return list(found)
+
+
+def _markers(html):
+    """Positions of "_C1" and "_c1" (the only case variants), in order."""
+    upper = html.find("_C1")
+    lower = html.find("_c1")
+    while upper != -1 or lower != -1:
+        if lower == -1 or (upper != -1 and upper < lower):
+            yield upper
+            upper = html.find("_C1", upper + 1)
+        else:
+            yield lower
+            lower = html.find("_c1", lower + 1)
+
+
+def _run_start(html, floor, pos):
+    """Start of the run of non-separators containing `pos`; none starts before `floor`."""
+    low = max(floor, pos - LOOKBEHIND)
+    while True:
+        last = _LAST_SEPARATOR_RE.match(html, low, pos)
+        if last:
+            return last.end()
+        if low == floor:
+            return floor
+        low = max(floor, low - LOOKBEHIND * 8)
+
+
+def _match_token(token):
+    """The C1_URL_RE match inside an ASCII run of non-separators, or None.
+
+    A match starts at the first "http://"/"https://", takes the first "_C1"
+    after at least one more character, and extends greedily to the last
+    image extension after it; there is at most one match per run.
+    """
+    lower = token.lower()
+    start = lower.find("http")
+    while start != -1:
+        if lower.startswith("https://", start):
+            scheme = 8
+        elif lower.startswith("http://", start):
+            scheme = 7
+        else:
+            start = lower.find("http", start + 1)
+            continue
+        c1 = lower.find("_c1", start + scheme + 1)
+        if c1 == -1:
+            return None
+        dot = lower.rfind(".")
+        while dot >= c1 + 3:
+            for ext in EXTENSIONS:
+                if lower.startswith(ext, dot + 1):
+                    return token[start:dot + 1 + len(ext)]
+            dot = lower.rfind(".", 0, dot)
+        return None
+    return None
+
+
+class C1Page:
+    """The scored C1 candidates of one page, ready to be matched against product names."""
+
+    def __init__(self, html):
+        self.candidates = [C1Candidate(url, url.upper(), order)
+                           for order, url in enumerate(find_c1_urls(html))]
+        self._scores = {}
+        # srcset widths of the page's images ({url: width}), when the caller reads them
+        self.widths = {}
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def __iter__(self):
+        return (c.url for c in self.candidates)
+
+    def matching(self, tokens):
+        """Candidates whose upper-cased URL contains any of `tokens`."""
+        return [c for c in self.candidates if any(token in c.upper for token in tokens)]
+
+    def score(self, candidate):
+        """score_c1() of a candidate, computed once per page."""
+        score = self._scores.get(candidate.order)
+        if score is None:
+            score = self._scores[candidate.order] = score_c1(candidate.url)
+        return score
+
+    def top(self, tokens, n=1):
+        """The `n` best URLs for `tokens`, best first (ties: first on the page)."""
+        return [c.url for c in heapq.nlargest(n, self.matching(tokens),
+                                              key=lambda c: (self.score(c), -c.order))]
+
+    def contenders(self, tokens, n=None):
+        """Matching candidates with the best marker_score(), best score_c1() first.
+
+        These only differ in size, format and path: the ones worth comparing by
+        their real dimensions. At most `n` of them when given.
+        """
+        matching = self.matching(tokens)
+        if not matching:
+            return []
+        best_marker = max(marker_score(c.url) for c in matching)
+        contenders = [c for c in matching if marker_score(c.url) == best_marker]
+        contenders.sort(key=lambda c: (-self.score(c), c.order))
+        return contenders[:n] if n else contenders
+
+    def best(self, tokens):
+        """The best URL for `tokens`, or None."""
+        top = self.top(tokens, 1)
+        return top[0] if top else None
@@ -0,0 +1,110 @@
+"""
+Resumable crawl checkpoints.
+
+A `Checkpoint` is an append-only JSONL journal with one record per finished
+item (a product URL, a product id...): `done` with its result, or `failed`
+with the reason. Every run writes one; `--resume` reloads it, skips the items
+already done and retries only the failed and never-reached ones, so an
+interrupted crawl costs only the remaining requests and rate-limit sleeps.
+
+    with Checkpoint(".cache/scraper-checkpoint.jsonl", resume=True) as cp:
+        for url in cp.pending(urls):
+            ...
+            cp.done(url, product)        # or cp.failed(url, "Status 503")
+
+The last record for a key wins, and a record torn by a crash is dropped on
+load, so the journal is always safe to append to.
+"""
+
+import os
+import threading
+import time
+
+from .jsonl import JsonlWriter, iter_jsonl
+
+DONE = "done"
+FAILED = "failed"
+
+
+class Checkpoint:
+    """Per-key status journal (done / failed / pending) backing --resume."""
+
+    def __init__(self, path, resume=False, fsync_every=1):
+        self.path = path
+        self.resume = resume
+        self._state = {}
+        self._lock = threading.Lock()
+        self.stats = {"skipped": 0, "retried": 0, "done": 0, "failed": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if resume and os.path.exists(path):
+            _drop_torn_tail(path)
+            for record in iter_jsonl(path):
+                self._state[record["key"]] = record
+        self._writer = JsonlWriter(path, fsync_every=fsync_every, append=resume)
+
+    def status(self, key):
+        """'done', 'failed' or None (pending)."""
+        record = self._state.get(key)
+        return record["status"] if record else None
+
+    def is_done(self, key):
+        return self.status(key) == DONE
+
+    def result(self, key):
+        """Result stored with a `done` record (None if there is none)."""
+        record = self._state.get(key)
+        return record.get("result") if record else None
+
+    def reason(self, key):
+        record = self._state.get(key)
+        return record.get("reason") if record else None
+
+    def pending(self, keys):
+        """The keys still to do, in order: failed ones and ones never reached."""
+        todo = []
+        for key in keys:
+            status = self.status(key)
+            if status == DONE:
+                self.stats["skipped"] += 1
+                continue
+            if status == FAILED:
+                self.stats["retried"] += 1
+            todo.append(key)
+        return todo
+
+    def done(self, key, result=None):
+        self._record({"key": key, "status": DONE, "result": result})
+
+    def failed(self, key, reason):
+        self._record({"key": key, "status": FAILED, "reason": str(reason)})
+
+    def _record(self, record):
+        record["at"] = time.time()
+        with self._lock:
+            self._state[record["key"]] = record
+            self.stats[record["status"]] += 1
+        self._writer.write(record)
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def format_summary(self):
+        s = self.stats
+        text = f"Checkpoint: {s['done']} done, {s['failed']} failed this run"
+        if self.resume:
+            text += f" | resumed: {s['skipped']} skipped, {s['retried']} failures retried"
+        return f"{text} ({self.path})"
+
+
+def _drop_torn_tail(path):
+    """Cut a last line left without its newline by a crash, so appends start clean."""
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
@@ -0,0 +1,59 @@
+"""
+`cesantoni-tools`: one entry point for the Python tools, as subcommands.
+
+    python3 -m cesantoni_tools scrape --discover --stream
+    python3 -m cesantoni_tools tiles --source sqlite: --apply
+    python3 -m cesantoni_tools import --mode merge --json productos_cesantoni.jsonl
+    python3 -m cesantoni_tools mirror --db data/cesantoni.db
+    python3 -m cesantoni_tools tiles --help
+
+Each subcommand runs the main() of its script (see scripts.py) with the rest
+of the command line, so the options are exactly the script's. Options can
+also come from CESANTONI_<COMMAND>_<OPTION> environment variables (see
+config.py), e.g. CESANTONI_IMPORT_MODE=merge.
+
+Nothing but argparse is imported until a subcommand is chosen, and then only
+that script and what it needs: `--help` answers without loading the HTTP
+client, BeautifulSoup or lxml. benchmarks/bench_startup.py measures it.
+"""
+
+import argparse
+import sys
+
+PROG = "cesantoni-tools"
+
+# Subcommand -> (script name in scripts.SCRIPTS, summary)
+COMMANDS = {
+    "scrape": ("scraper", "scrape the product pages of cesantoni.com.mx (scraper-cesantoni.py)"),
+    "tiles": ("tiles", "find C1 close-up images for products missing them (scripts/scrape-tile-images.py)"),
+    "import": ("importer", "import the scraped products into the SQLite database (import-products.py)"),
+    "mirror": ("mirror", "mirror the product images with resized variants (mirror-images.py)"),
+}
+
+
+def build_parser():
+    commands = "\n".join(f"  {name:<8} {summary}" for name, (_, summary) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog=PROG, formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="Cesantoni product tooling: scraping, C1 images, import and image mirror.",
+        epilog=f"commands:\n{commands}\n\n"
+               f"'{PROG} COMMAND --help' lists the options of a command. Any option can also be set\n"
+               f"as CESANTONI_<COMMAND>_<OPTION>, e.g. CESANTONI_IMPORT_MODE=merge or\n"
+               f"CESANTONI_TILES_RESUME=1; flags on the command line take precedence.")
+    parser.add_argument("command", choices=COMMANDS, metavar="COMMAND",
+                        help=f"one of: {', '.join(COMMANDS)}")
+    parser.add_argument("args", nargs=argparse.REMAINDER, metavar="...",
+                        help="options for the command")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    script, _ = COMMANDS[args.command]
+    if argv is None:
+        # The script's own parser takes its name from argv[0]: "cesantoni-tools tiles"
+        sys.argv[0] = f"{PROG} {args.command}"
+    # Imported here so that only the chosen script gets loaded
+    from .scripts import load_script
+
+    return load_script(script).main(args.args)
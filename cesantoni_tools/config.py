@@ -0,0 +1,72 @@
+"""
+Option defaults from the environment, for scheduled runs.
+
+Every option of a tool can also be given as an environment variable named
+after the tool's `cesantoni_tools` subcommand and the option:
+
+    CESANTONI_IMPORT_MODE=merge CESANTONI_IMPORT_DB=/srv/crm/cesantoni.db python3 -m cesantoni_tools import
+    CESANTONI_TILES_RESUME=1 python3 -m cesantoni_tools tiles --concurrency 16
+
+A flag on the command line always wins over the variable. The value goes
+through the option's own type and choices, so a bad one fails like a bad
+flag; on/off flags take 1/true/yes/on or 0/false/no/off. Options with an
+optional value (--discover [URL], --profile [F]) take the same words to mean
+"given alone" or "not given", and anything else as the value:
+
+    CESANTONI_SCRAPE_DISCOVER=1                  # --discover (default sitemap)
+    CESANTONI_SCRAPE_PROFILE=/tmp/scraper.prof   # --profile /tmp/scraper.prof
+
+    parser = argparse.ArgumentParser(...)
+    ...
+    env_defaults(parser, "IMPORT")
+    return parser.parse_args(argv)
+"""
+
+import argparse
+import os
+
+PREFIX = "CESANTONI_"
+
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off", "")
+
+
+def env_name(command, option):
+    """CESANTONI_<COMMAND>_<OPTION> for an option string such as '--max-age'."""
+    return f"{PREFIX}{command}_{option.lstrip('-').replace('-', '_')}".upper()
+
+
+def env_defaults(parser, command, environ=None):
+    """Set the defaults of `parser`'s long options from CESANTONI_<COMMAND>_* variables.
+
+    Returns {variable: value} for the variables that were used; a value the
+    option would reject ends the program through parser.error().
+    """
+    environ = os.environ if environ is None else environ
+    used = {}
+    for action in parser._actions:
+        options = [o for o in action.option_strings if o.startswith("--")]
+        if not options or isinstance(action, argparse._HelpAction):
+            continue
+        name = env_name(command, options[0])
+        if name not in environ:
+            continue
+        raw = environ[name]
+        flag = raw.strip().lower()
+        if action.nargs == 0:
+            if flag not in _TRUE + _FALSE:
+                parser.error(f"{name}: expected 1/0, true/false, yes/no or on/off, got {raw!r}")
+            value = action.const if flag in _TRUE else action.default
+        elif action.nargs == "?" and action.const is not None and flag in _TRUE + _FALSE:
+            # --discover / --profile given alone use their const, like an on/off flag
+            value = action.const if flag in _TRUE else action.default
+        else:
+            try:
+                value = action.type(raw) if action.type else raw
+            except (argparse.ArgumentTypeError, TypeError, ValueError) as e:
+                parser.error(f"{name}: {e}")
+            if action.choices is not None and value not in action.choices:
+                parser.error(f"{name}: {raw!r} is not one of {', '.join(map(str, action.choices))}")
+        parser.set_defaults(**{action.dest: value})
+        used[name] = raw
+    return used
@@ -0,0 +1,85 @@
+"""
+Bounded-concurrency crawl engine.
+
+`crawl()` runs a unit of work (e.g. `scrape_product`) over a list of URLs with
+at most `concurrency` requests in flight, honouring a per-host HostThrottle.
+Results always come back in input order, so the output of a concurrent run is
+identical to the sequential one.
+
+`first_true()` is the probing counterpart: it tests candidates concurrently but
+returns the same answer as testing them one by one in priority order.
+
+concurrent.futures is imported on first use: it pulls in logging, a good
+part of a tool's startup time when it only prints --help.
+"""
+
+
+def crawl(urls, work, concurrency=1, throttle=None):
+    """Apply `work(index, url)` to every URL and return the results in input order."""
+    urls = list(urls)
+
+    def task(index):
+        url = urls[index]
+        if throttle is not None:
+            throttle.wait(url)
+        return work(index, url)
+
+    if concurrency <= 1:
+        return [task(i) for i in range(len(urls))]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(task, range(len(urls))))
+
+
+def first_true(items, test, concurrency=4):
+    """Return the first item, in list order, for which `test(item)` is true (or None).
+
+    At most `concurrency` tests run at once, in a window sliding over the list.
+    As soon as the highest-priority hit is known the remaining lower-priority
+    tests are dropped: queued ones never start and results from those still in
+    flight are ignored. A test that raises counts as false.
+    """
+    items = list(items)
+    if concurrency <= 1:
+        for item in items:
+            try:
+                if test(item):
+                    return item
+            except Exception:
+                pass
+        return None
+
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    results = {}
+    pending = {}
+    next_index = 0
+    # Lowest index not yet known to be false; nothing past a known hit is tested
+    frontier = 0
+    limit = len(items)
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        while True:
+            while frontier in results:
+                if results[frontier]:
+                    return items[frontier]
+                frontier += 1
+            if frontier >= len(items):
+                return None
+            while next_index < limit and len(pending) < concurrency:
+                future = pool.submit(test, items[next_index])
+                pending[future] = next_index
+                next_index += 1
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    results[index] = bool(future.result())
+                except Exception:
+                    results[index] = False
+                if results[index]:
+                    limit = min(limit, index + 1)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
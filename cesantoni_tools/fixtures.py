@@ -0,0 +1,123 @@
+"""
+Record/replay of HTTP exchanges for offline runs and benchmarks.
+
+A cassette is a JSONL file with one recorded exchange per line (method, URL,
+status, a few headers and the body). Record one against the real sites once:
+
+    python3 scraper-cesantoni.py --no-cache --record fixtures/site.jsonl
+    python3 scripts/scrape-tile-images.py --no-cache --record fixtures/site.jsonl
+
+and replay it through the stub server, which the scripts reach as an HTTP
+proxy so their real URLs (www.cesantoni.com.mx, the Render API) are kept:
+
+    with StubServer(cassette=Cassette.load("fixtures/site.jsonl"), latency=0.1) as server:
+        scraper.main(["--proxy", server.base_url, ...])
+
+Streamed GETs (the Render API, Range probes, image downloads) are recorded
+when the stream is closed; one closed before the end of its body is marked
+truncated. Only the last answer per (method, URL) is kept, except that a
+206 or truncated one never replaces a complete answer, and 304s are not
+recorded (the replay answers If-None-Match from the recorded ETag itself),
+so record with --no-cache to capture every body.
+"""
+
+import base64
+import threading
+from urllib.parse import urlsplit
+
+from .jsonl import JsonlWriter, iter_jsonl
+
+# Response headers worth replaying; Content-Length/Encoding are recomputed
+RECORDED_HEADERS = ("Content-Type", "Content-Range", "ETag", "Last-Modified", "Location",
+                    "Retry-After")
+
+
+def exchange_key(method, url):
+    """Cassette key: HEAD is answered from the GET recording when there is no HEAD one."""
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return method.upper(), f"{parts.netloc.lower()}{path}"
+
+
+def is_partial(record):
+    """True for a Range answer (206) or a body the client stopped reading early."""
+    return record["status"] == 206 or bool(record.get("truncated"))
+
+
+class Recorder:
+    """Appends every exchange an HttpClient makes to a cassette (pass as recorder=)."""
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.recorded = 0
+        self._writer = JsonlWriter(path, fsync_every=100, append=append)
+        self._lock = threading.Lock()
+
+    def record(self, method, url, resp, read_body=True):
+        if resp.status_code == 304:
+            return
+        record = {
+            "method": method,
+            "url": url,
+            "status": resp.status_code,
+            "headers": {name: resp.headers[name] for name in RECORDED_HEADERS
+                        if resp.headers.get(name) is not None},
+        }
+        if not read_body:
+            record["truncated"] = True
+        try:
+            record["body"] = resp.content.decode("utf-8")
+        except UnicodeDecodeError:
+            record["body_b64"] = base64.b64encode(resp.content).decode("ascii")
+        self._writer.write(record)
+        with self._lock:
+            self.recorded += 1
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Cassette:
+    """Recorded exchanges indexed by (method, host + path), ready for replay."""
+
+    def __init__(self, records=()):
+        self._exchanges = {}
+        for record in records:
+            self.add(record)
+
+    @classmethod
+    def load(cls, path):
+        return cls(iter_jsonl(path))
+
+    def add(self, record):
+        key = exchange_key(record["method"], record["url"])
+        current = self._exchanges.get(key)
+        # A partial body never replaces a complete one: the stub answers
+        # Range requests from the complete body by itself
+        if current is not None and is_partial(record) and not is_partial(current):
+            return
+        self._exchanges[key] = record
+
+    def __len__(self):
+        return len(self._exchanges)
+
+    def lookup(self, method, url):
+        """(status, headers, body bytes) for the request, or None if it was never recorded."""
+        record = self._exchanges.get(exchange_key(method, url))
+        if record is None and method.upper() == "HEAD":
+            record = self._exchanges.get(exchange_key("GET", url))
+        if record is None:
+            return None
+        if "body_b64" in record:
+            body = base64.b64decode(record["body_b64"])
+        else:
+            body = record.get("body", "").encode("utf-8")
+        return record["status"], dict(record.get("headers") or {}), body
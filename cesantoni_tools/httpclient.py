@@ -0,0 +1,584 @@
+"""
+Keep-alive HTTP client shared by the scrapers.
+
+Both scraper-cesantoni.py and scripts/scrape-tile-images.py used to open a new
+connection (and TLS handshake) for every request. `HttpClient` keeps a small
+pool of HTTP/1.1 connections per host and reuses them, applies one Timeout and
+RetryPolicy to every request, and counts connections, reuses and handshake
+time so a run summary can show how many sockets were actually opened.
+
+Retries back off exponentially with jitter and honour `Retry-After`; with a
+HostBreaker, a host whose error rate spikes is paused instead of costing a
+full timeout per request. With a Metrics instance every request is timed per
+phase: http.dns, http.connect, http.tls, http.server (time to first byte)
+and http.body.
+
+`proxy="http://127.0.0.1:8000"` sends every request, absolute URL included,
+to a plain HTTP proxy such as the replaying StubServer; a `recorder`
+(fixtures.Recorder) is handed every exchange to build a cassette, streamed
+ones included once they are closed.
+
+`client.stream(url)` is a GET whose body is read chunk by chunk (and
+decompressed on the fly) instead of in one piece, for responses too large to
+hold as one string:
+
+    with client.stream(API_URL) as resp:
+        for chunk in resp.iter_content():
+            ...
+
+    client = HttpClient(pool_size=8, headers={"User-Agent": "..."})
+    resp = client.get("https://www.cesantoni.com.mx/producto/alabama/")
+    print(resp.status_code, len(resp.text))
+    print(client.format_summary())
+"""
+
+import contextlib
+import email.utils
+import gzip
+import http.client
+import queue
+import random
+import socket
+import ssl
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from urllib.parse import urljoin, urlsplit
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+# Bodies larger than this are not drained when the caller does not want them;
+# the connection is dropped instead.
+MAX_DRAIN_BYTES = 64 * 1024
+
+# Errors meaning "the kept-alive socket was closed by the server"
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+@dataclass(frozen=True)
+class Timeout:
+    """Connect and read timeouts in seconds."""
+    connect: float = 10.0
+    read: float = 20.0
+
+    @classmethod
+    def coerce(cls, value):
+        """Accept a Timeout, a single number (used for both) or None."""
+        if value is None or isinstance(value, cls):
+            return value
+        return cls(connect=min(value, cls.connect), read=value)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How many times, and on what, a request is retried.
+
+    The wait before retry n is `backoff * 2**(n-1)`, capped at `max_backoff`
+    and scaled down by up to `jitter` (0.5 -> between 50% and 100%) so
+    concurrent workers do not retry in lockstep. A Retry-After from the server
+    takes precedence, up to `max_retry_after`.
+    """
+    retries: int = 1
+    backoff: float = 0.5
+    statuses: tuple = (429, 502, 503, 504)
+    methods: tuple = ("GET", "HEAD")
+    jitter: float = 0.5
+    max_backoff: float = 30.0
+    max_retry_after: float = 120.0
+
+    def delay(self, attempt, retry_after=None, rng=random):
+        """Seconds to wait before retry number `attempt` (1-based)."""
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), self.max_retry_after)
+        delay = min(self.backoff * (2 ** (attempt - 1)), self.max_backoff)
+        return delay * (1 - self.jitter * rng.random())
+
+
+NO_RETRY = RetryPolicy(retries=0)
+
+
+class TransientError(Exception):
+    """A request that kept failing with a retryable status or a network error.
+
+    Raised by callers that must tell "does not exist" (404) apart from "could
+    not find out right now", so the item can be retried later (--resume).
+    """
+
+
+def parse_retry_after(value, now=None):
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+class Response:
+    """Minimal response object (requests-like attribute names)."""
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        # Set by PageCache: "fresh", "revalidated" or None for a network body
+        self.from_cache = None
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 300
+
+    @property
+    def encoding(self):
+        ctype = self.headers.get("Content-Type", "")
+        for part in ctype.split(";")[1:]:
+            key, _, value = part.strip().partition("=")
+            if key.lower() == "charset" and value:
+                return value.strip('"\'')
+        return "utf-8"
+
+    @property
+    def text(self):
+        try:
+            return self.content.decode(self.encoding, errors="replace")
+        except LookupError:
+            return self.content.decode("utf-8", errors="replace")
+
+    def close(self):
+        """Nothing to release: the body was read in full."""
+
+
+class StreamingResponse:
+    """Response of HttpClient.stream(): the body is read lazily with iter_content().
+
+    Holds a pooled connection until closed; the connection goes back to the
+    pool only if the body was read to the end. While the client has a
+    recorder, the chunks read are also kept so the exchange can be recorded
+    on close.
+    """
+
+    def __init__(self, client, url, pool, conn, raw, first_byte):
+        self.url = url
+        self.status_code = raw.status
+        self.headers = raw.headers
+        self.from_cache = None
+        self.bytes_read = 0
+        self._client = client
+        self._pool = pool
+        self._conn = conn
+        self._raw = raw
+        self._first_byte = first_byte
+        self._finished = False
+        self._closed = False
+        self._recorded = [] if client.recorder is not None else None
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 300
+
+    def iter_content(self, chunk_size=64 * 1024):
+        """Yield the decoded body in chunks of up to `chunk_size` bytes read."""
+        encoding = (self._raw.getheader("Content-Encoding") or "").lower()
+        # wbits | 32 detects the gzip or zlib header by itself
+        decoder = zlib.decompressobj(zlib.MAX_WBITS | 32) if encoding in ("gzip", "deflate") else None
+        while True:
+            chunk = self._raw.read(chunk_size)
+            if not chunk:
+                break
+            self.bytes_read += len(chunk)
+            if decoder is not None:
+                chunk = decoder.decompress(chunk)
+            if chunk:
+                if self._recorded is not None:
+                    self._recorded.append(chunk)
+                yield chunk
+        if decoder is not None:
+            tail = decoder.flush()
+            if tail:
+                if self._recorded is not None:
+                    self._recorded.append(tail)
+                yield tail
+        self._finished = True
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        # A reader may stop at the last byte without asking for the (empty) next chunk
+        self._finished = self._finished or self._raw.isclosed()
+        if self._finished and not self._raw.will_close:
+            self._pool.idle.put(self._conn)
+        else:
+            self._conn.close()
+        self._pool.slots.release()
+        self._client._finish_stream(self)
+
+
+@dataclass
+class ClientStats:
+    """Counters reported in the run summary."""
+    requests: int = 0
+    connections_opened: int = 0
+    connections_reused: int = 0
+    handshake_time: float = 0.0
+    bytes_received: int = 0
+    retries: int = 0
+    errors: int = 0
+    by_host: dict = field(default_factory=dict)
+
+
+class _HostPool:
+    """Idle connections for one (scheme, host, port), capped at `size` open sockets."""
+
+    def __init__(self, size):
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+
+
+class HttpClient:
+    """Thread-safe pooled HTTP/1.1 client with keep-alive, retries and stats."""
+
+    def __init__(self, pool_size=8, timeout=Timeout(), retry=RetryPolicy(),
+                 ssl_context=None, headers=None, breaker=None, metrics=None, proxy=None,
+                 recorder=None):
+        self.pool_size = max(1, pool_size)
+        self.timeout = Timeout.coerce(timeout)
+        self.retry = retry
+        self.breaker = breaker
+        self.metrics = metrics
+        self.proxy = proxy
+        self.recorder = recorder
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self.headers = {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+        self.headers.update(headers or {})
+        self.stats = ClientStats()
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    # --- public API -----------------------------------------------------
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+    def request(self, method, url, headers=None, timeout=None, retry=None,
+                allow_redirects=True, read_body=True):
+        """Perform a request and return a Response. Raises OSError/HTTPException on failure."""
+        timeout = Timeout.coerce(timeout) or self.timeout
+        retry = retry or self.retry
+        for _ in range(MAX_REDIRECTS + 1):
+            resp = self._request_with_retries(
+                url, method, retry, lambda: self._send(method, url, headers, timeout, read_body))
+            location = resp.headers.get("Location")
+            if not (allow_redirects and resp.status_code in REDIRECT_STATUSES and location):
+                return resp
+            url = urljoin(url, location)
+            if resp.status_code == 303:
+                method = "GET"
+        return resp
+
+    @contextlib.contextmanager
+    def stream(self, url, headers=None, timeout=None, retry=None):
+        """GET `url` and yield a StreamingResponse without reading its body.
+
+        Retries and the breaker apply until the status line arrives; a body
+        cut short raises from iter_content() and is not retried.
+        """
+        timeout = Timeout.coerce(timeout) or self.timeout
+        retry = retry or self.retry
+
+        def send():
+            pool, conn, raw, started, first_byte = self._open("GET", url, headers, timeout)
+            if self.metrics is not None:
+                self.metrics.observe("http.server", first_byte - started)
+            return StreamingResponse(self, url, pool, conn, raw, first_byte)
+
+        resp = self._request_with_retries(url, "GET", retry, send)
+        try:
+            yield resp
+        finally:
+            resp.close()
+
+    def close(self):
+        """Close every idle pooled connection."""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            while True:
+                try:
+                    pool.idle.get_nowait().close()
+                except queue.Empty:
+                    break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def summary(self):
+        s = self.stats
+        return {
+            "requests": s.requests,
+            "connections_opened": s.connections_opened,
+            "connections_reused": s.connections_reused,
+            "handshake_time": round(s.handshake_time, 3),
+            "bytes_received": s.bytes_received,
+            "retries": s.retries,
+            "errors": s.errors,
+            "breaker_trips": self.breaker.trips if self.breaker is not None else 0,
+            "breaker_paused": round(self.breaker.paused, 3) if self.breaker is not None else 0.0,
+            "by_host": dict(s.by_host),
+        }
+
+    def format_summary(self):
+        s = self.stats
+        avg = s.handshake_time / s.connections_opened if s.connections_opened else 0.0
+        text = (f"HTTP: {s.requests} requests over {s.connections_opened} connections "
+                f"({s.connections_reused} reused), handshake {s.handshake_time:.2f}s "
+                f"(avg {avg * 1000:.0f} ms), {s.bytes_received / 1024:.0f} KB received, "
+                f"{s.retries} retries, {s.errors} errors")
+        if self.breaker is not None:
+            text += f", {self.breaker.format_summary()}"
+        return text
+
+    # --- internals ------------------------------------------------------
+
+    def _request_with_retries(self, url, method, retry, send):
+        attempt = 0
+        while True:
+            if self.breaker is not None:
+                self.breaker.before(url)
+            retry_after = None
+            try:
+                resp = send()
+            except (OSError, http.client.HTTPException):
+                if self._record(url, False) or attempt >= retry.retries or method not in retry.methods:
+                    self._count("errors")
+                    raise
+            except BaseException:
+                # Not retried (a bad body, a recorder error, ...), but the
+                # breaker must still hear about it: a half-open trial that
+                # never reports back would hold the host shut for good
+                self._record(url, False)
+                self._count("errors")
+                raise
+            else:
+                failed = resp.status_code in retry.statuses
+                tripped = self._record(url, not failed)
+                if (not failed or tripped or attempt >= retry.retries
+                        or method not in retry.methods):
+                    return resp
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                resp.close()
+            attempt += 1
+            self._count("retries")
+            delay = retry.delay(attempt, retry_after)
+            if retry_after is not None and self.breaker is not None:
+                # Every worker going to this host waits, not just this one
+                self.breaker.hold(url, delay)
+            time.sleep(delay)
+
+    def _record(self, url, ok):
+        """Report the outcome to the breaker; True if the host's circuit is now open.
+
+        Retries stop once the circuit opens, so a request costs at most one
+        cooldown instead of waiting one out per retry.
+        """
+        if self.breaker is None:
+            return False
+        self.breaker.record(url, ok)
+        return self.breaker.tripped(url)
+
+    def _send(self, method, url, headers, timeout, read_body):
+        pool, conn, raw, started, first_byte = self._open(method, url, headers, timeout)
+        try:
+            try:
+                content = self._read(method, raw, read_body)
+            except BaseException:
+                conn.close()
+                raise
+            if self.metrics is not None:
+                self.metrics.observe("http.server", first_byte - started)
+                self.metrics.observe("http.body", time.perf_counter() - first_byte)
+                self.metrics.count("requests")
+                self.metrics.count("bytes", len(content or b""))
+            if content is None or raw.will_close:
+                conn.close()
+                content = content or b""
+            else:
+                pool.idle.put(conn)
+        finally:
+            pool.slots.release()
+
+        self._count_response(url, len(content))
+        resp = Response(url, raw.status, raw.headers, content)
+        if self.recorder is not None:
+            self.recorder.record(method, url, resp, read_body)
+        return resp
+
+    def _finish_stream(self, resp):
+        if self.metrics is not None:
+            self.metrics.observe("http.body", time.perf_counter() - resp._first_byte)
+            self.metrics.count("requests")
+            self.metrics.count("bytes", resp.bytes_read)
+        self._count_response(resp.url, resp.bytes_read)
+        if self.recorder is not None and resp._recorded is not None:
+            # A stream closed before its end is recorded as truncated, like a HEAD
+            body = Response(resp.url, resp.status_code, resp.headers, b"".join(resp._recorded))
+            self.recorder.record("GET", resp.url, body, read_body=resp._finished)
+
+    def _count_response(self, url, size):
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.bytes_received += size
+            host = urlsplit(url).netloc
+            self.stats.by_host[host] = self.stats.by_host.get(host, 0) + 1
+
+    def _open(self, method, url, headers, timeout):
+        """Send the request on a pooled connection and wait for the status line.
+
+        Returns (pool, conn, raw response, send time, first-byte time) with a
+        pool slot held; the caller reads the body and releases the slot.
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        all_headers = dict(self.headers)
+        all_headers.update(headers or {})
+        if self.proxy:
+            proxy = urlsplit(self.proxy)
+            key = (proxy.scheme, proxy.hostname, proxy.port)
+            path = url
+            all_headers["Host"] = parts.netloc
+
+        pool = self._pool(key)
+        pool.slots.acquire()
+        try:
+            conn, reused = self._checkout(pool, key, timeout)
+            started = time.perf_counter()
+            try:
+                raw = self._exchange(conn, method, path, all_headers)
+            except STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                # The server closed an idle keep-alive socket: retry once on a fresh one
+                conn = self._connect(key, timeout)
+                started = time.perf_counter()
+                raw = self._exchange(conn, method, path, all_headers)
+            first_byte = time.perf_counter()
+        except BaseException:
+            pool.slots.release()
+            raise
+        return pool, conn, raw, started, first_byte
+
+    def _exchange(self, conn, method, path, headers):
+        try:
+            conn.request(method, path, headers=headers)
+            return conn.getresponse()
+        except BaseException:
+            conn.close()
+            raise
+
+    def _read(self, method, raw, read_body):
+        """Read the body, or return None when the connection must be dropped instead."""
+        if method == "HEAD":
+            raw.read()  # marks the response finished so the connection can be reused
+            return b""
+        if not read_body:
+            length = raw.getheader("Content-Length")
+            if length is None or int(length) > MAX_DRAIN_BYTES:
+                return None
+            raw.read()
+            return b""
+        content = raw.read()
+        encoding = (raw.getheader("Content-Encoding") or "").lower()
+        if encoding == "gzip":
+            content = gzip.decompress(content)
+        elif encoding == "deflate":
+            try:
+                content = zlib.decompress(content)
+            except zlib.error:
+                content = zlib.decompress(content, -zlib.MAX_WBITS)
+        return content
+
+    def _pool(self, key):
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = _HostPool(self.pool_size)
+            return pool
+
+    def _checkout(self, pool, key, timeout):
+        try:
+            conn = pool.idle.get_nowait()
+        except queue.Empty:
+            return self._connect(key, timeout), False
+        conn.sock.settimeout(timeout.read)
+        self._count("connections_reused")
+        return conn, True
+
+    def _connect(self, key, timeout):
+        """Open a connection, timing DNS, TCP connect and TLS handshake separately."""
+        scheme, host, port = key
+        port = port or (443 if scheme == "https" else 80)
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=timeout.connect,
+                                               context=self.ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout.connect)
+        start = time.perf_counter()
+        addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        error = None
+        for family, socktype, proto, _, address in addresses:
+            sock = socket.socket(family, socktype, proto)
+            try:
+                sock.settimeout(timeout.connect)
+                sock.connect(address)
+                break
+            except OSError as e:
+                sock.close()
+                error = e
+        else:
+            raise error or OSError(f"no address for {host}")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connected = time.perf_counter()
+        if scheme == "https":
+            sock = self.ssl_context.wrap_socket(sock, server_hostname=host)
+        conn.sock = sock
+        done = time.perf_counter()
+        elapsed = done - start
+        conn.sock.settimeout(timeout.read)
+        if self.metrics is not None:
+            self.metrics.observe("http.dns", resolved - start)
+            self.metrics.observe("http.connect", connected - resolved)
+            if scheme == "https":
+                self.metrics.observe("http.tls", done - connected)
+        with self._lock:
+            self.stats.connections_opened += 1
+            self.stats.handshake_time += elapsed
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self.stats, name, getattr(self.stats, name) + 1)
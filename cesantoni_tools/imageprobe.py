@@ -0,0 +1,224 @@
+"""
+Real image dimensions from the first bytes of a file.
+
+Picking "the full-size C1 image" from URL text alone (no -300x300 suffix,
+.jpg first) is a guess. `DimensionProbe` asks for only the first few KB of
+each candidate with a Range request, reads the width and height from the
+JPEG / PNG / GIF / WebP header and the file size from Content-Range, so the
+largest real image can be chosen without downloading any of them:
+
+    probe = DimensionProbe(client, throttle=HostThrottle(8))
+    infos = probe.probe_all(urls, concurrency=4)    # {url: ImageInfo or None}
+    best = max(infos.values(), key=lambda info: (info.width, info.height))
+
+`srcset_widths(html)` reads the widths a page already declares for its
+images (`srcset="..._C1-300x300.jpg 300w, ..._C1.jpg 1200w"`), which cost
+no request at all.
+
+Answers are kept in a small in-memory LRU cache; failed probes (network
+errors, 5xx/429) are not cached.
+"""
+
+import contextlib
+import re
+import struct
+import threading
+from collections import OrderedDict, namedtuple
+
+# Enough for the header of nearly every JPEG; ones with a large EXIF/ICC block
+# before the frame header are read again, up to MAX_HEAD_BYTES
+HEAD_BYTES = 16 * 1024
+MAX_HEAD_BYTES = 256 * 1024
+
+ImageInfo = namedtuple("ImageInfo", "width height size format")
+
+# JPEG start-of-frame markers (all except DHT C4, JPG C8 and DAC CC)
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field
+_STANDALONE_MARKERS = frozenset(range(0xD0, 0xDA)) | {0x01}
+
+_SRCSET_RE = re.compile(r"""\bsrcset\s*=\s*(["'])(.*?)\1""", re.IGNORECASE | re.DOTALL)
+_WIDTH_DESCRIPTOR_RE = re.compile(r"^(\d+)w$")
+
+
+def image_dimensions(head):
+    """(format, width, height) read from the first bytes of an image.
+
+    Returns None when `head` is not a JPEG, PNG, GIF or WebP file, or when it
+    ends before the dimensions (see `is_image()` to tell the two apart).
+    """
+    if head.startswith(b"\xff\xd8"):
+        return _jpeg_dimensions(head)
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR" and len(head) >= 24:
+        width, height = struct.unpack(">II", head[16:24])
+        return "png", width, height
+    if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+        width, height = struct.unpack("<HH", head[6:10])
+        return "gif", width, height
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return _webp_dimensions(head)
+    return None
+
+
+def is_image(head):
+    """True if `head` starts like one of the formats image_dimensions() reads."""
+    return (head.startswith((b"\xff\xd8", b"\x89PNG\r\n\x1a\n", b"GIF87a", b"GIF89a"))
+            or (head[:4] == b"RIFF" and head[8:12] == b"WEBP"))
+
+
+def _jpeg_dimensions(head):
+    pos = 2
+    while pos + 4 <= len(head):
+        if head[pos] != 0xFF:
+            return None  # not at a marker: corrupt file
+        marker = head[pos + 1]
+        if marker == 0xFF:
+            pos += 1  # fill byte
+            continue
+        if marker in _STANDALONE_MARKERS:
+            pos += 2
+            continue
+        if marker == 0xDA:
+            return None  # start of scan without a frame header
+        length = struct.unpack(">H", head[pos + 2:pos + 4])[0]
+        if marker in _SOF_MARKERS:
+            if pos + 9 > len(head):
+                return None
+            height, width = struct.unpack(">HH", head[pos + 5:pos + 9])
+            return "jpeg", width, height
+        pos += 2 + length
+    return None
+
+
+def _webp_dimensions(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 " and len(head) >= 30:
+        width, height = struct.unpack("<HH", head[26:30])
+        return "webp", width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(head) >= 25:
+        bits = int.from_bytes(head[21:25], "little")
+        return "webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(head) >= 30:
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return "webp", width, height
+    return None
+
+
+def srcset_widths(html):
+    """{url: width} from every `srcset` width descriptor ("url 300w") on the page."""
+    widths = {}
+    for match in _SRCSET_RE.finditer(html):
+        for candidate in match.group(2).split(","):
+            parts = candidate.split()
+            if len(parts) != 2:
+                continue
+            descriptor = _WIDTH_DESCRIPTOR_RE.match(parts[1])
+            if descriptor:
+                width = int(descriptor.group(1))
+                if width > widths.get(parts[0], 0):
+                    widths[parts[0]] = width
+    return widths
+
+
+def content_size(resp):
+    """Full size of the file from Content-Range (206) or Content-Length (200), or None."""
+    content_range = resp.headers.get("Content-Range") or ""
+    total = content_range.rpartition("/")[2]
+    if total.isdigit():
+        return int(total)
+    length = resp.headers.get("Content-Length")
+    if resp.status_code == 200 and length and length.isdigit():
+        return int(length)
+    return None
+
+
+class DimensionProbe:
+    """Range-request dimension probe over an HttpClient, with an LRU cache of answers."""
+
+    def __init__(self, client, throttle=None, metrics=None, head_bytes=HEAD_BYTES,
+                 max_bytes=MAX_HEAD_BYTES, cache_size=2048, timeout=10):
+        self.client = client
+        self.throttle = throttle
+        self.metrics = metrics
+        self.head_bytes = head_bytes
+        self.max_bytes = max_bytes
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.probed = 0
+        self.cached = 0
+        self.failed = 0
+        self.bytes_read = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def probe(self, url):
+        """ImageInfo of the image at `url`, or None if it is missing, unreadable or the probe failed."""
+        with self._lock:
+            if url in self._cache:
+                self._cache.move_to_end(url)
+                self.cached += 1
+                return self._cache[url]
+        try:
+            info = self._probe(url)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            return None
+        with self._lock:
+            self.probed += 1
+            self._cache[url] = info
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return info
+
+    def probe_all(self, urls, concurrency=4):
+        """{url: ImageInfo or None} for every URL, probing up to `concurrency` at once."""
+        urls = list(dict.fromkeys(urls))
+        if concurrency <= 1 or len(urls) <= 1:
+            return {url: self.probe(url) for url in urls}
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(urls))) as pool:
+            return dict(zip(urls, pool.map(self.probe, urls)))
+
+    def _probe(self, url):
+        nbytes = self.head_bytes
+        while True:
+            status, head, size = self._read_head(url, nbytes)
+            if 400 <= status < 500 and status != 429:
+                return None  # missing: a definite answer, cached
+            if status == 429 or status >= 500:
+                raise OSError(f"{url}: HTTP {status}")
+            dimensions = image_dimensions(head)
+            if dimensions is not None:
+                fmt, width, height = dimensions
+                return ImageInfo(width, height, size, fmt)
+            # Header not complete yet: read more, unless the whole file is already here
+            if not is_image(head) or len(head) < nbytes or nbytes >= self.max_bytes:
+                return None
+            nbytes = min(nbytes * 4, self.max_bytes)
+
+    def _read_head(self, url, nbytes):
+        """(status, first `nbytes` bytes, full size) of a ranged GET."""
+        if self.throttle is not None:
+            self.throttle.wait(url)
+        timer = self.metrics.timer("dimensions") if self.metrics is not None else contextlib.nullcontext()
+        with timer, self.client.stream(url, headers={"Range": f"bytes=0-{nbytes - 1}"},
+                                       timeout=self.timeout) as resp:
+            if resp.status_code not in (200, 206):
+                return resp.status_code, b"", None
+            head = b""
+            for chunk in resp.iter_content(chunk_size=min(nbytes, 64 * 1024)):
+                head += chunk
+                # A server ignoring Range sends the whole file: stop early (the
+                # connection is dropped instead of reused)
+                if resp.status_code == 200 and len(head) >= nbytes:
+                    break
+            with self._lock:
+                self.bytes_read += len(head)
+            return resp.status_code, head[:nbytes], content_size(resp)
+
+    def format_summary(self):
+        return (f"Dimensions: {self.probed} images probed ({self.bytes_read / 1024:.0f} KB read), "
+                f"{self.cached} from cache, {self.failed} failed")
@@ -0,0 +1,227 @@
+"""
+Content-addressed local store of product images, with resized variants.
+
+mirror-images.py downloads every product image from cesantoni.com.mx once
+into `<root>/objects/`, named after the SHA-256 of its bytes, so a render
+shared by several products (or published under several URLs) is stored a
+single time. Resized copies for the landing pages go to `<root>/variants/`,
+named after the original's digest, the width and the format, so they never
+have to be regenerated while the original is unchanged:
+
+    store = ImageStore("public/mirror")
+    with client.stream(url) as resp:
+        stored = store.put(resp.iter_content())
+    jobs = [(w, fmt, store.variant_path(stored.sha256, w, fmt)) for w in (320, 640) for fmt in ("webp", "jpg")]
+    make_variants(store.abspath(stored.path), jobs)
+
+`Manifest` (<root>/manifest.json) records what each URL resolved to (digest,
+ETag, Last-Modified), which variants exist per digest, and the resulting
+product -> image -> variant paths mapping the landing pages read. Paths are
+relative to the store root, which the server publishes under /mirror/.
+
+Resizing needs Pillow (`pip3 install Pillow`); `have_pillow()` tells whether
+it is installed. make_variants() is a plain module-level function so it can
+run in a ProcessPoolExecutor.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+# Magic numbers of the formats the site publishes
+SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+# Encoder settings per variant format (Pillow format name, save options)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+StoredImage = namedtuple("StoredImage", "sha256 path size new")
+
+
+def sniff_extension(head):
+    """File extension for the image whose first bytes are `head`, or None if not an image."""
+    for magic, ext in SIGNATURES:
+        if head.startswith(magic):
+            return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def have_pillow():
+    try:
+        import PIL.Image  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ImageStore:
+    """Images stored once per content digest under `root`."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "variants"), exist_ok=True)
+
+    def abspath(self, path):
+        return os.path.join(self.root, path)
+
+    def exists(self, path):
+        return path is not None and os.path.exists(self.abspath(path))
+
+    def object_path(self, sha256, ext):
+        return f"objects/{sha256[:2]}/{sha256}{ext}"
+
+    def variant_path(self, sha256, width, fmt):
+        return f"variants/{sha256[:2]}/{sha256}-{width}w.{fmt}"
+
+    def put(self, chunks):
+        """Store the bytes of `chunks` and return a StoredImage.
+
+        The body is hashed while it is written to a temporary file, then moved
+        to its content address; when that object already exists the copy is
+        dropped (`new` is False). Raises ValueError if the bytes are not a
+        JPEG, PNG, GIF or WebP image.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".download-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    if len(head) < 16:
+                        head += chunk[:16]
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            ext = sniff_extension(head)
+            if ext is None:
+                raise ValueError(f"not an image ({size} bytes starting with {head[:8]!r})")
+            sha256 = digest.hexdigest()
+            path = self.object_path(sha256, ext)
+            if os.path.exists(self.abspath(path)):
+                os.remove(tmp)
+                return StoredImage(sha256, path, size, False)
+            os.makedirs(os.path.dirname(self.abspath(path)), exist_ok=True)
+            os.replace(tmp, self.abspath(path))
+            return StoredImage(sha256, path, size, True)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+def make_variants(source, jobs):
+    """Write resized copies of the image at `source`.
+
+    `jobs` is a list of (width, format, destination) with format a key of
+    VARIANT_FORMATS. Images are never enlarged: a width above the original's
+    gets a copy at the original size. Returns [(width, format, bytes written)].
+    """
+    from PIL import Image
+
+    written = []
+    with Image.open(source) as original:
+        original.load()
+        for width, fmt, dest in jobs:
+            pil_format, options = VARIANT_FORMATS[fmt]
+            image = original
+            if original.width > width:
+                height = max(1, round(original.height * width / original.width))
+                image = original.resize((width, height), Image.LANCZOS)
+            if pil_format == "JPEG" and image.mode != "RGB":
+                image = _flatten(image)
+            elif image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            tmp = dest + ".tmp"
+            image.save(tmp, pil_format, **options)
+            os.replace(tmp, dest)
+            written.append((width, fmt, os.path.getsize(dest)))
+    return written
+
+
+def _flatten(image):
+    """RGB copy of `image` with any transparency composited over white (for JPEG)."""
+    from PIL import Image
+
+    rgba = image.convert("RGBA")
+    background = Image.new("RGB", rgba.size, (255, 255, 255))
+    background.paste(rgba, mask=rgba.getchannel("A"))
+    return background
+
+
+class Manifest:
+    """The store's index: URLs -> originals, originals -> variants, products -> both.
+
+    {"images":   {url: {"sha256", "path", "size", "etag", "last_modified"}},
+     "variants": {sha256: {"<width>w.<fmt>": path}},
+     "products": {slug: [{"url", "original", "variants": {fmt: {width: path}}}]}}
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.images = {}
+        self.variants = {}
+        self.products = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.images = data.get("images", {})
+            self.variants = data.get("variants", {})
+            self.products = data.get("products", {})
+
+    def image(self, url):
+        return self.images.get(url)
+
+    def set_image(self, url, stored, etag=None, last_modified=None):
+        with self._lock:
+            self.images[url] = {"sha256": stored.sha256, "path": stored.path, "size": stored.size,
+                                "etag": etag, "last_modified": last_modified}
+
+    def variant(self, sha256, width, fmt):
+        return self.variants.get(sha256, {}).get(f"{width}w.{fmt}")
+
+    def set_variant(self, sha256, width, fmt, path):
+        with self._lock:
+            self.variants.setdefault(sha256, {})[f"{width}w.{fmt}"] = path
+
+    def link_products(self, product_urls, widths, formats):
+        """Rebuild the products section from {slug: [image urls]}; unknown URLs are left out."""
+        products = {}
+        for slug, urls in product_urls.items():
+            entries = []
+            for url in urls:
+                image = self.images.get(url)
+                if image is None:
+                    continue
+                variants = {}
+                for fmt in formats:
+                    paths = {str(w): self.variant(image["sha256"], w, fmt) for w in widths}
+                    paths = {w: p for w, p in paths.items() if p}
+                    if paths:
+                        variants[fmt] = paths
+                entries.append({"url": url, "original": image["path"], "variants": variants})
+            products[slug] = entries
+        self.products = products
+
+    def save(self):
+        """Write the manifest atomically (a crash never leaves half a file)."""
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"images": self.images, "variants": self.variants, "products": self.products},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
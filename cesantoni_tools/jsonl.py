@@ -0,0 +1,135 @@
+"""
+Streaming JSON Lines output for the scrapers.
+
+`JsonlWriter` appends one product per line as soon as it is scraped, flushing
+every line and fsyncing periodically, so a crash loses at most the products
+still in flight. With concurrent crawls, `write_at(index, obj)` holds results
+that finish early until every earlier index has been written, so the file is
+always in input order and never holds more than the in-flight window.
+
+`compact()` turns a JSONL file into the JSON array the rest of the tooling
+expects, byte-identical to `json.dump(items, f, ensure_ascii=False, indent=2)`,
+one line at a time; `write_array()` does the same for any iterable.
+`iter_jsonl()` reads a stream back lazily and `iter_products()` accepts
+either format.
+"""
+
+import json
+import os
+import threading
+import time
+
+
+class JsonlWriter:
+    """Append-only JSONL writer with periodic fsync and in-order writes."""
+
+    def __init__(self, path, fsync_every=20, fsync_interval=5.0, append=False):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.written = 0
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._next_index = 0
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def write(self, obj):
+        """Append `obj` as one line right away."""
+        with self._lock:
+            self._write_line(obj)
+
+    def write_at(self, index, obj):
+        """Write the result for position `index` once all earlier ones are written.
+
+        Every index from 0 up must be reported exactly once; `obj=None` marks a
+        position with nothing to write (e.g. a failed product).
+        """
+        with self._lock:
+            self._pending[index] = obj
+            while self._next_index in self._pending:
+                item = self._pending.pop(self._next_index)
+                self._next_index += 1
+                if item is not None:
+                    self._write_line(item)
+
+    def _write_line(self, obj):
+        self._file.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.written += 1
+        self._unsynced += 1
+        if (self._unsynced >= self.fsync_every
+                or time.monotonic() - self._synced_at >= self.fsync_interval):
+            self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            for index in sorted(self._pending):
+                if self._pending[index] is not None:
+                    self._write_line(self._pending[index])
+            self._pending.clear()
+            self._file.flush()
+            self._sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_jsonl(path):
+    """Yield one object per line. A truncated last line (crash mid-write) is skipped."""
+    with open(path, encoding="utf-8") as f:
+        previous = None
+        for line in f:
+            if previous is not None:
+                yield json.loads(previous)
+            previous = line if line.strip() else None
+        if previous is not None:
+            try:
+                yield json.loads(previous)
+            except json.JSONDecodeError:
+                if previous.endswith("\n"):
+                    raise
+
+
+def iter_products(path):
+    """Products of a .jsonl stream (lazy iterator) or of a JSON array file (a list)."""
+    if path.endswith(".jsonl"):
+        return iter_jsonl(path)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_array(items, json_path):
+    """Write `items` as a JSON array (same bytes as json.dump indent=2), one at a time.
+
+    The array is written to a temporary file and moved into place, so an
+    existing `json_path` is only replaced by a complete file (and may still be
+    read while `items` is being produced). Returns the number of items written.
+    """
+    tmp = json_path + ".tmp"
+    count = 0
+    with open(tmp, "w", encoding="utf-8") as out:
+        for item in items:
+            body = json.dumps(item, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            out.write(("[\n  " if count == 0 else ",\n  ") + body)
+            count += 1
+        out.write("\n]" if count else "[]")
+    os.replace(tmp, json_path)
+    return count
+
+
+def compact(jsonl_path, json_path):
+    """Write the JSONL stream as a JSON array; see write_array(). Returns the count."""
+    return write_array(iter_jsonl(jsonl_path), json_path)
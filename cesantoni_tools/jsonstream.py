@@ -0,0 +1,89 @@
+"""
+Incremental parsing of a large JSON array.
+
+The Render API answers /api/products with the whole catalog as one JSON array.
+`iter_json_array()` decodes it element by element while the bytes are still
+arriving, so the caller can start working on the first products before the
+last ones are downloaded, and never holds the whole document as one string:
+
+    with client.stream(API_URL) as resp:
+        for product in iter_json_array(resp.iter_content()):
+            ...
+
+Only the top-level array is split; each element is decoded with the stdlib
+decoder (`json.JSONDecoder.raw_decode`), so the elements are exactly what
+`json.loads` would have returned.
+"""
+
+import codecs
+import json
+
+WHITESPACE = " \t\n\r"
+
+_decoder = json.JSONDecoder()
+
+
+def iter_json_array(chunks, encoding="utf-8"):
+    """Yield the elements of the JSON array read from an iterable of byte chunks.
+
+    Raises ValueError if the document is not an array or ends early.
+    """
+    text = codecs.getincrementaldecoder(encoding)()
+    buf = ""
+    pos = 0
+    started = False
+    first = True
+    finished = False
+    chunks = iter(chunks)
+    while True:
+        chunk = next(chunks, None)
+        eof = chunk is None
+        buf = buf[pos:] + (text.decode(b"", final=True) if eof else text.decode(chunk))
+        pos = 0
+        if not started:
+            pos = _skip(buf, pos)
+            if pos == len(buf):
+                if eof:
+                    raise ValueError("empty document, expected a JSON array")
+                continue
+            if buf[pos] != "[":
+                raise ValueError(f"expected a JSON array, got {buf[pos]!r}")
+            started = True
+            pos += 1
+        while not finished:
+            pos = _skip(buf, pos)
+            if pos == len(buf):
+                break
+            if first and buf[pos] == "]":
+                finished = True
+                break
+            try:
+                item, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError(f"truncated or invalid JSON array at offset {pos}") from None
+                break
+            # A number cut in two ("2." + "5") decodes as its first half; only
+            # trust an element once the ',' or ']' after it has arrived
+            after = _skip(buf, end)
+            if not eof and (after == len(buf) or buf[after] not in ",]"):
+                break
+            yield item
+            first = False
+            pos = after
+            if buf.startswith(",", pos):
+                pos += 1
+            elif buf.startswith("]", pos):
+                finished = True
+            else:
+                raise ValueError(f"expected ',' or ']' at offset {pos} of the JSON array")
+        if finished or eof:
+            break
+    if not finished:
+        raise ValueError("JSON array ended before its closing ']'")
+
+
+def _skip(buf, pos):
+    while pos < len(buf) and buf[pos] in WHITESPACE:
+        pos += 1
+    return pos
@@ -0,0 +1,147 @@
+"""
+Lightweight run instrumentation: per-phase timers, latency histograms, counters.
+
+The scrapers wrap each phase (fetch, parse, probe, write, sleep...) in a timer
+and HttpClient splits every request into DNS, TCP connect, TLS, server time
+(time to first byte) and body download. At the end of a run the data is
+written as a JSON report next to the output and printed as a table, so a slow
+run can be attributed to the right phase.
+
+    metrics = Metrics()
+    with metrics.timer("parse"):
+        product = extract_product(html, url)
+    metrics.count("products")
+    metrics.write_json("productos_cesantoni.metrics.json", extra={"http": client.summary()})
+    print(metrics.format_table())
+
+`profile_to(path)` is the matching cProfile helper for --profile.
+"""
+
+import bisect
+import contextlib
+import cProfile
+import json
+import math
+import threading
+import time
+
+# Histogram bucket upper bounds, in milliseconds (the last bucket is open-ended)
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list (0 <= fraction <= 1)."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class Metrics:
+    """Thread-safe collection of phase durations and counters for one run."""
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._samples = {}
+        self.counters = {}
+        self.started = time.time()
+        self._start = clock()
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.observe(phase, self._clock() - start)
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            self._samples.setdefault(phase, []).append(seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def elapsed(self):
+        return self._clock() - self._start
+
+    def phase_stats(self):
+        """{phase: {count, total, mean, p50, p90, p99, max, histogram}} with times in seconds."""
+        with self._lock:
+            samples = {phase: sorted(values) for phase, values in self._samples.items()}
+        stats = {}
+        for phase, values in samples.items():
+            histogram = [0] * (len(BUCKETS_MS) + 1)
+            for value in values:
+                histogram[bisect.bisect_left(BUCKETS_MS, value * 1000)] += 1
+            total = sum(values)
+            stats[phase] = {
+                "count": len(values),
+                "total": round(total, 6),
+                "mean": round(total / len(values), 6),
+                "p50": round(percentile(values, 0.50), 6),
+                "p90": round(percentile(values, 0.90), 6),
+                "p99": round(percentile(values, 0.99), 6),
+                "max": round(values[-1], 6),
+                "histogram": {label: n for label, n in zip(_bucket_labels(), histogram) if n},
+            }
+        return stats
+
+    def report(self, extra=None):
+        wall = self.elapsed()
+        with self._lock:
+            counters = dict(self.counters)
+        requests = counters.get("requests", 0)
+        report = {
+            "started_at": self.started,
+            "wall_time": round(wall, 6),
+            "requests_per_second": round(requests / wall, 3) if wall else 0.0,
+            "counters": counters,
+            "phases": self.phase_stats(),
+        }
+        report.update(extra or {})
+        return report
+
+    def write_json(self, path, extra=None):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(extra), f, indent=2, ensure_ascii=False)
+
+    def format_table(self):
+        wall = self.elapsed()
+        stats = self.phase_stats()
+        lines = [f"{'phase':<14} {'count':>6} {'total s':>8} {'mean ms':>8} {'p50 ms':>8} "
+                 f"{'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+        for phase, s in sorted(stats.items(), key=lambda kv: -kv[1]["total"]):
+            lines.append(f"{phase:<14} {s['count']:>6} {s['total']:>8.2f} {s['mean'] * 1000:>8.1f} "
+                         f"{s['p50'] * 1000:>8.1f} {s['p90'] * 1000:>8.1f} {s['p99'] * 1000:>8.1f} "
+                         f"{s['max'] * 1000:>8.1f}")
+        with self._lock:
+            counters = dict(self.counters)
+        requests = counters.get("requests", 0)
+        rate = requests / wall if wall else 0.0
+        lines.append(f"wall {wall:.2f}s, {requests} requests ({rate:.1f}/s), "
+                     f"{counters.get('bytes', 0) / 1024:.0f} KB")
+        return "\n".join(lines)
+
+
+def _bucket_labels():
+    labels = [f"<={bound}ms" for bound in BUCKETS_MS]
+    labels.append(f">{BUCKETS_MS[-1]}ms")
+    return labels
+
+
+@contextlib.contextmanager
+def profile_to(path):
+    """Run the block under cProfile and dump the stats to `path` (None disables it)."""
+    if not path:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
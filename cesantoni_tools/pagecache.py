@@ -0,0 +1,181 @@
+"""
+On-disk conditional-GET cache for product pages.
+
+Pages are stored in a small SQLite file keyed by URL, together with their
+ETag / Last-Modified validators. `PageCache.fetch()` revalidates with
+If-None-Match / If-Modified-Since and, on a 304, hands back the stored body,
+so an unchanged catalog costs a handful of header-only round trips. Callers
+can also keep the product they extracted from a page (`get_extracted` /
+`set_extracted`) and skip re-parsing it when the page has not changed.
+
+The cache is bounded by total body size; least recently used pages are
+evicted first.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cesantoni_tools.httpclient import Response
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.path.join(ROOT, ".cache", "pages.sqlite")
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    headers TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    extracted TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages(accessed_at);
+"""
+
+
+class PageCache:
+    """URL -> body cache with HTTP validators and size-bounded LRU eviction."""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES, max_age=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        # Entries younger than max_age seconds are served without any request
+        self.max_age = max_age
+        self.stats = {"fresh": 0, "revalidated": 0, "miss": 0, "stored": 0,
+                      "evicted": 0, "bytes_saved": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --- HTTP -----------------------------------------------------------
+
+    def fetch(self, client, url, **kwargs):
+        """GET `url` through `client`, revalidating against the cached copy.
+
+        The returned Response has `from_cache` set to "fresh" (no request
+        made), "revalidated" (server answered 304) or None (network body).
+        """
+        entry = self._entry(url)
+        now = time.time()
+        if entry and self.max_age is not None and now - entry["fetched_at"] < self.max_age:
+            self._touch(url, now)
+            self._bump("fresh")
+            self._bump("bytes_saved", entry["size"])
+            return self._response(url, entry, "fresh")
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        resp = client.get(url, headers=headers, **kwargs)
+
+        if resp.status_code == 304 and entry:
+            self._revalidated(url, resp, now)
+            self._bump("revalidated")
+            self._bump("bytes_saved", entry["size"])
+            return self._response(url, entry, "revalidated")
+
+        self._bump("miss")
+        if resp.status_code == 200:
+            self._store(url, resp, now)
+        return resp
+
+    # --- extracted data -------------------------------------------------
+
+    def get_extracted(self, url):
+        """Return the data stored with set_extracted() for the cached body, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT extracted FROM pages WHERE url = ?", (url,)).fetchone()
+        if row and row[0]:
+            return json.loads(row[0])
+        return None
+
+    def set_extracted(self, url, data):
+        with self._lock:
+            self._db.execute("UPDATE pages SET extracted = ? WHERE url = ?",
+                             (json.dumps(data, ensure_ascii=False), url))
+            self._db.commit()
+
+    def format_summary(self):
+        s = self.stats
+        return (f"Cache: {s['fresh']} fresh, {s['revalidated']} not modified (304), "
+                f"{s['miss']} downloaded, {s['evicted']} evicted, "
+                f"{s['bytes_saved'] / 1024:.0f} KB not re-downloaded")
+
+    # --- internals ------------------------------------------------------
+
+    def _entry(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, headers, etag, last_modified, size, fetched_at FROM pages WHERE url = ?",
+                (url,)).fetchone()
+        if not row:
+            return None
+        return {"body": row[0], "headers": json.loads(row[1] or "{}"), "etag": row[2],
+                "last_modified": row[3], "size": row[4], "fetched_at": row[5]}
+
+    def _response(self, url, entry, source):
+        resp = Response(url, 200, entry["headers"], entry["body"])
+        resp.from_cache = source
+        return resp
+
+    def _store(self, url, resp, now):
+        body = resp.content
+        headers = {"Content-Type": resp.headers.get("Content-Type", "")}
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, body, headers, etag, last_modified, size, fetched_at, accessed_at, extracted) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+                (url, body, json.dumps(headers), resp.headers.get("ETag"),
+                 resp.headers.get("Last-Modified"), len(body), now, now))
+            self._evict()
+            self._db.commit()
+        self._bump("stored")
+
+    def _revalidated(self, url, resp, now):
+        # A 304 may carry updated validators
+        with self._lock:
+            self._db.execute(
+                "UPDATE pages SET fetched_at = ?, accessed_at = ?, "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (now, now, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), url))
+            self._db.commit()
+
+    def _touch(self, url, now):
+        with self._lock:
+            self._db.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (now, url))
+            self._db.commit()
+
+    def _evict(self):
+        """Drop least recently used pages until the total size fits in max_bytes."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT url, size FROM pages ORDER BY accessed_at").fetchall()
+        doomed = []
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((url,))
+            total -= size
+        self._db.executemany("DELETE FROM pages WHERE url = ?", doomed)
+        self.stats["evicted"] += len(doomed)
+
+    def _bump(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
@@ -0,0 +1,171 @@
+"""
+Two-stage fetch/parse pipeline: I/O threads download, a process pool parses.
+
+With concurrent fetching, parsing the pages on the same threads makes the GIL
+the bottleneck: while one thread walks a BeautifulSoup tree, the others
+cannot even read their sockets. `ParsePipeline` splits the two:
+
+    fetch threads --(bounded queue)--> dispatcher --> ProcessPoolExecutor --> emit
+
+Fetch threads (crawl() with its concurrency and HostThrottle) put raw pages
+on a bounded queue and block while it is full, and at most two jobs per
+worker process are in flight, so a slow parse stage holds back the downloads
+instead of piling pages up in memory. Results are handed to `emit` as they
+complete, in any order; the scraper's JsonlWriter.write_at() restores input
+order.
+
+    pipeline = ParsePipeline(parse_fn, workers=4, metrics=metrics)
+    pipeline.run(urls, fetch, emit, concurrency=8, throttle=throttle)
+    print(pipeline.format_summary())
+
+`fetch(index, item)` returns (True, result) when the item needs no parsing
+(e.g. unchanged since the last run, or failed) and (False, args) to have
+`parse_fn(*args)` run in a worker; `emit(index, result, error)` gets the
+parse's return value, or the exception it raised as `error`. `parse_fn` must
+be picklable (a module-level function or a functools.partial of one).
+"""
+
+import os
+import queue
+import threading
+import time
+
+from .crawl import crawl
+
+_END = object()
+
+
+def _timed_call(fn, args):
+    """Runs in the worker: fn(*args) and the wall time it took there."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class ParsePipeline:
+    """Fetch on threads, parse in `workers` processes, with backpressure in between."""
+
+    def __init__(self, parse, workers=None, queue_size=None, metrics=None):
+        self.parse = parse
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size or 2 * self.workers
+        self.metrics = metrics
+        self.fetched = 0
+        self.skipped = 0
+        self.parsed = 0
+        self.parse_errors = 0
+        self.fetch_seconds = 0.0
+        self.parse_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.max_queued = 0
+        self.wall_seconds = 0.0
+        self.parse_cpu_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def run(self, items, fetch, emit, concurrency=1, throttle=None):
+        pending = queue.Queue(maxsize=self.queue_size)
+        # Jobs handed to the pool but not finished: the pool's own queue is unbounded
+        slots = threading.BoundedSemaphore(2 * self.workers)
+        cpu_before = os.times()
+        start = time.perf_counter()
+        # Not at module level: multiprocessing is only worth loading when --parse-workers is used
+        from concurrent.futures import ProcessPoolExecutor
+
+        def done(index, future):
+            slots.release()
+            try:
+                result, seconds = future.result()
+            except Exception as e:
+                with self._lock:
+                    self.parse_errors += 1
+                emit(index, None, e)
+                return
+            with self._lock:
+                self.parsed += 1
+                self.parse_seconds += seconds
+            if self.metrics is not None:
+                self.metrics.observe("parse", seconds)
+            emit(index, result, None)
+
+        def dispatch(pool):
+            while True:
+                job = pending.get()
+                if job is _END:
+                    return
+                index, args = job
+                slots.acquire()
+                try:
+                    future = pool.submit(_timed_call, self.parse, args)
+                except Exception as e:  # e.g. BrokenProcessPool: keep draining the queue
+                    slots.release()
+                    with self._lock:
+                        self.parse_errors += 1
+                    emit(index, None, e)
+                    continue
+                future.add_done_callback(lambda f, index=index: done(index, f))
+
+        def fetch_stage(index, item):
+            began = time.perf_counter()
+            finished, value = fetch(index, item)
+            fetched = time.perf_counter()
+            with self._lock:
+                self.fetched += 1
+                self.fetch_seconds += fetched - began
+            if finished:
+                with self._lock:
+                    self.skipped += 1
+                emit(index, value, None)
+                return
+            # Blocks while the parse stage is behind: that is the backpressure
+            pending.put((index, value))
+            blocked = time.perf_counter() - fetched
+            with self._lock:
+                self.blocked_seconds += blocked
+                self.max_queued = max(self.max_queued, pending.qsize())
+            if self.metrics is not None:
+                self.metrics.observe("queue.wait", blocked)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            dispatcher = threading.Thread(target=dispatch, args=(pool,), daemon=True)
+            dispatcher.start()
+            try:
+                crawl(items, fetch_stage, concurrency=concurrency, throttle=throttle)
+            finally:
+                pending.put(_END)
+                dispatcher.join()
+        # The workers have exited and been waited for, so their CPU time is counted
+        cpu_after = os.times()
+        self.wall_seconds = time.perf_counter() - start
+        self.parse_cpu_seconds = ((cpu_after.children_user - cpu_before.children_user)
+                                  + (cpu_after.children_system - cpu_before.children_system))
+
+    def summary(self):
+        wall = self.wall_seconds or 1e-9
+        return {
+            "cores": os.cpu_count(),
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "cores_used": round(self.parse_cpu_seconds / wall, 2),
+            "fetch": {"items": self.fetched, "busy_seconds": round(self.fetch_seconds, 3),
+                      "per_second": round(self.fetched / wall, 1),
+                      "blocked_seconds": round(self.blocked_seconds, 3),
+                      "max_queued": self.max_queued},
+            "parse": {"items": self.parsed, "errors": self.parse_errors,
+                      "busy_seconds": round(self.parse_seconds, 3),
+                      "cpu_seconds": round(self.parse_cpu_seconds, 3),
+                      "per_second": round(self.parsed / wall, 1)},
+        }
+
+    def format_summary(self):
+        s = self.summary()
+        fetch, parse = s["fetch"], s["parse"]
+        return "\n".join([
+            f"Pipeline: {s['workers']} parse processes on {s['cores']} cores, "
+            f"{s['cores_used']:.1f} cores busy parsing on average",
+            f"  fetch  {fetch['items']:>7} pages  {fetch['per_second']:>8.1f}/s  "
+            f"(blocked {fetch['blocked_seconds']:.1f}s on a full queue, max {fetch['max_queued']}/{s['queue_size']})",
+            f"  parse  {parse['items']:>7} pages  {parse['per_second']:>8.1f}/s  "
+            f"({parse['busy_seconds']:.1f}s in workers, {parse['errors']} errors, "
+            f"{self.skipped} unchanged or failed before parsing)",
+        ])
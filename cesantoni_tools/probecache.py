@@ -0,0 +1,173 @@
+"""
+Persistent cache of URL probe results (does this upload exist?).
+
+The tile-image scraper probes the same constructed WordPress upload URLs on
+every run, most of which never exist. `ProbeCache` remembers each answer in
+.cache/probes.sqlite with its status and timestamp; hits and misses expire
+after separate TTLs, so re-runs only probe URLs that are new or stale.
+
+Only definite answers are stored: 2xx means "exists", 4xx means "missing".
+Server errors and network failures are transient and always re-probed.
+
+`PatternStats` keeps, in the same file, how often each URL naming pattern
+actually hit, so candidates can be tried best-first and dead patterns pruned.
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.path.join(ROOT, ".cache", "probes.sqlite")
+DEFAULT_HIT_TTL = 30 * 86400
+DEFAULT_MISS_TTL = 7 * 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    url TEXT PRIMARY KEY,
+    exists_ INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    checked_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pattern_stats (
+    pattern TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    hits INTEGER NOT NULL
+);
+"""
+
+
+class ProbeCache:
+    """URL -> exists/missing with separate TTLs for positive and negative answers."""
+
+    def __init__(self, path=DEFAULT_PATH, hit_ttl=DEFAULT_HIT_TTL, miss_ttl=DEFAULT_MISS_TTL):
+        self.path = path
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.stats = {"cached_hits": 0, "cached_misses": 0, "probed": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, url, now=None):
+        """True/False if a fresh answer is cached for `url`, otherwise None."""
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._db.execute("SELECT exists_, checked_at FROM probes WHERE url = ?",
+                                   (url,)).fetchone()
+            if row is None:
+                return None
+            exists, checked_at = bool(row[0]), row[1]
+            ttl = self.hit_ttl if exists else self.miss_ttl
+            if now - checked_at >= ttl:
+                return None
+            self.stats["cached_hits" if exists else "cached_misses"] += 1
+            return exists
+
+    def put(self, url, status, now=None):
+        """Record the probe status for `url` (ignored unless it is a 2xx or 4xx)."""
+        with self._lock:
+            self.stats["probed"] += 1
+            if status is None or not (200 <= status < 300 or 400 <= status < 500):
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO probes (url, exists_, status, checked_at) VALUES (?, ?, ?, ?)",
+                (url, int(200 <= status < 300), status, time.time() if now is None else now))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def format_summary(self):
+        s = self.stats
+        cached = s["cached_hits"] + s["cached_misses"]
+        return (f"Probe cache: {cached} answered from cache ({s['cached_hits']} exist, "
+                f"{s['cached_misses']} missing), {s['probed']} probed over the network")
+
+
+class PatternStats:
+    """Hit statistics per candidate pattern, used to order and prune probes.
+
+    Candidates are ranked by their pattern's smoothed success rate (ties keep
+    the original order); the prior puts an unseen pattern at 10%, so proven
+    patterns go first but new ones are still tried before known-bad ones.
+    Patterns that have been tried at least `min_attempts` times with a
+    success rate below `prune_below` are dropped, except that each dropped
+    candidate is still kept, at the end, with probability `explore` so a
+    pattern that starts working again can recover.
+    """
+
+    PRIOR_HITS = 0.5
+    PRIOR_ATTEMPTS = 5
+
+    def __init__(self, path=DEFAULT_PATH, prune_below=0.01, min_attempts=25, explore=0.1,
+                 rng=None):
+        self.path = path
+        self.prune_below = prune_below
+        self.min_attempts = min_attempts
+        self.explore = explore
+        self.probes = 0
+        self._rng = rng or random.Random()
+        self._stats = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path)
+        try:
+            db.executescript(SCHEMA)
+            for pattern, attempts, hits in db.execute(
+                    "SELECT pattern, attempts, hits FROM pattern_stats"):
+                self._stats[pattern] = [attempts, hits]
+        finally:
+            db.close()
+
+    def record(self, pattern, hit):
+        with self._lock:
+            entry = self._stats.setdefault(pattern, [0, 0])
+            entry[0] += 1
+            entry[1] += int(bool(hit))
+            self.probes += 1
+
+    def rate(self, pattern):
+        attempts, hits = self._stats.get(pattern, (0, 0))
+        return (hits + self.PRIOR_HITS) / (attempts + self.PRIOR_ATTEMPTS)
+
+    def rank(self, candidates):
+        """Order (pattern, url) candidates best-first and prune the hopeless ones."""
+        with self._lock:
+            ranked = sorted(candidates, key=lambda c: -self.rate(c[0]))
+            kept, explored = [], []
+            for candidate in ranked:
+                attempts, hits = self._stats.get(candidate[0], (0, 0))
+                if attempts >= self.min_attempts and hits / attempts < self.prune_below:
+                    if self._rng.random() < self.explore:
+                        explored.append(candidate)
+                else:
+                    kept.append(candidate)
+            return kept + explored
+
+    def save(self):
+        with self._lock:
+            rows = [(p, a, h) for p, (a, h) in self._stats.items()]
+        db = sqlite3.connect(self.path)
+        try:
+            db.executemany(
+                "INSERT OR REPLACE INTO pattern_stats (pattern, attempts, hits) VALUES (?, ?, ?)",
+                rows)
+            db.commit()
+        finally:
+            db.close()
+
+    def format_table(self):
+        lines = [f"{'pattern':<24} {'tries':>6} {'hits':>5} {'rate':>6}"]
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda kv: -self.rate(kv[0]))
+        for pattern, (attempts, hits) in items:
+            rate = hits / attempts if attempts else 0.0
+            lines.append(f"{pattern:<24} {attempts:>6} {hits:>5} {rate:>6.1%}")
+        return "\n".join(lines)
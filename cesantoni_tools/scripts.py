@@ -0,0 +1,39 @@
+"""
+Load the hyphen-named scripts (scraper-cesantoni.py, ...) as modules.
+
+The scripts are run directly with `python3 <script>.py`, so their file names
+are not importable; the cesantoni-tools CLI (cli.py) and the benchmarks use
+`load_script()` to reach their functions.
+`run_in_script()` does the same from a worker process, where a function of a
+script cannot be pickled by reference.
+"""
+
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = {
+    "scraper": os.path.join(ROOT, "scraper-cesantoni.py"),
+    "importer": os.path.join(ROOT, "import-products.py"),
+    "tiles": os.path.join(ROOT, "scripts", "scrape-tile-images.py"),
+    "mirror": os.path.join(ROOT, "mirror-images.py"),
+}
+
+
+def load_script(name):
+    """Import one of SCRIPTS by short name and return the module (cached in sys.modules)."""
+    module_name = f"cesantoni_tools._script_{name}"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPTS[name])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_in_script(name, function, *args):
+    """Call `function(*args)` from script `name`; picklable, e.g. as partial(run_in_script, ...)."""
+    return getattr(load_script(name), function)(*args)
@@ -0,0 +1,201 @@
+"""
+Sitemap-driven product discovery.
+
+Reads the site's WordPress sitemap index (Yoast `sitemap_index.xml` or core
+`wp-sitemap.xml`), follows only the product sitemaps and compares every
+`<url>` with the `<lastmod>` seen on the previous run, kept in
+.cache/sitemap.sqlite. Only new or modified product pages are queued, so a
+nightly run is proportional to what changed rather than to catalog size:
+
+    state = SitemapState()
+    found = discover(fetch, SITEMAP_URL, state)
+    ... scrape [e.loc for e in found.queued] ...
+    commit(state, found, succeeded_urls)
+
+Sitemaps are parsed incrementally (XMLPullParser, elements are dropped as
+soon as they are read) and may be gzipped. A child sitemap whose own
+`<lastmod>` in the index has not moved since it was last fully processed is
+not fetched at all. Entries without `<lastmod>` cannot be compared and are
+always queued (the page cache makes re-fetching them cheap).
+
+`commit()` only records the lastmod of pages that were scraped successfully,
+and a child sitemap's lastmod only once all its queued pages succeeded, so
+failures are retried on the next run.
+"""
+
+import gzip
+import itertools
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from dataclasses import dataclass, field
+from xml.etree.ElementTree import XMLPullParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.path.join(ROOT, ".cache", "sitemap.sqlite")
+
+CHUNK = 64 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sitemap_entries (
+    loc TEXT PRIMARY KEY,
+    lastmod TEXT,
+    source TEXT NOT NULL,
+    seen_at REAL NOT NULL
+);
+"""
+
+# kind is "sitemap" (a child of a sitemap index) or "url" (a page)
+Entry = namedtuple("Entry", "kind loc lastmod source")
+
+
+def is_product_sitemap(loc):
+    return "product" in loc.rsplit("/", 1)[-1]
+
+
+def is_product_url(loc):
+    return "/producto/" in loc
+
+
+def iter_sitemap(data, source=""):
+    """Yield the Entry records of a sitemap or sitemap index document (bytes)."""
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    parser = XMLPullParser(events=("end",))
+    for start in range(0, len(data), CHUNK):
+        parser.feed(data[start:start + CHUNK])
+        yield from _drain(parser, source)
+    parser.close()
+    yield from _drain(parser, source)
+
+
+def _drain(parser, source):
+    for _, elem in parser.read_events():
+        tag = elem.tag.rsplit("}", 1)[-1]
+        if tag not in ("url", "sitemap"):
+            continue
+        loc = lastmod = None
+        for child in elem:
+            name = child.tag.rsplit("}", 1)[-1]
+            if name == "loc":
+                loc = (child.text or "").strip()
+            elif name == "lastmod":
+                lastmod = (child.text or "").strip() or None
+        elem.clear()
+        if loc:
+            yield Entry("sitemap" if tag == "sitemap" else "url", loc, lastmod, source)
+
+
+class SitemapState:
+    """lastmod of every sitemap and product URL as of the last successful run."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+
+    def load(self):
+        """{loc: (lastmod, source)} for everything recorded."""
+        return {loc: (lastmod, source) for loc, lastmod, source in self._db.execute(
+            "SELECT loc, lastmod, source FROM sitemap_entries")}
+
+    def mark(self, entries):
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO sitemap_entries (loc, lastmod, source, seen_at) VALUES (?, ?, ?, ?)",
+            [(e.loc, e.lastmod, e.source, now) for e in entries])
+        self._db.commit()
+
+    def forget(self, locs):
+        self._db.executemany("DELETE FROM sitemap_entries WHERE loc = ?", [(loc,) for loc in locs])
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+@dataclass
+class Discovery:
+    queued: list = field(default_factory=list)      # new or modified product Entry
+    new: int = 0
+    modified: int = 0
+    unchanged: int = 0
+    removed: list = field(default_factory=list)     # product URLs gone from the sitemap
+    sitemaps: list = field(default_factory=list)    # child sitemap Entry fetched this run
+    skipped: list = field(default_factory=list)     # child sitemaps unchanged since last run
+    failed: list = field(default_factory=list)      # sitemap URLs that could not be fetched
+
+    def format_summary(self):
+        return (f"Sitemap: {len(self.queued)} queued ({self.new} new, {self.modified} modified), "
+                f"{self.unchanged} unchanged, {len(self.removed)} removed | "
+                f"{len(self.sitemaps)} sitemaps read, {len(self.skipped)} skipped as unchanged"
+                + (f", {len(self.failed)} failed" if self.failed else ""))
+
+
+def discover(fetch, index_url, state, product_sitemap=is_product_sitemap, product_url=is_product_url):
+    """Diff the product sitemaps under `index_url` against `state`.
+
+    `fetch(url)` returns the document bytes or None. Nothing is written to
+    `state` here; see commit().
+    """
+    found = Discovery()
+    data = fetch(index_url)
+    if data is None:
+        found.failed.append(index_url)
+        return found
+    known = state.load()
+
+    entries = iter_sitemap(data, source=index_url)
+    first = next(entries, None)
+    if first is None or first.kind == "url":
+        # Not an index: the document itself is the product sitemap
+        found.sitemaps.append(Entry("sitemap", index_url, None, ""))
+        _read_urls(found, known, itertools.chain([first] if first else [], entries),
+                   index_url, product_url)
+        return found
+
+    children = [e for e in itertools.chain([first], entries)
+                if e.kind == "sitemap" and product_sitemap(e.loc)]
+    for child in children:
+        previous = known.get(child.loc)
+        if previous and child.lastmod is not None and previous[0] == child.lastmod:
+            found.skipped.append(child)
+            found.unchanged += sum(1 for _, source in known.values() if source == child.loc)
+            continue
+        data = fetch(child.loc)
+        if data is None:
+            found.failed.append(child.loc)
+            continue
+        found.sitemaps.append(child)
+        _read_urls(found, known, iter_sitemap(data, source=child.loc), child.loc, product_url)
+    return found
+
+
+def _read_urls(found, known, entries, source, product_url):
+    seen = set()
+    for entry in entries:
+        if entry.kind != "url" or not product_url(entry.loc):
+            continue
+        seen.add(entry.loc)
+        previous = known.get(entry.loc)
+        if previous is None:
+            found.new += 1
+        elif entry.lastmod is None or previous[0] != entry.lastmod:
+            found.modified += 1
+        else:
+            found.unchanged += 1
+            continue
+        found.queued.append(entry)
+    found.removed.extend(sorted(loc for loc, (_, src) in known.items()
+                                if src == source and loc not in seen))
+
+
+def commit(state, found, succeeded):
+    """Record the pages in `succeeded` (URLs) and the sitemaps that are now fully done."""
+    succeeded = set(succeeded)
+    state.mark([e for e in found.queued if e.loc in succeeded])
+    state.forget(found.removed)
+    pending_sources = {e.source for e in found.queued if e.loc not in succeeded}
+    state.mark([s for s in found.sitemaps if s.source and s.loc not in pending_sources])
@@ -0,0 +1,191 @@
+"""
+Items streamed through a chain of bounded asyncio stages, finished in input order.
+
+scrape-tile-images.py used to run every strategy of one product, sleep, and
+only then look at the next product. `StagePipeline` keeps many items in
+flight instead, each moving through the stages on its own:
+
+    producer --(queue)--> stage 1 --(queue)--> stage 2 ... --> reorder buffer --> emit
+
+Every stage is a blocking function run on a shared thread pool (the
+HttpClient, caches and throttles are all thread-based), driven by
+`concurrency` asyncio workers per stage. The queues between stages hold at
+most `concurrency` items and at most `concurrency` items are in flight
+overall, so a slow stage holds back the producer instead of piling items up.
+Politeness stays with the HostThrottles the stages already call.
+
+    pipeline = StagePipeline([("page", by_page), ("probe", by_probe)], concurrency=8)
+    pipeline.run(products, emit, skip=already_done)
+    print(pipeline.format_summary())
+
+`step(item)` returns a true value when it finished the item, and the later
+stages are skipped; an exception also finishes it. `emit(index, item, error)`
+is called on the event loop thread strictly in input order, so it may print
+and update shared state without locks. `items` may block (e.g. a streamed
+feed): it is read on a thread, and an exception it raises stops the intake
+and is re-raised by run() once the items already read are finished.
+`skip(item)` true sends an item straight to emit, with no stage run.
+
+asyncio and concurrent.futures are imported by run(), so loading the module
+(and the script's --help) stays cheap.
+"""
+
+import time
+
+_END = object()
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.finished = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+
+
+class StagePipeline:
+    """Run items through `stages` ([(name, step)]) with `concurrency` items in flight."""
+
+    def __init__(self, stages, concurrency=8, metrics=None):
+        self.stages = list(stages)
+        self.concurrency = max(1, concurrency)
+        self.metrics = metrics
+        self.stats = [StageStats(name) for name, _ in self.stages]
+        self.items = 0
+        self.skipped = 0
+        self.max_in_flight = 0
+        self.max_reordered = 0
+        self.wall_seconds = 0.0
+
+    def run(self, items, emit, skip=None):
+        import asyncio
+
+        start = time.perf_counter()
+        try:
+            asyncio.run(self._run(iter(items), emit, skip))
+        finally:
+            self.wall_seconds = time.perf_counter() - start
+
+    async def _run(self, items, emit, skip):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        loop = asyncio.get_running_loop()
+        size = self.concurrency
+        # One queue in front of every stage, plus the sink's
+        queues = [asyncio.Queue(maxsize=size) for _ in range(len(self.stages) + 1)]
+        slots = asyncio.Semaphore(size)
+        in_flight = 0
+        # Finished items waiting for an earlier one: {index: (item, error)}
+        reorder = {}
+        next_index = 0
+        feed_error = None
+
+        with ThreadPoolExecutor(max_workers=size, thread_name_prefix="stage") as pool, \
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix="feed") as feed_pool:
+
+            async def produce():
+                nonlocal feed_error, in_flight
+                index = 0
+                while True:
+                    await slots.acquire()
+                    try:
+                        item = await loop.run_in_executor(feed_pool, next, items, _END)
+                    except Exception as e:
+                        feed_error = e
+                        item = _END
+                    if item is _END:
+                        slots.release()
+                        return
+                    in_flight += 1
+                    self.max_in_flight = max(self.max_in_flight, in_flight)
+                    self.items += 1
+                    if skip is not None and skip(item):
+                        self.skipped += 1
+                        await queues[-1].put((index, item, None))
+                    else:
+                        await queues[0].put((index, item, None))
+                    index += 1
+
+            async def work(position):
+                name, step = self.stages[position]
+                stats = self.stats[position]
+                while True:
+                    job = await queues[position].get()
+                    if job is _END:
+                        return
+                    index, item, _ = job
+                    began = time.perf_counter()
+                    try:
+                        finished = await loop.run_in_executor(pool, step, item)
+                        error = None
+                    except Exception as e:
+                        finished, error = True, e
+                    seconds = time.perf_counter() - began
+                    stats.items += 1
+                    stats.busy_seconds += seconds
+                    if self.metrics is not None:
+                        self.metrics.observe(f"stage.{name}", seconds)
+                    if error is not None:
+                        stats.errors += 1
+                    elif finished:
+                        stats.finished += 1
+                    # A finished item skips the remaining stages; the sink's queue is the last one
+                    await queues[-1 if finished else position + 1].put((index, item, error))
+
+            async def sink():
+                nonlocal next_index, in_flight
+                while True:
+                    job = await queues[-1].get()
+                    if job is _END:
+                        return
+                    index, item, error = job
+                    reorder[index] = (item, error)
+                    self.max_reordered = max(self.max_reordered, len(reorder))
+                    while next_index in reorder:
+                        item, error = reorder.pop(next_index)
+                        emit(next_index, item, error)
+                        next_index += 1
+                        in_flight -= 1
+                        slots.release()
+
+            sink_task = asyncio.create_task(sink())
+            workers = [[asyncio.create_task(work(p)) for _ in range(size)]
+                       for p in range(len(self.stages))]
+            await produce()
+            # Drain stage by stage: once a stage's workers are done, nothing
+            # more can reach the next one
+            for position, stage_workers in enumerate(workers):
+                for _ in stage_workers:
+                    await queues[position].put(_END)
+                await asyncio.gather(*stage_workers)
+            await queues[-1].put(_END)
+            await sink_task
+        if feed_error is not None:
+            raise feed_error
+
+    def summary(self):
+        wall = self.wall_seconds or 1e-9
+        return {
+            "concurrency": self.concurrency,
+            "items": self.items,
+            "skipped": self.skipped,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "per_second": round(self.items / wall, 1),
+            "max_in_flight": self.max_in_flight,
+            "max_reordered": self.max_reordered,
+            "stages": {s.name: {"items": s.items, "finished": s.finished, "errors": s.errors,
+                                "busy_seconds": round(s.busy_seconds, 3)}
+                       for s in self.stats},
+        }
+
+    def format_summary(self):
+        s = self.summary()
+        lines = [f"Stages: {s['items']} items in {s['wall_seconds']:.1f}s ({s['per_second']:.1f}/s), "
+                 f"up to {s['max_in_flight']}/{s['concurrency']} in flight, "
+                 f"{s['skipped']} skipped"]
+        for stats in self.stats:
+            lines.append(f"  {stats.name:<8} {stats.items:>7} items  {stats.finished:>6} finished  "
+                         f"{stats.errors:>4} errors  {stats.busy_seconds:>8.1f}s busy")
+        return "\n".join(lines)
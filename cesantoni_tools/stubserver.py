@@ -0,0 +1,268 @@
+"""
+Local stub of cesantoni.com.mx for benchmarks.
+
+Serves synthetic WooCommerce-like product pages under /producto/<slug>/ with a
+configurable per-request latency, so the scrapers can be timed without
+touching the real site. Pages carry an ETag and answer If-None-Match with 304.
+
+With a `catalog` ({slug: lastmod}) it also serves a Yoast-style sitemap index
+at /sitemap_index.xml pointing to /product-sitemap.xml (one <url> per catalog
+entry) and /page-sitemap.xml (non-product pages). The catalog can be edited
+while the server runs to simulate new, modified and removed products. With
+`products` (a list of API records) it serves them as the Render API's
+/api/products.
+
+With a `cassette` (fixtures.Cassette) it replays recorded exchanges instead,
+answering 404 for anything that was not recorded.
+
+The server also works as a plain HTTP proxy: a request for an absolute URL
+(HttpClient(proxy=server.base_url), the scripts' --proxy) is served as if it
+had gone to that URL's host, so the scripts run unchanged against it.
+
+Latency is `latency` seconds plus up to `jitter` more, and a fraction
+`errors` of the requests is answered with `error_status` (with Retry-After
+when `retry_after` is set) while a fraction `drops` has its connection
+closed without an answer. `seed` makes the injected faults reproducible for
+the same request order. A single-range Range header is answered with a 206
+and the requested bytes.
+
+    with StubServer(latency=0.2, errors=0.05, seed=1) as server:
+        url = server.url("/producto/alabama/")
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+PRODUCT_PAGE = """<!DOCTYPE html>
+<html><head><title>{name} - Cesantoni</title></head>
+<body>
+<h1>{name}</h1>
+<div class="woocommerce-product-gallery">
+  <img class="wp-post-image" src="{base}/wp-content/uploads/Render_{upper}_Sala_HD-1024x723.jpg">
+  <img src="{base}/wp-content/uploads/producto_{upper}_C1.jpg">
+  <img src="{base}/wp-content/uploads/producto_{upper}_C2.jpg">
+</div>
+<table>
+  <tr><th>Formato</th><td>20 x 120 cm</td></tr>
+  <tr><th>Acabado</th><td>Mate</td></tr>
+  <tr><th>Tipo</th><td>Porcelanato</td></tr>
+  <tr><th>Uso</th><td>Interior</td></tr>
+  <tr><th>Piezas por caja</th><td>6 piezas</td></tr>
+  <tr><th>m2 por caja</th><td>1.44 m2</td></tr>
+</table>
+<div class="product-specs">
+  PEI: 4
+  Absorción: 0.5%
+</div>
+{filler}
+</body></html>
+"""
+
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+def sitemap_xml(tag, entries):
+    """Render a <urlset> (tag="url") or <sitemapindex> (tag="sitemap") document."""
+    root = "urlset" if tag == "url" else "sitemapindex"
+    items = "".join(
+        f"<{tag}><loc>{loc}</loc>" + (f"<lastmod>{lastmod}</lastmod>" if lastmod else "") + f"</{tag}>\n"
+        for loc, lastmod in entries)
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<{root} xmlns="{SITEMAP_NS}">\n{items}</{root}>\n'
+
+
+def product_page(slug, base=""):
+    """Render the synthetic HTML page for a product slug."""
+    name = slug.replace("-", " ").title()
+    filler = "\n".join(f"<p>Texto de relleno {i} para {name}.</p>" for i in range(200))
+    return PRODUCT_PAGE.format(name=name, upper=name.upper().replace(" ", "_"),
+                               base=base, filler=filler)
+
+
+def _byte_range(header, size):
+    """(first, last) byte of a single "bytes=a-b" / "bytes=a-" Range within `size`, or None."""
+    if not header or not header.startswith("bytes=") or "," in header or not size:
+        return None
+    first, _, last = header[len("bytes="):].partition("-")
+    if not first.isdigit() or int(first) >= size:
+        return None
+    last = min(int(last), size - 1) if last.isdigit() else size - 1
+    return int(first), last
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in two writes; with Nagle the body would wait
+    # for the client's delayed ACK (~40 ms) on every kept-alive request
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            delay = server.latency + server.jitter * server.rng.random()
+            fault = server.rng.random()
+        if delay:
+            time.sleep(delay)
+        if fault < server.drops:
+            with server.lock:
+                server.injected += 1
+            self.close_connection = True
+            return
+        if fault < server.drops + server.errors:
+            with server.lock:
+                server.injected += 1
+            headers = {"Retry-After": str(server.retry_after)} if server.retry_after is not None else {}
+            self._send(server.error_status, b"injected error", headers=headers)
+            return
+
+        # Proxy-style request line: GET http://host/path HTTP/1.1
+        if self.path.startswith(("http://", "https://")):
+            url = self.path
+            parts = urlsplit(url)
+            self.path = parts.path + ("?" + parts.query if parts.query else "")
+        else:
+            url = server.base_url + self.path
+        if server.cassette is not None:
+            self._replay(server, url)
+        elif self.path.startswith("/producto/"):
+            slug = self.path.strip("/").split("/")[-1]
+            body = product_page(slug, server.base_url).encode("utf-8")
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, b"", etag=etag)
+            else:
+                self._send(200, body, etag=etag)
+        elif server.catalog is not None and self.path in ("/sitemap_index.xml", "/product-sitemap.xml",
+                                                          "/page-sitemap.xml"):
+            body = self._sitemap(server).encode("utf-8")
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, b"", content_type="application/xml", etag=etag)
+            else:
+                self._send(200, body, content_type="application/xml", etag=etag)
+        elif server.products is not None and self.path.split("?")[0].endswith("/api/products"):
+            body = json.dumps(server.products, ensure_ascii=False).encode("utf-8")
+            self._send(200, body, content_type="application/json")
+        else:
+            self._send(404, b"not found")
+
+    def _replay(self, server, url):
+        recorded = server.cassette.lookup(self.command, url)
+        if recorded is None:
+            with server.lock:
+                server.misses += 1
+            self._send(404, b"not recorded")
+            return
+        status, headers, body = recorded
+        etag = headers.pop("ETag", None)
+        content_type = headers.pop("Content-Type", "text/html; charset=utf-8")
+        if etag and self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", content_type=content_type, etag=etag)
+        else:
+            self._send(status, body, content_type=content_type, etag=etag, headers=headers)
+
+    def _sitemap(self, server):
+        catalog = dict(server.catalog)
+        base = server.base_url
+        if self.path == "/product-sitemap.xml":
+            return sitemap_xml("url", [(f"{base}/producto/{slug}/", lastmod)
+                                       for slug, lastmod in catalog.items()])
+        if self.path == "/page-sitemap.xml":
+            return sitemap_xml("url", [(f"{base}/", None), (f"{base}/contacto/", None)])
+        newest = max((m for m in catalog.values() if m), default=None)
+        return sitemap_xml("sitemap", [(f"{base}/page-sitemap.xml", None),
+                                       (f"{base}/product-sitemap.xml", newest)])
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", etag=None, headers=None):
+        wanted = _byte_range(self.headers.get("Range"), len(body)) if status == 200 else None
+        if wanted is not None:
+            start, end = wanted
+            headers = dict(headers or {}, **{"Content-Range": f"bytes {start}-{end}/{len(body)}"})
+            status, body = 206, body[start:end + 1]
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """Threaded stub HTTP server running in the background on 127.0.0.1."""
+
+    def __init__(self, latency=0.0, port=0, catalog=None, products=None, cassette=None,
+                 jitter=0.0, errors=0.0, error_status=503, retry_after=None, drops=0.0, seed=None):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self.httpd.catalog = catalog
+        self.httpd.products = products
+        self.httpd.cassette = cassette
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.jitter = jitter
+        self.httpd.errors = errors
+        self.httpd.error_status = error_status
+        self.httpd.retry_after = retry_after
+        self.httpd.drops = drops
+        self.httpd.rng = random.Random(seed)
+        self.httpd.requests = 0
+        self.httpd.injected = 0
+        self.httpd.misses = 0
+        self.httpd.lock = threading.Lock()
+        self.httpd.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return self.httpd.base_url
+
+    @property
+    def catalog(self):
+        return self.httpd.catalog
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    @property
+    def injected(self):
+        """Requests answered with an injected error or dropped."""
+        return self.httpd.injected
+
+    @property
+    def misses(self):
+        """Replayed requests that had no recording (answered 404)."""
+        return self.httpd.misses
+
+    def url(self, path):
+        return self.base_url + path
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,70 @@
+"""
+Per-host politeness budget for the scrapers.
+
+A token bucket per host replaces the old fixed `time.sleep(...)` between
+requests: workers call `HostThrottle.wait(url)` before each request and block
+only as long as that host's budget requires.
+"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.capacity)
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, consume them and return the seconds waited."""
+        if not self.rate or self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+class HostThrottle:
+    """One TokenBucket per host, created lazily with the same rate/burst."""
+
+    def __init__(self, rate, burst=1, metrics=None):
+        self.rate = rate
+        self.burst = burst
+        self.metrics = metrics
+        self.waited = 0.0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def wait(self, url):
+        """Wait for the budget of the URL's host. Returns the seconds spent waiting."""
+        waited = self.bucket(urlsplit(url).netloc).acquire()
+        if self.metrics is not None:
+            self.metrics.observe("throttle", waited)
+        if waited:
+            with self._lock:
+                self.waited += waited
+        return waited
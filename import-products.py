@@ -7,148 +7,273 @@ Importa los 105 productos del JSON a la base de datos SQLite.
 Uso:
   cd ~/Downloads/Cesantoni\ crm\ claude/
   python3 import-products.py
+  python3 import-products.py --mode merge     # sin preguntar (cron)
+  python3 import-products.py --mode replace --db otra.db --json productos.json
+  python3 import-products.py --mode merge --json productos_cesantoni.jsonl   # stream del scraper
+  CESANTONI_IMPORT_MODE=merge python3 -m cesantoni_tools import               # programado
+
+Sin terminal (cron) nunca pregunta: sin --mode termina con código 2.
 """
 
+import argparse
+import hashlib
 import json
 import sqlite3
 import os
+import sys
+
+from cesantoni_tools.config import env_defaults
+from cesantoni_tools.jsonl import iter_products
 
 # Rutas
 DB_PATH = 'data/cesantoni.db'
 JSON_PATH = 'productos_cesantoni.json'
 
-def main():
-    print("=" * 60)
-    print("🏠 IMPORTADOR DE PRODUCTOS CESANTONI")
-    print("=" * 60)
-    
-    # Verificar archivos
-    if not os.path.exists(JSON_PATH):
-        print(f"❌ No se encontró {JSON_PATH}")
-        return
-    
-    if not os.path.exists(DB_PATH):
-        print(f"❌ No se encontró {DB_PATH}")
-        return
+# PRAGMAs solo para la importación (journal_mode se restaura al terminar)
+IMPORT_PRAGMAS = [
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",
+]
+
+# El UPSERT con dos cláusulas ON CONFLICT requiere SQLite >= 3.35
+MIN_SQLITE_VERSION = (3, 35, 0)
+BATCH_SIZE = 5000
+
+REQUIRED_COLUMNS = {'url': 'TEXT', 'image_url': 'TEXT', 'slug': 'TEXT', 'content_hash': 'TEXT'}
+
+# Al actualizar: name/url/image_url se sobrescriben, el resto se mezcla con COALESCE
+UPSERT_UPDATE = """
+        name = excluded.name,
+        url = excluded.url,
+        image_url = excluded.image_url,
+        category = COALESCE(:category, category),
+        format = COALESCE(excluded.format, format),
+        finish = COALESCE(excluded.finish, finish),
+        type = COALESCE(excluded.type, type),
+        usage = COALESCE(excluded.usage, usage),
+        pieces_per_box = COALESCE(excluded.pieces_per_box, pieces_per_box),
+        sqm_per_box = COALESCE(excluded.sqm_per_box, sqm_per_box),
+        content_hash = excluded.content_hash,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+# Precio base por defecto: 450.00
+UPSERT_SQL = f"""
+    INSERT INTO products (sku, slug, name, url, image_url, category, format, finish, type, usage, pieces_per_box, sqm_per_box, content_hash, base_price, active)
+    VALUES (:sku, :slug, :name, :url, :image_url, COALESCE(:category, 'Pisos'), :format, :finish, :type, :usage, :pieces_per_box, :sqm_per_box, :content_hash, 450.00, 1)
+    ON CONFLICT(sku) DO UPDATE SET {UPSERT_UPDATE}
+    ON CONFLICT(slug) DO UPDATE SET {UPSERT_UPDATE}
+"""
+
+# Campos que el UPSERT mezcla con COALESCE (los demás se sobrescriben)
+MERGE_FIELDS = ('category', 'format', 'finish', 'type', 'usage', 'pieces_per_box', 'sqm_per_box')
+
+def product_row(p):
+    """Normaliza un producto del JSON (sku y nombre por defecto)"""
+    row = {field: p.get(field) for field in ('url', 'image_url') + MERGE_FIELDS}
+    row['sku'] = p.get('sku') or f"CES-{p['slug'].upper()}"
+    row['slug'] = p['slug']
+    row['name'] = p.get('name') or p['slug'].replace('-', ' ').title()
+    return row
+
+def has_unique_index(cursor, column):
+    """True si products tiene un índice UNIQUE (no parcial) exactamente sobre `column`"""
+    for _, name, unique, _, partial in cursor.execute("PRAGMA index_list(products)").fetchall():
+        if unique and not partial:
+            columns = [row[2] for row in cursor.execute(f"PRAGMA index_info({name})").fetchall()]
+            if columns == [column]:
+                return True
+    return False
+
+def ensure_schema(cursor):
+    """Agrega columnas faltantes y los índices UNIQUE de sku/slug. False si hay duplicados"""
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(products)").fetchall()}
+    for column, decl in REQUIRED_COLUMNS.items():
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE products ADD COLUMN {column} {decl}")
+            print(f"  ✅ Columna '{column}' agregada")
     
-    # Cargar productos del JSON
-    with open(JSON_PATH, 'r', encoding='utf-8') as f:
-        products = json.load(f)
+    for column in ('sku', 'slug'):
+        if has_unique_index(cursor, column):
+            continue
+        dupes = cursor.execute(f"""
+            SELECT {column}, COUNT(*) FROM products
+            WHERE {column} IS NOT NULL GROUP BY {column} HAVING COUNT(*) > 1 LIMIT 10
+        """).fetchall()
+        if dupes:
+            print(f"❌ No se puede crear el índice UNIQUE de '{column}', hay valores repetidos:")
+            for value, count in dupes:
+                print(f"    • {value} ({count} filas)")
+            return False
+        # Nombre propio: database.js ya usa idx_products_sku/slug para índices no únicos
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS uq_products_{column} ON products({column})")
+        print(f"  ✅ Índice UNIQUE 'uq_products_{column}' creado")
+    return True
+
+def content_hash(row):
+    """Hash estable del registro normalizado (solo los campos que se escriben en la DB)"""
+    data = json.dumps(row, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+def known_hashes(cursor):
+    """content_hash actual de cada producto, indexado por ('sku', x) y ('slug', x)"""
+    known = {}
+    for sku, slug, row_hash in cursor.execute("SELECT sku, slug, content_hash FROM products"):
+        if slug is not None:
+            known[('slug', slug)] = row_hash
+        if sku is not None:
+            known[('sku', sku)] = row_hash
+    return known
+
+def plan_changes(products, known, counts):
+    """Genera las filas nuevas o cuyo content_hash cambió, actualizando `counts`.
     
-    print(f"📦 Productos en JSON: {len(products)}")
+    Consume `products` de a uno (sirve con un iterador sobre un JSONL). Un
+    producto repetido en el archivo se compara contra su versión anterior.
+    """
+    for p in products:
+        row = product_row(p)
+        row['content_hash'] = content_hash(row)
+        key_sku, key_slug = ('sku', row['sku']), ('slug', row['slug'])
+        if key_sku in known or key_slug in known:
+            previous = known[key_sku] if key_sku in known else known[key_slug]
+            if previous == row['content_hash']:
+                counts['unchanged'] += 1
+                continue
+            counts['changed'] += 1
+        else:
+            counts['new'] += 1
+        known[key_sku] = known[key_slug] = row['content_hash']
+        yield row
+
+def bulk_import(conn, products, mode):
+    """Importa con UPSERT nativo, por lotes, en una sola transacción. mode: 'replace' o 'merge'
     
-    # Conectar a la base de datos
-    conn = sqlite3.connect(DB_PATH)
+    `products` puede ser una lista o un iterador: se lee en lotes de BATCH_SIZE,
+    así un JSONL grande no se carga completo en memoria. Solo se escriben las
+    filas nuevas o cuyo content_hash cambió: reimportar el mismo archivo en
+    modo merge no toca la base de datos.
+    """
     cursor = conn.cursor()
     
-    # Verificar estructura actual
     cursor.execute("SELECT COUNT(*) FROM products")
     current_count = cursor.fetchone()[0]
-    print(f"📊 Productos actuales en DB: {current_count}")
     
-    # Agregar columnas si no existen
-    try:
-        cursor.execute("ALTER TABLE products ADD COLUMN url TEXT")
-        print("  ✅ Columna 'url' agregada")
-    except:
-        pass
+    counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+    known = known_hashes(cursor) if mode == 'merge' else {}
+    pending = plan_changes(products, known, counts)
     
-    try:
-        cursor.execute("ALTER TABLE products ADD COLUMN image_url TEXT")
-        print("  ✅ Columna 'image_url' agregada")
-    except:
-        pass
+    batch = []
+    first = next(pending, None)
+    if first is None and mode == 'merge':
+        return counts
+    
+    previous_journal = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+    cursor.execute("PRAGMA journal_mode = WAL")
+    for pragma in IMPORT_PRAGMAS:
+        cursor.execute(pragma)
     
     try:
-        cursor.execute("ALTER TABLE products ADD COLUMN slug TEXT")
-        print("  ✅ Columna 'slug' agregada")
+        if mode == 'replace':
+            cursor.execute("DELETE FROM products")
+            print(f"🗑️  Eliminados {current_count} productos existentes")
+        
+        if first is not None:
+            batch.append(first)
+        for row in pending:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany(UPSERT_SQL, batch)
+                batch = []
+        if batch:
+            cursor.executemany(UPSERT_SQL, batch)
+        conn.commit()
     except:
-        pass
+        conn.rollback()
+        raise
+    finally:
+        cursor.execute(f"PRAGMA journal_mode = {previous_journal}")
     
-    # Preguntar si borrar productos existentes
+    return counts
+
+def ask_mode():
+    """Flujo interactivo original: devuelve 'replace', 'merge' o None"""
     print("\n⚠️  ¿Qué deseas hacer?")
     print("  1. REEMPLAZAR todos los productos (borra los actuales)")
     print("  2. AGREGAR solo productos nuevos (mantiene los actuales)")
     print("  3. CANCELAR")
     
     choice = input("\nOpción (1/2/3): ").strip()
+    return {'1': 'replace', '2': 'merge'}.get(choice)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Importador de productos Cesantoni')
+    parser.add_argument('--mode', choices=['replace', 'merge'],
+                        help='Importar sin preguntar: replace borra y reinserta, merge actualiza/agrega')
+    parser.add_argument('--db', default=DB_PATH, help=f'Base de datos SQLite (default: {DB_PATH})')
+    parser.add_argument('--json', default=JSON_PATH, help=f'Archivo de productos .json o .jsonl (default: {JSON_PATH})')
+    env_defaults(parser, 'IMPORT')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
     
-    if choice == '3':
-        print("❌ Cancelado")
+    print("=" * 60)
+    print("🏠 IMPORTADOR DE PRODUCTOS CESANTONI")
+    print("=" * 60)
+    
+    # Sin terminal (cron, scheduler) no hay a quién preguntar: el modo es obligatorio
+    if args.mode is None and not sys.stdin.isatty():
+        print("❌ Falta --mode replace|merge (o CESANTONI_IMPORT_MODE) al correr sin terminal")
+        return 2
+    
+    # Verificar archivos
+    if not os.path.exists(args.json):
+        print(f"❌ No se encontró {args.json}")
+        return
+    
+    if not os.path.exists(args.db):
+        print(f"❌ No se encontró {args.db}")
+        return
+    
+    # Cargar productos: un JSONL se lee en streaming durante la importación
+    products = iter_products(args.json)
+    if isinstance(products, list):
+        print(f"📦 Productos en JSON: {len(products)}")
+    else:
+        print(f"📦 Productos en {args.json}: se leen en streaming")
+    
+    # Conectar a la base de datos
+    conn = sqlite3.connect(args.db)
+    cursor = conn.cursor()
+    
+    # Verificar estructura actual
+    cursor.execute("SELECT COUNT(*) FROM products")
+    current_count = cursor.fetchone()[0]
+    print(f"📊 Productos actuales en DB: {current_count}")
+    
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        print(f"❌ Se requiere SQLite >= 3.35 (instalado: {sqlite3.sqlite_version})")
         conn.close()
         return
     
-    if choice == '1':
-        # Borrar productos existentes
-        cursor.execute("DELETE FROM products")
-        print(f"🗑️  Eliminados {current_count} productos existentes")
+    if not ensure_schema(cursor):
+        conn.close()
+        return
+    conn.commit()
     
-    # Importar productos
-    imported = 0
-    updated = 0
-    skipped = 0
+    mode = args.mode or ask_mode()
+    if mode is None:
+        print("❌ Cancelado")
+        conn.close()
+        return
     
-    for p in products:
-        sku = p.get('sku') or f"CES-{p['slug'].upper()}"
-        name = p.get('name') or p['slug'].replace('-', ' ').title()
-        
-        # Verificar si ya existe
-        cursor.execute("SELECT id FROM products WHERE sku = ? OR slug = ?", (sku, p['slug']))
-        existing = cursor.fetchone()
-        
-        if existing and choice == '2':
-            # Actualizar existente
-            cursor.execute("""
-                UPDATE products SET
-                    name = ?,
-                    url = ?,
-                    image_url = ?,
-                    category = COALESCE(?, category),
-                    format = COALESCE(?, format),
-                    finish = COALESCE(?, finish),
-                    type = COALESCE(?, type),
-                    usage = COALESCE(?, usage),
-                    pieces_per_box = COALESCE(?, pieces_per_box),
-                    sqm_per_box = COALESCE(?, sqm_per_box),
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (
-                name,
-                p.get('url'),
-                p.get('image_url'),
-                p.get('category'),
-                p.get('format'),
-                p.get('finish'),
-                p.get('type'),
-                p.get('usage'),
-                p.get('pieces_per_box'),
-                p.get('sqm_per_box'),
-                existing[0]
-            ))
-            updated += 1
-        elif not existing or choice == '1':
-            # Insertar nuevo
-            cursor.execute("""
-                INSERT INTO products (sku, slug, name, url, image_url, category, format, finish, type, usage, pieces_per_box, sqm_per_box, base_price, active)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
-            """, (
-                sku,
-                p['slug'],
-                name,
-                p.get('url'),
-                p.get('image_url'),
-                p.get('category') or 'Pisos',
-                p.get('format'),
-                p.get('finish'),
-                p.get('type'),
-                p.get('usage'),
-                p.get('pieces_per_box'),
-                p.get('sqm_per_box'),
-                450.00  # Precio base por defecto
-            ))
-            imported += 1
-        else:
-            skipped += 1
+    # Importar productos
+    counts = bulk_import(conn, products, mode)
+    imported, updated, unchanged = counts['new'], counts['changed'], counts['unchanged']
+    if not isinstance(products, list):
+        print(f"📦 Productos leídos: {sum(counts.values())}")
     
     # Crear tabla de promociones si no existe
     cursor.execute("""
@@ -183,7 +308,7 @@ def main():
     print("=" * 60)
     print(f"  ✅ Importados: {imported}")
     print(f"  🔄 Actualizados: {updated}")
-    print(f"  ⏭️  Omitidos: {skipped}")
+    print(f"  ⏭️  Sin cambios: {unchanged}")
     print(f"  📦 Total en DB: {final_count}")
     
     # Mostrar muestra
@@ -199,4 +324,4 @@ def main():
     print("  node server.js")
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
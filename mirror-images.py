@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+ESPEJO DE IMÁGENES CESANTONI
+============================
+Descarga las imágenes de los productos (image_url + images del JSON del
+scraper, o image_url + gallery de la tabla products) a un almacén local y
+genera versiones reducidas en WebP y JPEG para las landings, que así sirven
+miniaturas de ~30 KB en lugar de los renders -scaled.jpg de varios MB de
+cesantoni.com.mx.
+
+  public/mirror/objects/ab/<sha256>.jpg          originales, uno por contenido
+  public/mirror/variants/ab/<sha256>-640w.webp   versiones por ancho y formato
+  public/mirror/manifest.json                    producto -> imágenes -> versiones
+
+El servidor ya publica public/, así que quedan en /mirror/... Las imágenes
+idénticas (el mismo render en varios productos o con varias URLs) se guardan
+una sola vez. Las descargas van en paralelo por el HttpClient compartido y
+las versiones se generan en un pool de procesos.
+
+Las corridas siguientes son incrementales: el manifest recuerda el sha256,
+ETag y Last-Modified de cada URL, así que solo se descargan las URLs nuevas
+(--refresh revalida las demás con If-None-Match) y solo se generan las
+versiones que faltan.
+
+Requiere Pillow para las versiones (pip3 install Pillow); sin Pillow solo se
+copian los originales y las versiones se generan en la próxima corrida.
+
+Uso:
+  python3 mirror-images.py
+  python3 mirror-images.py --json productos_cesantoni.jsonl
+  python3 mirror-images.py --db data/cesantoni.db --widths 320,800 --formats webp
+  python3 mirror-images.py --refresh --concurrency 8 --workers 4
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+
+from cesantoni_tools.breaker import HostBreaker
+from cesantoni_tools.config import env_defaults
+from cesantoni_tools.crawl import crawl
+from cesantoni_tools.fixtures import Recorder
+from cesantoni_tools.httpclient import HttpClient, RetryPolicy, Timeout
+from cesantoni_tools.imagestore import VARIANT_FORMATS, ImageStore, Manifest, have_pillow, make_variants
+from cesantoni_tools.jsonl import iter_products
+from cesantoni_tools.metrics import Metrics, profile_to
+from cesantoni_tools.throttle import HostThrottle
+
+# Rutas
+JSON_PATH = 'productos_cesantoni.json'
+STORE_PATH = 'public/mirror'
+
+# Anchos de las versiones: miniatura, tarjeta, ficha y pantalla completa
+DEFAULT_WIDTHS = (320, 640, 1280)
+DEFAULT_FORMATS = ('webp', 'jpg')
+
+headers = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'image/avif,image/webp,image/*,*/*;q=0.8',
+}
+
+# Tiempos por fase (fetch, resize, write) y por etapa de cada petición
+metrics = Metrics()
+
+# Sesión HTTP compartida (la reconfigura run)
+client = HttpClient(pool_size=8, timeout=Timeout(connect=10, read=60),
+                    retry=RetryPolicy(retries=3, backoff=1.0), headers=headers,
+                    metrics=metrics)
+
+def image_urls(image_url, images):
+    """URLs de un producto sin repetir, la principal primero"""
+    urls = []
+    for url in [image_url] + list(images or []):
+        if isinstance(url, str) and url.startswith(('http://', 'https://')) and url not in urls:
+            urls.append(url)
+    return urls
+
+def products_from_json(path):
+    """{slug: [urls]} del JSON (o .jsonl) del scraper"""
+    return {p['slug']: image_urls(p.get('image_url'), p.get('images'))
+            for p in iter_products(path) if p.get('slug')}
+
+def products_from_db(path):
+    """{slug: [urls]} de la tabla products (image_url + gallery JSON)"""
+    db = sqlite3.connect(path)
+    try:
+        rows = db.execute("SELECT slug, image_url, gallery FROM products WHERE slug IS NOT NULL").fetchall()
+    finally:
+        db.close()
+    products = {}
+    for slug, image_url, gallery in rows:
+        try:
+            images = json.loads(gallery) if gallery else []
+        except json.JSONDecodeError:
+            images = []
+        products[slug] = image_urls(image_url, images if isinstance(images, list) else [])
+    return products
+
+def fetch_image(store, manifest, url, refresh, progress=""):
+    """Descarga una URL al almacén; devuelve 'new', 'dedup', 'unchanged' o None si falló"""
+    known = manifest.image(url)
+    conditional = {}
+    if known and refresh:
+        if known.get('etag'):
+            conditional['If-None-Match'] = known['etag']
+        if known.get('last_modified'):
+            conditional['If-Modified-Since'] = known['last_modified']
+
+    name = url.rsplit('/', 1)[-1]
+    try:
+        with metrics.timer("fetch"), client.stream(url, headers=conditional) as resp:
+            if resp.status_code == 304:
+                print(f"{progress} ♻️  {name} (sin cambios)")
+                return 'unchanged'
+            if resp.status_code != 200:
+                print(f"{progress} ❌ {name}: Status {resp.status_code}")
+                return None
+            stored = store.put(resp.iter_content())
+            manifest.set_image(url, stored, etag=resp.headers.get('ETag'),
+                               last_modified=resp.headers.get('Last-Modified'))
+    except Exception as e:
+        print(f"{progress} ❌ {name}: {e}")
+        return None
+
+    if not stored.new:
+        print(f"{progress} 🔗 {name} (mismo contenido que otra URL)")
+        return 'dedup'
+    print(f"{progress} ✅ {name} ({stored.size / 1024:.0f} KB)")
+    return 'new'
+
+def download_all(store, manifest, urls, args):
+    """Descarga en paralelo las URLs pendientes; devuelve {resultado: cantidad}"""
+    # Sin --refresh, una URL ya en el almacén no se vuelve a pedir
+    todo = [url for url in urls
+            if args.refresh or not store.exists((manifest.image(url) or {}).get('path'))]
+    outcomes = {'cached': len(urls) - len(todo)}
+    throttle = HostThrottle(args.rate, metrics=metrics)
+
+    def work(i, url):
+        outcome = fetch_image(store, manifest, url, args.refresh, progress=f"[{i + 1}/{len(todo)}]")
+        metrics.count(outcome or 'failed')
+        return outcome
+
+    for outcome in crawl(todo, work, concurrency=args.concurrency, throttle=throttle):
+        outcomes[outcome or 'failed'] = outcomes.get(outcome or 'failed', 0) + 1
+    return outcomes
+
+def pending_variants(store, manifest, urls, widths, formats):
+    """[(sha256, original, [(ancho, formato, destino)])] de las versiones que faltan"""
+    pending = []
+    seen = set()
+    for url in urls:
+        image = manifest.image(url)
+        if image is None or image['sha256'] in seen or not store.exists(image['path']):
+            continue
+        seen.add(image['sha256'])
+        jobs = [(w, fmt, store.abspath(store.variant_path(image['sha256'], w, fmt)))
+                for w in widths for fmt in formats
+                if not store.exists(manifest.variant(image['sha256'], w, fmt))]
+        if jobs:
+            pending.append((image['sha256'], store.abspath(image['path']), jobs))
+    return pending
+
+def resize_all(store, manifest, pending, workers):
+    """Genera las versiones en un pool de procesos; devuelve (generadas, bytes, errores)"""
+    from concurrent.futures import ProcessPoolExecutor  # multiprocessing solo cuando hay que redimensionar
+    
+    generated = size = errors = 0
+    with metrics.timer("resize"), ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [(sha256, pool.submit(make_variants, source, jobs)) for sha256, source, jobs in pending]
+        for sha256, future in futures:
+            try:
+                written = future.result()
+            except Exception as e:
+                errors += 1
+                print(f"  ❌ {sha256[:12]}: {type(e).__name__}: {e}")
+                continue
+            for width, fmt, nbytes in written:
+                manifest.set_variant(sha256, width, fmt, store.variant_path(sha256, width, fmt))
+                generated += 1
+                size += nbytes
+    metrics.count("variants", generated)
+    return generated, size, errors
+
+def parse_list(value, cast=str):
+    return tuple(cast(x) for x in value.split(',') if x.strip())
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Espejo local de las imágenes de productos')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--json', default=None,
+                        help='JSON o .jsonl del scraper (default: productos_cesantoni.json)')
+    source.add_argument('--db', default=None,
+                        help='Leer los productos de esta base SQLite en lugar del JSON')
+    parser.add_argument('--store', default=STORE_PATH,
+                        help='Directorio del almacén (default: public/mirror)')
+    parser.add_argument('--widths', type=lambda v: parse_list(v, int), default=DEFAULT_WIDTHS,
+                        help='Anchos de las versiones (default: 320,640,1280)')
+    parser.add_argument('--formats', type=parse_list, default=DEFAULT_FORMATS,
+                        help='Formatos de las versiones: webp, jpg (default: webp,jpg)')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Revalidar también las URLs ya descargadas (If-None-Match)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Descargas en paralelo (default: 4)')
+    parser.add_argument('--rate', type=float, default=4.0,
+                        help='Peticiones por segundo por host (default: 4)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Procesos para generar las versiones (default: uno por CPU)')
+    parser.add_argument('--pool-size', type=int, default=8,
+                        help='Conexiones keep-alive por host (default: 8)')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='Reintentos con backoff exponencial ante errores y 5xx/429 (default: 3)')
+    parser.add_argument('--breaker-cooldown', type=float, default=30.0,
+                        help='Segundos de pausa de un host cuando se disparan sus errores (default: 30)')
+    parser.add_argument('--metrics', default=None, metavar='F',
+                        help='Reporte JSON de tiempos por fase (default: <store>/manifest.metrics.json)')
+    parser.add_argument('--profile', nargs='?', const='mirror.prof', default=None, metavar='F',
+                        help='Guardar un perfil cProfile de la corrida (default: mirror.prof)')
+    parser.add_argument('--record', default=None, metavar='F',
+                        help='Grabar cada respuesta HTTP en un cassette JSONL')
+    parser.add_argument('--proxy', default=None, metavar='URL',
+                        help='Proxy HTTP para todas las peticiones (p. ej. el stub de replay)')
+    env_defaults(parser, 'MIRROR')
+    args = parser.parse_args(argv)
+    unknown = [fmt for fmt in args.formats if fmt not in VARIANT_FORMATS]
+    if unknown:
+        parser.error(f"formato desconocido: {', '.join(unknown)} (usar {', '.join(VARIANT_FORMATS)})")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    with profile_to(args.profile):
+        run(args)
+    if args.profile:
+        print(f"🔬 Perfil cProfile: {args.profile} (python3 -m pstats {args.profile})")
+
+def run(args):
+    global client, metrics
+    metrics = Metrics()
+    recorder = Recorder(args.record) if args.record else None
+    client = HttpClient(pool_size=args.pool_size, timeout=client.timeout,
+                        retry=RetryPolicy(retries=args.retries, backoff=1.0),
+                        breaker=HostBreaker(cooldown=args.breaker_cooldown), headers=headers,
+                        metrics=metrics, proxy=args.proxy, recorder=recorder)
+
+    print("=" * 60)
+    print("🖼️  ESPEJO DE IMÁGENES CESANTONI")
+    print("=" * 60)
+
+    source = args.db or args.json or JSON_PATH
+    if not os.path.exists(source):
+        print(f"❌ No se encontró {source}")
+        sys.exit(1)
+    products = products_from_db(args.db) if args.db else products_from_json(source)
+    urls = list(dict.fromkeys(url for images in products.values() for url in images))
+    print(f"📦 {len(products)} productos, {len(urls)} imágenes distintas ({source})")
+
+    store = ImageStore(args.store)
+    manifest = Manifest(os.path.join(args.store, 'manifest.json'))
+
+    print("\n⬇️  Descargando...")
+    outcomes = download_all(store, manifest, urls, args)
+
+    pending = pending_variants(store, manifest, urls, args.widths, args.formats)
+    generated = size = errors = 0
+    if pending and not have_pillow():
+        print(f"\n⚠️  Pillow no está instalado: {len(pending)} imágenes sin versiones (pip3 install Pillow)")
+    elif pending:
+        jobs = sum(len(j) for _, _, j in pending)
+        print(f"\n🪄 Generando {jobs} versiones de {len(pending)} imágenes...")
+        generated, size, errors = resize_all(store, manifest, pending, args.workers)
+
+    with metrics.timer("write"):
+        manifest.link_products(products, args.widths, args.formats)
+        manifest.save()
+    if recorder is not None:
+        recorder.close()
+
+    print()
+    print("=" * 60)
+    print(f"✅ Descargadas: {outcomes.get('new', 0)} nuevas, {outcomes.get('dedup', 0)} repetidas, "
+          f"{outcomes.get('unchanged', 0)} sin cambios, {outcomes['cached']} ya en el almacén")
+    print(f"❌ Errores de descarga: {outcomes.get('failed', 0)}")
+    print(f"🪄 Versiones: {generated} generadas ({size / 1024 / 1024:.1f} MB)"
+          + (f", {errors} imágenes con error" if errors else ""))
+    print(f"🌐 {client.format_summary()}")
+    if recorder is not None:
+        print(f"📼 {recorder.recorded} respuestas grabadas en: {args.record}")
+    print(f"\n📁 Manifest: {manifest.path}")
+
+    report_file = args.metrics or os.path.join(args.store, 'manifest.metrics.json')
+    metrics.write_json(report_file, extra={"http": client.summary()})
+    print(f"\n⏱️  Tiempos por fase ({report_file}):")
+    print(metrics.format_table())
+
+if __name__ == '__main__':
+    main()
@@ -4,19 +4,63 @@ SCRAPER CESANTONI - Corre esto en tu Mac
 ========================================
 1. Abre Terminal
 2. cd ~/Downloads/Cesantoni\ crm\ claude/
-3. pip3 install requests beautifulsoup4 pandas openpyxl
+3. pip3 install beautifulsoup4 lxml pandas openpyxl
 4. python3 scraper-cesantoni.py
 
 Genera: productos_cesantoni.json con toda la info
+
+También: python3 -m cesantoni_tools scrape [opciones]; cada opción se puede
+dar como variable de entorno CESANTONI_SCRAPE_<OPCIÓN> (p. ej. CESANTONI_SCRAPE_RATE=4)
+
+Opciones:
+  --concurrency N   Descarga N páginas en paralelo (default: 1)
+  --parse-workers N Extraer en N procesos mientras los hilos solo descargan
+                    (cola acotada entre ambos: --queue-size)
+  --rate R          Peticiones por segundo por host (default: 1)
+  --pool-size N     Conexiones keep-alive por host (default: 8)
+  --retries N       Reintentos con backoff exponencial + jitter, respeta Retry-After
+  --breaker-cooldown S  Pausa de un host cuando su tasa de errores se dispara
+  --max-age S       Reusar páginas en caché de menos de S segundos sin pedirlas
+  --no-cache        No usar la caché de páginas (.cache/pages.sqlite)
+  --parser P        Backend HTML: html.parser (default) o lxml, más rápido
+  --output F        Archivo JSON de salida (default: productos_cesantoni.json)
+  --stream          Escribir cada producto al momento en F.jsonl y compactar al final
+  --compact         Solo convertir F.jsonl (de una corrida interrumpida) a F y salir
+  --resume          Continuar la corrida anterior: saltar las URLs ya hechas
+                    y reintentar solo las que fallaron (.cache/scraper-checkpoint.jsonl)
+  --discover [URL]  Descubrir productos en el sitemap de WordPress y scrapear solo
+                    los nuevos o con <lastmod> cambiado desde la última corrida;
+                    se aplican al catálogo que ya está en F (que sigue completo)
+  --metrics F       Reporte de tiempos por fase (default: productos_cesantoni.metrics.json)
+  --profile [F]     Perfilar la corrida con cProfile (default: scraper.prof)
+  --record F        Grabar todas las respuestas HTTP en un cassette JSONL
+  --proxy URL       Mandar las peticiones a un proxy HTTP (p. ej. el stub que
+                    reproduce un cassette, ver benchmarks/suite.py)
 """
 
-import requests
-from bs4 import BeautifulSoup
+from functools import partial
+import argparse
+import importlib.util
 import json
-import time
 import re
 import os
 
+from cesantoni_tools.checkpoint import Checkpoint
+from cesantoni_tools.config import env_defaults
+from cesantoni_tools.crawl import crawl
+from cesantoni_tools.fixtures import Recorder
+from cesantoni_tools.breaker import HostBreaker
+from cesantoni_tools.httpclient import HttpClient, RetryPolicy, Timeout
+from cesantoni_tools.jsonl import JsonlWriter, compact, iter_jsonl, write_array
+from cesantoni_tools.jsonstream import iter_json_array
+from cesantoni_tools.metrics import Metrics, profile_to
+from cesantoni_tools.pagecache import DEFAULT_MAX_BYTES, DEFAULT_PATH, PageCache
+from cesantoni_tools.pipeline import ParsePipeline
+from cesantoni_tools.scripts import run_in_script
+from cesantoni_tools.sitemap import SitemapState, commit, discover
+from cesantoni_tools import sitemap
+from cesantoni_tools.throttle import HostThrottle
+
 # URLs de productos
 PRODUCT_URLS = [
     "https://www.cesantoni.com.mx/producto/sunset-maple/",
@@ -127,188 +171,670 @@ PRODUCT_URLS = [
     "https://www.cesantoni.com.mx/producto/leighton/",
 ]
 
+# Índice de sitemaps de WordPress (Yoast); --discover lo usa en lugar de PRODUCT_URLS
+SITEMAP_URL = "https://www.cesantoni.com.mx/sitemap_index.xml"
+
+CHECKPOINT_PATH = os.path.join(os.path.dirname(DEFAULT_PATH), 'scraper-checkpoint.jsonl')
+
 headers = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
     'Accept-Language': 'es-MX,es;q=0.9,en;q=0.8',
 }
 
+# Tiempos por fase (fetch, parse, write, throttle) y por etapa de cada petición
+metrics = Metrics()
+
+# Sesión HTTP compartida: reutiliza conexiones en lugar de un handshake por página
+client = HttpClient(pool_size=8, timeout=Timeout(connect=10, read=30),
+                    retry=RetryPolicy(retries=3, backoff=1.0), headers=headers,
+                    metrics=metrics)
+
+# Caché de páginas con ETag/Last-Modified (la configura main)
+cache = None
+
 def extract_slug(url):
     """Extrae el slug del URL"""
     match = re.search(r'/producto/([^/]+)/', url)
     return match.group(1) if match else None
 
-def scrape_product(url):
-    """Extrae información de un producto"""
+# Selectores de la imagen principal, en orden de prioridad. Cada uno se evalúa
+# sobre las <img> ya recolectadas (atributos, clases de sus ancestros, ¿dentro de <figure>?)
+IMG_SELECTORS = [
+    ('img.wp-post-image', lambda img: 'wp-post-image' in img['classes']),
+    ('.product-image img', lambda img: 'product-image' in img['up']),
+    ('.woocommerce-product-gallery img', lambda img: 'woocommerce-product-gallery' in img['up']),
+    ('img[src*="producto"]', lambda img: 'producto' in (img['attrs'].get('src') or '')),
+    ('img[src*="cesantoni"]', lambda img: 'cesantoni' in (img['attrs'].get('src') or '')),
+    ('.elementor-widget-image img', lambda img: 'elementor-widget-image' in img['up']),
+    ('figure img', lambda img: img['in_figure']),
+]
+
+SPEC_CLASS_WORDS = ('spec', 'detail', 'caracteristica')
+COLLECTED_TAGS = ('h1', 'img', 'table', 'div', 'ul', 'dl')
+
+# Tags cuyo texto no cuenta, como en Tag.get_text() de BeautifulSoup
+HIDDEN_TEXT_TAGS = frozenset(('script', 'style', 'template', 'rt', 'rp'))
+
+def have_lxml():
+    """¿Está instalado lxml? (find_spec() no lo importa: --help arranca sin cargarlo)"""
+    return importlib.util.find_spec('lxml') is not None
+
+# html.parser da lo mismo que la extracción original; lxml, más rápido, sólo con --parser lxml
+DEFAULT_PARSER = 'html.parser'
+
+# Backend HTML (--parser)
+html_parser = DEFAULT_PARSER
+
+def is_spec_block(classes):
+    text = ' '.join(classes).lower()
+    return any(word in text for word in SPEC_CLASS_WORDS)
+
+def new_document():
+    return {'h1': None, 'imgs': [], 'tables': [], 'spec_blocks': []}
+
+def collect_soup(html):
+    """Una sola pasada con BeautifulSoup + html.parser"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    doc = new_document()
+    for tag in soup.find_all(COLLECTED_TAGS):
+        name = tag.name
+        if name == 'img':
+            up = set()
+            in_figure = False
+            for parent in tag.parents:
+                up.update(parent.get('class') or [])
+                in_figure = in_figure or parent.name == 'figure'
+            doc['imgs'].append({'attrs': tag.attrs, 'classes': tag.get('class') or [],
+                                'up': up, 'in_figure': in_figure})
+        elif name == 'table':
+            doc['tables'].append([[cell.text for cell in row.find_all(['td', 'th'])]
+                                  for row in tag.find_all('tr')])
+        elif name == 'h1':
+            if doc['h1'] is None:
+                doc['h1'] = tag.text
+        elif is_spec_block(tag.get('class') or []):
+            doc['spec_blocks'].append(tag.get_text(separator='\n'))
+    return doc
+
+def lxml_text(el, separator=''):
+    """Texto de un elemento de lxml como lo da get_text(separator) con html.parser:
+    sin comentarios ni el contenido de script/style/template (ni de un ancestro así)"""
+    if el.tag in HIDDEN_TEXT_TAGS or any(a.tag in HIDDEN_TEXT_TAGS for a in el.iterancestors()):
+        return ''
+    parts = []
+    stack = [el]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+            continue
+        if not isinstance(node.tag, str) or node.tag in HIDDEN_TEXT_TAGS:
+            continue  # comentarios (su tag es una función) y script/style/...; su tail sí cuenta
+        if node.text:
+            parts.append(node.text)
+        for child in reversed(node):
+            if child.tail:
+                stack.append(child.tail)
+            stack.append(child)
+    return separator.join(parts)
+
+def collect_lxml(html):
+    """Una sola pasada directamente sobre el árbol de lxml.html (sin BeautifulSoup)"""
+    import lxml.html
+    try:
+        root = lxml.html.document_fromstring(html)
+    except ValueError:
+        # Cadenas con declaración de encoding: lxml sólo las acepta como bytes
+        root = lxml.html.document_fromstring(html.encode('utf-8'))
+    doc = new_document()
+    for el in root.iter(*COLLECTED_TAGS):
+        name = el.tag
+        if name == 'img':
+            up = set()
+            in_figure = False
+            for parent in el.iterancestors():
+                up.update((parent.get('class') or '').split())
+                in_figure = in_figure or parent.tag == 'figure'
+            doc['imgs'].append({'attrs': dict(el.attrib), 'classes': (el.get('class') or '').split(),
+                                'up': up, 'in_figure': in_figure})
+        elif name == 'table':
+            doc['tables'].append([[lxml_text(cell) for cell in row.iter('td', 'th')]
+                                  for row in el.iter('tr')])
+        elif name == 'h1':
+            if doc['h1'] is None:
+                doc['h1'] = lxml_text(el)
+        elif is_spec_block((el.get('class') or '').split()):
+            doc['spec_blocks'].append(lxml_text(el, '\n'))
+    return doc
+
+PARSER_BACKENDS = {'lxml': collect_lxml, 'html.parser': collect_soup}
+
+def img_src(attrs):
+    return attrs.get('src') or attrs.get('data-src') or attrs.get('data-lazy-src')
+
+def main_image(imgs):
+    """Equivalente a probar soup.select_one() con cada selector de IMG_SELECTORS"""
+    for _, matches in IMG_SELECTORS:
+        img = next((img for img in imgs if matches(img)), None)
+        if img:
+            src = img_src(img['attrs'])
+            if src and ('cesantoni' in src or 'wp-content' in src):
+                return src
+    return None
+
+def extract_product(html, url, parser=None):
+    """Extrae el producto del HTML de su página (sin red)"""
+    doc = PARSER_BACKENDS[parser or DEFAULT_PARSER](html)
+    
+    product = {
+        'slug': extract_slug(url),
+        'url': url,
+        'name': None,
+        'sku': None,
+        'category': None,
+        'format': None,
+        'finish': None,
+        'type': None,
+        'usage': None,
+        'pieces_per_box': None,
+        'sqm_per_box': None,
+        'image_url': None,
+        'images': [],
+        'specs': {}
+    }
+    
+    # Nombre del producto
+    if doc['h1'] is not None:
+        product['name'] = doc['h1'].strip()
+    
+    # Buscar imagen principal
+    product['image_url'] = main_image(doc['imgs'])
+    
+    # Buscar todas las imágenes del producto
+    for img in doc['imgs']:
+        src = img_src(img['attrs'])
+        if src and ('cesantoni' in src or 'wp-content' in src) and 'producto' in src.lower():
+            if src not in product['images']:
+                product['images'].append(src)
+    
+    # Buscar especificaciones en tablas
+    for rows in doc['tables']:
+        for cells in rows:
+            if len(cells) >= 2:
+                key = cells[0].strip().lower()
+                value = cells[1].strip()
+                product['specs'][key] = value
+                
+                # Mapear a campos conocidos
+                if 'formato' in key or 'size' in key:
+                    product['format'] = value
+                elif 'sku' in key or 'código' in key or 'codigo' in key:
+                    product['sku'] = value
+                elif 'acabado' in key or 'finish' in key:
+                    product['finish'] = value
+                elif 'tipo' in key or 'type' in key:
+                    product['type'] = value
+                elif 'uso' in key or 'usage' in key:
+                    product['usage'] = value
+                elif 'piezas' in key:
+                    try:
+                        product['pieces_per_box'] = int(re.search(r'\d+', value).group())
+                    except:
+                        pass
+                elif 'm2' in key or 'm²' in key or 'metros' in key:
+                    try:
+                        product['sqm_per_box'] = float(re.search(r'[\d.]+', value).group())
+                    except:
+                        pass
+    
+    # Buscar especificaciones en listas/divs
+    for text in doc['spec_blocks']:
+        for line in text.split('\n'):
+            line = line.strip()
+            if ':' in line:
+                key, value = line.split(':', 1)
+                key = key.strip().lower()
+                value = value.strip()
+                if key and value:
+                    product['specs'][key] = value
+    
+    # Generar SKU si no se encontró
+    if not product['sku'] and product['name']:
+        # Crear SKU basado en nombre
+        name_parts = product['name'].upper().replace(' ', '-')[:15]
+        product['sku'] = f"CES-{name_parts}"
+    
+    return product
+
+# Último motivo de error por URL (para el checkpoint)
+failure_reasons = {}
+
+# Etapas descarga/extracción de la última corrida con --parse-workers (y su cola)
+parse_pipeline = None
+queue_size = None
+
+def product_status(url, progress=""):
+    """Comienzo de la línea de progreso de un producto"""
     slug = extract_slug(url)
-    print(f"  Scrapeando: {slug}...", end=" ", flush=True)
+    # Una sola línea por producto para que no se mezclen en modo concurrente
+    return f"{progress}   Scrapeando: {slug}..." if progress else f"  Scrapeando: {slug}..."
+
+def product_failed(url, status, reason, shown=None):
+    """Registra el motivo del error (para el checkpoint) y lo reporta"""
+    failure_reasons[url] = reason
+    print(f"{status} ❌ {shown or reason}")
+    return None
+
+def fetch_product(url, status):
+    """Descarga la página de un producto, sin parsearla.
     
+    Devuelve (producto, None) si la página no cambió y ya estaba extraída,
+    (None, html) si hay que extraerla, o (None, None) si falló.
+    """
     try:
-        resp = requests.get(url, headers=headers, timeout=30)
+        with metrics.timer("fetch"):
+            resp = cache.fetch(client, url) if cache is not None else client.get(url)
         if resp.status_code != 200:
-            print(f"❌ Status {resp.status_code}")
-            return None
-            
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        
-        product = {
-            'slug': slug,
-            'url': url,
-            'name': None,
-            'sku': None,
-            'category': None,
-            'format': None,
-            'finish': None,
-            'type': None,
-            'usage': None,
-            'pieces_per_box': None,
-            'sqm_per_box': None,
-            'image_url': None,
-            'images': [],
-            'specs': {}
-        }
-        
-        # Nombre del producto
-        h1 = soup.find('h1')
-        if h1:
-            product['name'] = h1.text.strip()
-        
-        # Buscar imagen principal
-        # Intentar diferentes selectores comunes
-        img_selectors = [
-            'img.wp-post-image',
-            '.product-image img',
-            '.woocommerce-product-gallery img',
-            'img[src*="producto"]',
-            'img[src*="cesantoni"]',
-            '.elementor-widget-image img',
-            'figure img',
-        ]
-        
-        for selector in img_selectors:
-            img = soup.select_one(selector)
-            if img:
-                src = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
-                if src and ('cesantoni' in src or 'wp-content' in src):
-                    product['image_url'] = src
-                    break
-        
-        # Buscar todas las imágenes del producto
-        all_imgs = soup.find_all('img')
-        for img in all_imgs:
-            src = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
-            if src and ('cesantoni' in src or 'wp-content' in src) and 'producto' in src.lower():
-                if src not in product['images']:
-                    product['images'].append(src)
+            return product_failed(url, status, f"Status {resp.status_code}"), None
         
-        # Buscar especificaciones en tablas
-        tables = soup.find_all('table')
-        for table in tables:
-            rows = table.find_all('tr')
-            for row in rows:
-                cells = row.find_all(['td', 'th'])
-                if len(cells) >= 2:
-                    key = cells[0].text.strip().lower()
-                    value = cells[1].text.strip()
-                    product['specs'][key] = value
-                    
-                    # Mapear a campos conocidos
-                    if 'formato' in key or 'size' in key:
-                        product['format'] = value
-                    elif 'sku' in key or 'código' in key or 'codigo' in key:
-                        product['sku'] = value
-                    elif 'acabado' in key or 'finish' in key:
-                        product['finish'] = value
-                    elif 'tipo' in key or 'type' in key:
-                        product['type'] = value
-                    elif 'uso' in key or 'usage' in key:
-                        product['usage'] = value
-                    elif 'piezas' in key:
-                        try:
-                            product['pieces_per_box'] = int(re.search(r'\d+', value).group())
-                        except:
-                            pass
-                    elif 'm2' in key or 'm²' in key or 'metros' in key:
-                        try:
-                            product['sqm_per_box'] = float(re.search(r'[\d.]+', value).group())
-                        except:
-                            pass
-        
-        # Buscar especificaciones en listas/divs
-        spec_divs = soup.find_all(['div', 'ul', 'dl'], class_=lambda x: x and ('spec' in str(x).lower() or 'detail' in str(x).lower() or 'caracteristica' in str(x).lower()))
-        for div in spec_divs:
-            text = div.get_text(separator='\n')
-            lines = text.split('\n')
-            for i, line in enumerate(lines):
-                line = line.strip()
-                if ':' in line:
-                    parts = line.split(':', 1)
-                    if len(parts) == 2:
-                        key = parts[0].strip().lower()
-                        value = parts[1].strip()
-                        if key and value:
-                            product['specs'][key] = value
+        # Página sin cambios (304 o caché fresca): reutilizar el producto ya extraído
+        if resp.from_cache:
+            product = cache.get_extracted(url)
+            if product:
+                metrics.count("unchanged")
+                print(f"{status} ♻️  {product['name'] or extract_slug(url)} (sin cambios)")
+                return product, None
         
-        # Generar SKU si no se encontró
-        if not product['sku'] and product['name']:
-            # Crear SKU basado en nombre
-            name_parts = product['name'].upper().replace(' ', '-')[:15]
-            product['sku'] = f"CES-{name_parts}"
+        return None, resp.text
         
-        print(f"✅ {product['name'] or slug}")
+    except Exception as e:
+        return product_failed(url, status, f"{type(e).__name__}: {e}", f"Error: {e}"), None
+
+def product_extracted(url, product, status):
+    """Guarda en la caché un producto recién extraído y lo reporta"""
+    if cache is not None:
+        cache.set_extracted(url, product)
+    print(f"{status} ✅ {product['name'] or extract_slug(url)}")
+    return product
+
+def scrape_product(url, progress=""):
+    """Extrae información de un producto"""
+    status = product_status(url, progress)
+    product, html = fetch_product(url, status)
+    if html is None:
         return product
+    
+    try:
+        with metrics.timer("parse"):
+            product = extract_product(html, url, parser=html_parser)
+    except Exception as e:
+        return product_failed(url, status, f"{type(e).__name__}: {e}", f"Error: {e}")
+    
+    return product_extracted(url, product, status)
+
+def scrape_all(urls, concurrency=1, rate=1.0, checkpoint=None, parse_workers=0):
+    """Scrapea todas las URLs; devuelve (productos, errores) en el orden de entrada
+    
+    Con un checkpoint, las URLs ya hechas en una corrida anterior se toman del
+    diario sin pedirlas de nuevo, y cada resultado nuevo queda registrado.
+    """
+    results = [None] * len(urls)
+    
+    def emit(i, product):
+        results[i] = product
+    
+    crawl_pending(urls, emit, concurrency, rate, checkpoint, parse_workers)
+    
+    products = [p for p in results if p]
+    errors = [url for url, p in zip(urls, results) if not p]
+    return products, errors
+
+def stream_all(urls, writer, concurrency=1, rate=1.0, checkpoint=None, parse_workers=0):
+    """Como scrape_all, pero cada producto se escribe en `writer` (JsonlWriter) al
+    terminar, en el orden de entrada, sin acumularlos en memoria. Devuelve
+    (productos escritos, errores)"""
+    failed = []
+    
+    def emit(i, product):
+        if product is None:
+            failed.append(i)
+        with metrics.timer("write"):
+            writer.write_at(i, product)
+    
+    crawl_pending(urls, emit, concurrency, rate, checkpoint, parse_workers)
+    
+    errors = [urls[i] for i in sorted(failed)]
+    return len(urls) - len(errors), errors
+
+def crawl_pending(urls, emit, concurrency, rate, checkpoint, parse_workers=0):
+    """Llama emit(índice, producto o None) por cada URL; solo pide las pendientes
+    
+    Con parse_workers, los hilos solo descargan y la extracción corre en ese
+    número de procesos (ParsePipeline), con una cola acotada entre ambos.
+    """
+    global parse_pipeline
+    # Presupuesto por host en lugar de una pausa fija, para no saturar el servidor
+    throttle = HostThrottle(rate, metrics=metrics)
+    total = len(urls)
+    
+    todo = list(range(total))
+    if checkpoint is not None:
+        pending = set(checkpoint.pending(urls))
+        todo = [i for i in todo if urls[i] in pending]
+        for i, url in enumerate(urls):
+            if url not in pending:
+                emit(i, checkpoint.result(url))
+    
+    def record(i, url, product):
+        metrics.count("products" if product is not None else "errors")
+        if checkpoint is not None:
+            if product is None:
+                checkpoint.failed(url, failure_reasons.get(url, 'desconocido'))
+            else:
+                checkpoint.done(url, product)
+        emit(i, product)
+    
+    if not parse_workers:
+        def work(j, url):
+            i = todo[j]
+            record(i, url, scrape_product(url, progress=f"[{i + 1}/{total}]"))
         
+        crawl([urls[i] for i in todo], work, concurrency=concurrency, throttle=throttle)
+        return
+    
+    # Línea de progreso de cada página que está esperando su extracción
+    statuses = {}
+    
+    def fetch(j, url):
+        i = todo[j]
+        status = product_status(url, progress=f"[{i + 1}/{total}]")
+        product, html = fetch_product(url, status)
+        if html is None:
+            return True, product
+        statuses[j] = status
+        return False, (html, url, html_parser)
+    
+    def parsed(j, product, error):
+        i = todo[j]
+        url = urls[i]
+        status = statuses.pop(j, None)
+        if status is not None:
+            if error is not None:
+                product = product_failed(url, status, f"{type(error).__name__}: {error}", f"Error: {error}")
+            else:
+                product = product_extracted(url, product, status)
+        record(i, url, product)
+    
+    parse_pipeline = ParsePipeline(partial(run_in_script, 'scraper', 'extract_product'),
+                                   workers=parse_workers, queue_size=queue_size, metrics=metrics)
+    parse_pipeline.run([urls[i] for i in todo], fetch, parsed, concurrency=concurrency, throttle=throttle)
+
+def fetch_sitemap(url):
+    """Bytes del sitemap (revalidado contra la caché si está activa) o None"""
+    try:
+        resp = cache.fetch(client, url) if cache is not None else client.get(url)
     except Exception as e:
-        print(f"❌ Error: {e}")
+        print(f"  ❌ Sitemap {url}: {e}")
+        return None
+    if resp.status_code != 200:
+        print(f"  ❌ Sitemap {url}: Status {resp.status_code}")
         return None
+    return resp.content
 
-def main():
+def discover_urls(index_url, state):
+    """Lee el índice de sitemaps y compara con la corrida anterior.
+    
+    Devuelve el Discovery (con las URLs nuevas o modificadas en .queued), o
+    None si no se pudo leer el índice y hay que usar PRODUCT_URLS.
+    """
+    print(f"🗺️  Leyendo sitemap: {index_url}")
+    found = discover(fetch_sitemap, index_url, state)
+    if index_url in found.failed:
+        print("⚠️  Sin sitemap, se usa la lista PRODUCT_URLS")
+        return None
+    
+    print(f"   {found.format_summary()}")
+    listed = {extract_slug(url) for url in PRODUCT_URLS}
+    unlisted = [e.loc for e in found.queued if extract_slug(e.loc) not in listed]
+    if unlisted:
+        print(f"   🆕 {len(unlisted)} productos que no estaban en PRODUCT_URLS")
+    for url in found.removed:
+        print(f"   🗑️  Ya no está en el sitemap: {url}")
+    print()
+    return found
+
+def read_catalog(path):
+    """Productos del catálogo ya guardado en path, uno a uno ([] si no existe)"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        yield from iter_json_array(iter(partial(f.read, 1 << 16), b''))
+
+def merge_catalog(output_file, delta, removed):
+    """Aplica lo descubierto al catálogo completo de output_file.
+    
+    Los productos de delta reemplazan a los del mismo slug, los nuevos van al
+    final y los de removed (ya no están en el sitemap) se quitan. Un delta
+    vacío deja el catálogo igual. Devuelve (total, nuevos, actualizados, quitados).
+    """
+    fresh = {}
+    for product in delta:
+        fresh[product['slug']] = product
+    gone = {extract_slug(url) for url in removed}
+    counts = {'updated': 0, 'removed': 0}
+    
+    def merged():
+        for product in read_catalog(output_file):
+            slug = product.get('slug') or extract_slug(product['url'])
+            if slug in gone:
+                counts['removed'] += 1
+            elif slug in fresh:
+                counts['updated'] += 1
+                yield fresh.pop(slug)
+            else:
+                yield product
+        yield from fresh.values()
+    
+    total = write_array(merged(), output_file)
+    # Lo que queda en fresh no estaba en el catálogo
+    return total, len(fresh), counts['updated'], counts['removed']
+
+def jsonl_path(output_file):
+    return os.path.splitext(output_file)[0] + '.jsonl'
+
+def metrics_path(output_file):
+    return os.path.splitext(output_file)[0] + '.metrics.json'
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Scraper de productos Cesantoni')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Páginas descargadas en paralelo (default: 1)')
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help='Peticiones por segundo por host (default: 1)')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='Extraer los productos en N procesos aparte de las descargas (default: 0, '
+                             'en los mismos hilos)')
+    parser.add_argument('--queue-size', type=int, default=None,
+                        help='Con --parse-workers, páginas descargadas en espera como máximo '
+                             '(default: 2 por proceso)')
+    parser.add_argument('--pool-size', type=int, default=8,
+                        help='Conexiones keep-alive por host (default: 8)')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='Reintentos con backoff exponencial ante errores y 5xx/429 (default: 3)')
+    parser.add_argument('--breaker-cooldown', type=float, default=30.0,
+                        help='Segundos de pausa de un host cuando se disparan sus errores (default: 30)')
+    parser.add_argument('--cache', default=DEFAULT_PATH,
+                        help='Archivo de la caché de páginas (default: .cache/pages.sqlite)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Descargar todo sin usar la caché')
+    parser.add_argument('--max-age', type=float, default=None,
+                        help='Segundos durante los que una página en caché se usa sin revalidar')
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help='Tamaño máximo de la caché en MB (default: 200)')
+    parser.add_argument('--parser', choices=['lxml', 'html.parser'], default=DEFAULT_PARSER,
+                        help='Backend HTML (default: html.parser; lxml es más rápido pero '
+                             'repara distinto el marcado mal cerrado)')
+    parser.add_argument('--output', default='productos_cesantoni.json',
+                        help='Archivo JSON de salida (default: productos_cesantoni.json)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Escribir cada producto al momento en <output>.jsonl y compactar al final')
+    parser.add_argument('--compact', action='store_true',
+                        help='Solo compactar <output>.jsonl a <output> y salir')
+    parser.add_argument('--fsync-every', type=int, default=20,
+                        help='Con --stream, fsync cada N productos (default: 20)')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH,
+                        help='Diario de progreso por URL (default: .cache/scraper-checkpoint.jsonl)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Saltar las URLs ya hechas en el checkpoint y reintentar las fallidas')
+    parser.add_argument('--discover', nargs='?', const=SITEMAP_URL, default=None, metavar='URL',
+                        help='Tomar las URLs del sitemap, scrapear solo las nuevas o modificadas '
+                             'y aplicarlas al catálogo de --output (default: sitemap_index.xml del sitio)')
+    parser.add_argument('--sitemap-state', default=sitemap.DEFAULT_PATH,
+                        help='lastmod de la corrida anterior (default: .cache/sitemap.sqlite)')
+    parser.add_argument('--metrics', default=None, metavar='F',
+                        help='Reporte JSON de tiempos por fase (default: <output>.metrics.json)')
+    parser.add_argument('--profile', nargs='?', const='scraper.prof', default=None, metavar='F',
+                        help='Guardar un perfil cProfile de la corrida (default: scraper.prof)')
+    parser.add_argument('--record', default=None, metavar='F',
+                        help='Grabar cada respuesta HTTP en un cassette JSONL (usar con --no-cache)')
+    parser.add_argument('--proxy', default=None, metavar='URL',
+                        help='Proxy HTTP para todas las peticiones (p. ej. el stub de replay)')
+    env_defaults(parser, 'SCRAPE')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    with profile_to(args.profile):
+        run(args)
+    if args.profile:
+        print(f"🔬 Perfil cProfile: {args.profile} (python3 -m pstats {args.profile})")
+
+def run(args):
+    global client, cache, html_parser, metrics, parse_pipeline, queue_size
+    html_parser = args.parser
+    parse_pipeline = None
+    queue_size = args.queue_size
+    output_file = args.output
+    stream_file = jsonl_path(output_file)
+    
+    if args.compact:
+        if not os.path.exists(stream_file):
+            print(f"❌ No se encontró {stream_file}")
+            return
+        count = compact(stream_file, output_file)
+        print(f"📁 {count} productos de {stream_file} guardados en: {output_file}")
+        return
+    
+    metrics = Metrics()
+    recorder = Recorder(args.record) if args.record else None
+    client = HttpClient(pool_size=args.pool_size, timeout=client.timeout,
+                        retry=RetryPolicy(retries=args.retries, backoff=1.0),
+                        breaker=HostBreaker(cooldown=args.breaker_cooldown), headers=headers,
+                        metrics=metrics, proxy=args.proxy, recorder=recorder)
+    if not args.no_cache:
+        cache = PageCache(args.cache, max_bytes=int(args.cache_size * 1024 * 1024),
+                          max_age=args.max_age)
+    
     print("=" * 60)
     print("🏠 SCRAPER CESANTONI - Extrayendo productos")
     print("=" * 60)
-    print(f"Total URLs: {len(PRODUCT_URLS)}")
+    
+    urls = PRODUCT_URLS
+    found = None
+    if args.discover:
+        state = SitemapState(args.sitemap_state)
+        found = discover_urls(args.discover, state)
+        if found is not None:
+            urls = [entry.loc for entry in found.queued]
+    
+    print(f"Total URLs: {len(urls)}")
+    print(f"Concurrencia: {args.concurrency} | Límite: {args.rate} req/s por host")
     print()
     
-    products = []
-    errors = []
+    checkpoint = Checkpoint(args.checkpoint, resume=args.resume)
+    if args.resume:
+        done = sum(checkpoint.is_done(url) for url in urls)
+        print(f"Reanudando: {done} ya hechas, {len(urls) - done} pendientes")
+        print()
     
-    for i, url in enumerate(PRODUCT_URLS, 1):
-        print(f"[{i}/{len(PRODUCT_URLS)}]", end=" ")
-        product = scrape_product(url)
-        
-        if product:
-            products.append(product)
+    with checkpoint:
+        if args.stream:
+            with JsonlWriter(stream_file, fsync_every=args.fsync_every) as writer:
+                scraped, errors = stream_all(urls, writer, args.concurrency, args.rate, checkpoint,
+                                             args.parse_workers)
         else:
-            errors.append(url)
-        
-        # Pausa para no saturar el servidor
-        time.sleep(1)
+            products, errors = scrape_all(urls, args.concurrency, args.rate, checkpoint,
+                                          args.parse_workers)
+            scraped = len(products)
+    
+    if found is not None:
+        failed = set(errors)
+        commit(state, found, [url for url in urls if url not in failed])
+        state.close()
     
     print()
     print("=" * 60)
-    print(f"✅ Productos extraídos: {len(products)}")
+    print(f"✅ Productos extraídos: {scraped}")
     print(f"❌ Errores: {len(errors)}")
+    print(f"🌐 {client.format_summary()}")
+    if cache is not None:
+        print(f"💾 {cache.format_summary()}")
+    print(f"📌 {checkpoint.format_summary()}")
+    if parse_pipeline is not None:
+        print(f"⚙️  {parse_pipeline.format_summary()}")
+    if recorder is not None:
+        recorder.close()
+        print(f"📼 {recorder.recorded} respuestas grabadas en: {args.record}")
     
     # Guardar JSON
-    output_file = 'productos_cesantoni.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(products, f, ensure_ascii=False, indent=2)
+    with metrics.timer("write"):
+        if found is not None:
+            # Solo se scrapeó lo nuevo o modificado: se aplica al catálogo completo
+            delta = iter_jsonl(stream_file) if args.stream else products
+            total, new, updated, dropped = merge_catalog(output_file, delta, found.removed)
+        elif args.stream:
+            compact(stream_file, output_file)
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(products, f, ensure_ascii=False, indent=2)
+    if args.stream:
+        print(f"\n📝 Stream: {stream_file}")
+        preview = [p for p, _ in zip(iter_jsonl(stream_file), range(5))]
+    else:
+        preview = products[:5]
     
     print(f"\n📁 Guardado en: {output_file}")
+    if found is not None:
+        print(f"   Catálogo: {total} productos ({new} nuevos, {updated} actualizados, "
+              f"{dropped} quitados)")
+    
+    # Tiempos por fase: dónde se fue la corrida
+    report_file = args.metrics or metrics_path(output_file)
+    extra = {"http": client.summary()}
+    if parse_pipeline is not None:
+        extra["pipeline"] = parse_pipeline.summary()
+    metrics.write_json(report_file, extra=extra)
+    print(f"\n⏱️  Tiempos por fase ({report_file}):")
+    print(metrics.format_table())
     
     # Mostrar resumen
     print("\n--- RESUMEN ---")
-    for p in products[:5]:
+    for p in preview:
         print(f"  • {p['name']} ({p['sku']}) - {p['format'] or 'Sin formato'}")
-    if len(products) > 5:
-        print(f"  ... y {len(products) - 5} más")
+    if scraped > 5:
+        print(f"  ... y {scraped - 5} más")
     
     if errors:
         print("\n--- ERRORES ---")
         for url in errors:
             print(f"  • {url}")
     
-    print("\n✅ Listo! Ahora sube 'productos_cesantoni.json' a Claude para importar a la DB")
+    if found is not None:
+        print(f"\n✅ Listo! Catálogo completo al día: importar con --mode merge '{output_file}'")
+    else:
+        print(f"\n✅ Listo! Ahora sube '{output_file}' a Claude para importar a la DB")
 
 if __name__ == '__main__':
     main()
@@ -4,23 +4,60 @@ Scrape cesantoni.com.mx to find close-up tile images (C1 images) for products
 that are missing them in the CRM database.
 
 Strategy:
-1. Fetch all products from the Render API
-2. Identify those without _C1 images in their gallery
+1. Stream the product list from the Render API (or the local DB)
+2. Pick out those without _C1 images in their gallery as they arrive
 3. For each, try multiple approaches to find the C1 image:
    a. Scrape the product page on cesantoni.com.mx
    b. Try constructing C1 URLs from known naming patterns
    c. Try HEAD requests to verify constructed URLs exist
+   d. Fall back to alternate slugs, partial and parent product names
 4. Output results to tile-images.json
+
+Usage:
+  python3 scripts/scrape-tile-images.py [--concurrency 8] [--rate 8]
+  python3 scripts/scrape-tile-images.py --source sqlite:data/cesantoni.db --apply
+  python3 -m cesantoni_tools tiles --resume     # or CESANTONI_TILES_RESUME=1
+
+Main options (all of them in --help):
+  --concurrency N       products searched at once
+  --rate R              requests per second per host: pages, probes and image sizes
+  --source sqlite:PATH  read the products from the DB (read-only unless --apply)
+  --apply               append the C1 images found to the galleries in that DB
+  --resume              skip products already searched (--checkpoint journal)
+  --no-cache            skip the page and URL probe caches
+  --record F, --proxy U record a cassette / run against the replaying stub
 """
 
+import argparse
 import ssl
-import urllib.request
-import urllib.error
 import json
+import queue
 import re
+import sqlite3
+import threading
 import time
 import os
 import sys
+from collections import namedtuple
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cesantoni_tools.checkpoint import Checkpoint
+from cesantoni_tools.config import env_defaults
+from cesantoni_tools.crawl import first_true
+from cesantoni_tools.fixtures import Recorder
+from cesantoni_tools.breaker import HostBreaker
+from cesantoni_tools.c1match import C1Page, name_tokens
+from cesantoni_tools.httpclient import HttpClient, RetryPolicy, Timeout, TransientError
+from cesantoni_tools.imageprobe import DimensionProbe, srcset_widths
+from cesantoni_tools.jsonstream import iter_json_array
+from cesantoni_tools.metrics import Metrics, profile_to
+from cesantoni_tools.pagecache import DEFAULT_PATH, PageCache
+from cesantoni_tools import probecache
+from cesantoni_tools.probecache import PatternStats
+from cesantoni_tools.stages import StagePipeline
+from cesantoni_tools.throttle import HostThrottle, TokenBucket
 
 # --- Configuration ---
 API_URL = "https://cesantoni-experience-za74.onrender.com/api/products"
@@ -29,6 +66,8 @@ PRODUCT_URL_TEMPLATE = BASE_SITE + "/producto/{slug}/"
 WP_UPLOADS = BASE_SITE + "/wp-content/uploads/"
 OUTPUT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, "tile-images.json")
+CHECKPOINT_FILE = os.path.join(os.path.dirname(OUTPUT_DIR), ".cache", "tiles-checkpoint.jsonl")
+DB_PATH = os.path.join(os.path.dirname(OUTPUT_DIR), "data", "cesantoni.db")
 USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
 # SSL context that skips verification (needed for this environment)
@@ -36,88 +75,124 @@ ssl_ctx = ssl.create_default_context()
 ssl_ctx.check_hostname = False
 ssl_ctx.verify_mode = ssl.CERT_NONE
 
+# Per-phase timings for the run; main() starts a fresh one
+metrics = Metrics()
 
-def fetch_url(url, timeout=20):
-    """Fetch a URL and return the response body as string. Returns None on error."""
-    try:
-        req = urllib.request.Request(url)
-        req.add_header("User-Agent", USER_AGENT)
-        resp = urllib.request.urlopen(req, timeout=timeout, context=ssl_ctx)
-        return resp.read().decode("utf-8", errors="replace")
-    except (urllib.error.URLError, urllib.error.HTTPError, Exception) as e:
+# Shared keep-alive client; main() rebuilds it with the --pool-size given
+client = HttpClient(pool_size=8, timeout=Timeout(connect=10, read=20),
+                    retry=RetryPolicy(retries=3, backoff=1.0),
+                    ssl_context=ssl_ctx, headers={"User-Agent": USER_AGENT},
+                    metrics=metrics)
+
+# Conditional-GET cache for product pages and persistent probe results; set up by main()
+page_cache = None
+probe_cache = None
+# Per-pattern hit statistics; None keeps the fixed candidate order
+pattern_stats = None
+
+# Politeness: one token bucket per host shared by every request made to it
+# (product pages, URL probes, Range reads of image sizes), instead of a
+# fixed sleep between requests
+host_throttle = HostThrottle(rate=8, metrics=metrics)
+
+# Constructed-URL probing: candidates tested in parallel
+probe_concurrency = 6
+
+# Products searched at once; product_pace (--delay) optionally spaces out the
+# start of each search
+search_concurrency = 8
+product_pace = None
+
+# Real image sizes of competing C1 candidates (Range requests); None ranks by URL text only
+dimension_probe = None
+dimension_candidates = 6
+
+
+def is_transient(status):
+    """True for statuses worth retrying later (server errors, rate limiting)."""
+    return status is None or status == 429 or status >= 500
+
+
+def body_or_none(url, resp):
+    """Decoded body of a 2xx, None for a definite answer such as 404.
+
+    A 5xx/429 still failing after the client's retries raises TransientError,
+    so the product is recorded as failed (and retried with --resume) instead
+    of silently ending up as NOT FOUND.
+    """
+    if is_transient(resp.status_code):
+        raise TransientError(f"{url}: HTTP {resp.status_code}")
+    if not resp.ok:
         return None
+    return resp.content.decode("utf-8", errors="replace")
 
 
-def head_url(url, timeout=10):
-    """Check if a URL exists via HEAD request. Returns True if status 200."""
+def fetch_url(url, timeout=20):
+    """Fetch a URL and return the response body as string (None if it does not exist).
+
+    Network errors and 5xx/429 after retries raise TransientError.
+    """
     try:
-        req = urllib.request.Request(url, method="HEAD")
-        req.add_header("User-Agent", USER_AGENT)
-        resp = urllib.request.urlopen(req, timeout=timeout, context=ssl_ctx)
-        return resp.status == 200
-    except Exception:
-        # Some servers reject HEAD, try GET with range
-        try:
-            req = urllib.request.Request(url)
-            req.add_header("User-Agent", USER_AGENT)
-            req.add_header("Range", "bytes=0-0")
-            resp = urllib.request.urlopen(req, timeout=timeout, context=ssl_ctx)
-            return resp.status in (200, 206)
-        except Exception:
-            return False
+        resp = client.get(url, timeout=timeout)
+    except Exception as e:
+        raise TransientError(f"{url}: {type(e).__name__}: {e}") from e
+    return body_or_none(url, resp)
+
 
+def fetch_page(url, timeout=20):
+    """Like fetch_url, but revalidates against the page cache when it is enabled."""
+    if page_cache is None:
+        return fetch_url(url, timeout=timeout)
+    try:
+        resp = page_cache.fetch(client, url, timeout=timeout)
+    except Exception as e:
+        raise TransientError(f"{url}: {type(e).__name__}: {e}") from e
+    return body_or_none(url, resp)
 
-def extract_c1_images_from_html(html):
-    """Extract all image URLs containing _C1 from HTML content."""
-    pattern = r'https?://[^\s"\'<>]+?_C1[^\s"\'<>]*\.(?:jpg|jpeg|png|webp)'
-    matches = re.findall(pattern, html, re.IGNORECASE)
-    return list(set(matches))
 
+def probe_status(url, timeout=10):
+    """HTTP status of a HEAD request, falling back to a 1-byte ranged GET. None if unreachable."""
+    status = None
+    try:
+        status = client.head(url, timeout=timeout).status_code
+        if status == 200:
+            return status
+    except Exception:
+        pass
+    # Some servers reject HEAD, try GET with range
+    try:
+        resp = client.get(url, timeout=timeout, headers={"Range": "bytes=0-0"}, read_body=False)
+        return resp.status_code
+    except Exception:
+        return status
 
-def filter_own_c1(images, product_name):
-    """Filter C1 images to only those matching the product name."""
-    name_upper = product_name.upper().strip()
-    name_underscore = name_upper.replace(" ", "_")
-    name_nospace = name_upper.replace(" ", "")
 
-    results = []
-    for img in images:
-        img_upper = img.upper()
-        if name_underscore in img_upper or name_nospace in img_upper:
-            results.append(img)
+def lookup_url(url, timeout=10):
+    """Return (exists, probed): the probe cache's answer if fresh, else a rate-limited probe.
 
-    return results
+    `exists` is None when the probe could not get a definite answer (network
+    error or 5xx/429 after retries).
+    """
+    if probe_cache is not None:
+        cached = probe_cache.get(url)
+        if cached is not None:
+            return cached, False
+    host_throttle.wait(url)
+    with metrics.timer("probe"):
+        status = probe_status(url, timeout=timeout)
+    if probe_cache is not None:
+        probe_cache.put(url, status)
+    if is_transient(status):
+        return None, True
+    return status in (200, 206), True
 
 
-def get_best_c1(images):
-    """From a list of C1 image URLs, pick the best one (prefer full size, no resize suffix)."""
-    if not images:
-        return None
+def head_url(url, timeout=10):
+    """Check if a URL exists via HEAD request. Returns True if status 200.
 
-    scored = []
-    for img in images:
-        score = 0
-        # Prefer exact _C1 (not _C12, _C14, etc.)
-        if re.search(r'_C1[^0-9]', img) or re.search(r'_C1\.(jpg|jpeg|png|webp)', img, re.IGNORECASE):
-            score += 100
-        elif re.search(r'_C1-', img):
-            score += 90  # _C1-1, _C1-e... are still C1
-        # Penalize resized versions (e.g., -1024x512, -300x150)
-        if re.search(r'-\d+x\d+\.', img):
-            score -= 50
-        # Prefer no double-slash in path
-        cleaned = img.replace("https://", "").replace("http://", "")
-        if "//" not in cleaned:
-            score += 10
-        # Prefer .jpg
-        if img.lower().endswith('.jpg') or img.lower().endswith('.jpeg'):
-            score += 5
-        elif img.lower().endswith('.webp'):
-            score += 3
-        scored.append((score, img))
-
-    scored.sort(key=lambda x: -x[0])
-    return scored[0][1]
+    A fresh answer in the probe cache is returned without touching the network.
+    """
+    return lookup_url(url, timeout=timeout)[0] is True
 
 
 def normalize_format(fmt):
@@ -133,8 +208,12 @@ def normalize_format(fmt):
     return fmt
 
 
-def construct_c1_candidates(product_name, product_format):
-    """Construct possible C1 URL candidates based on naming conventions."""
+def keyed_c1_candidates(product_name, product_format):
+    """Construct possible C1 URL candidates as (pattern, url) pairs, in default priority order.
+
+    The pattern (e.g. 'NAME_FMT_C1.jpg') identifies the naming convention so hit
+    statistics can be kept per pattern and extension.
+    """
     candidates = []
     name = product_name.upper().replace(" ", "_")
     fmt = normalize_format(product_format)
@@ -144,113 +223,540 @@ def construct_c1_candidates(product_name, product_format):
     # Pattern 1: NAME_FORMATcm_C1.ext
     if fmt:
         for ext in extensions:
-            candidates.append(f"{WP_UPLOADS}{name}_{fmt}_C1{ext}")
+            candidates.append((f"NAME_FMT_C1{ext}", f"{WP_UPLOADS}{name}_{fmt}_C1{ext}"))
 
     # Pattern 2: NAME_C1.ext (no format)
     for ext in extensions:
-        candidates.append(f"{WP_UPLOADS}{name}_C1{ext}")
+        candidates.append((f"NAME_C1{ext}", f"{WP_UPLOADS}{name}_C1{ext}"))
 
     # Pattern 3: With -1 suffix
     if fmt:
         for ext in extensions:
-            candidates.append(f"{WP_UPLOADS}{name}_{fmt}_C1-1{ext}")
+            candidates.append((f"NAME_FMT_C1-1{ext}", f"{WP_UPLOADS}{name}_{fmt}_C1-1{ext}"))
 
     # Pattern 4: Capitalized name (e.g., Calacatta_Black)
     name_title = "_".join(w.capitalize() for w in product_name.split())
     if name_title != name:
         if fmt:
             for ext in extensions:
-                candidates.append(f"{WP_UPLOADS}{name_title}_{fmt}_C1{ext}")
+                candidates.append((f"Title_FMT_C1{ext}", f"{WP_UPLOADS}{name_title}_{fmt}_C1{ext}"))
         for ext in extensions:
-            candidates.append(f"{WP_UPLOADS}{name_title}_C1{ext}")
+            candidates.append((f"Title_C1{ext}", f"{WP_UPLOADS}{name_title}_C1{ext}"))
 
     # Pattern 5: Original casing with underscores
     name_orig = product_name.replace(" ", "_")
     if name_orig != name and name_orig != name_title:
         if fmt:
             for ext in extensions:
-                candidates.append(f"{WP_UPLOADS}{name_orig}_{fmt}_C1{ext}")
+                candidates.append((f"Orig_FMT_C1{ext}", f"{WP_UPLOADS}{name_orig}_{fmt}_C1{ext}"))
         for ext in extensions:
-            candidates.append(f"{WP_UPLOADS}{name_orig}_C1{ext}")
+            candidates.append((f"Orig_C1{ext}", f"{WP_UPLOADS}{name_orig}_C1{ext}"))
 
     return candidates
 
 
+def construct_c1_candidates(product_name, product_format):
+    """Construct possible C1 URL candidates based on naming conventions."""
+    return [url for _, url in keyed_c1_candidates(product_name, product_format)]
+
+
+def gallery_has_c1(gallery):
+    """True if a product's gallery (JSON-encoded list, list or null) has a _C1 image.
+
+    The API sends the gallery as a JSON string; "_C1" can only occur inside
+    one of its URLs, so the string is searched as is rather than decoded.
+    """
+    if not gallery:
+        return False
+    if isinstance(gallery, str):
+        return "_C1" in gallery
+    return any("_C1" in img for img in gallery)
+
+
+class ProductFeed:
+    """Products missing C1, streamed from the API by a background thread.
+
+    The response is decoded one product at a time while it downloads;
+    products that already have a C1 image are only counted, the rest are
+    queued for the search loop, which can start on the first one right away.
+    Iterating raises TransientError if the download fails or is cut short.
+    """
+
+    _END = object()
+
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+        self.total = 0
+        self.has_c1 = 0
+        self.missing = 0
+        self.complete = False
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._read, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _read(self):
+        try:
+            with metrics.timer("api"), client.stream(self.url, timeout=self.timeout) as resp:
+                if not resp.ok:
+                    raise TransientError(f"{self.url}: HTTP {resp.status_code}")
+                for product in iter_json_array(resp.iter_content()):
+                    self.total += 1
+                    if gallery_has_c1(product.get("gallery")):
+                        self.has_c1 += 1
+                    else:
+                        self.missing += 1
+                        self._queue.put(product)
+            self.complete = True
+        except TransientError as e:
+            self._queue.put(e)
+        except Exception as e:
+            self._queue.put(TransientError(f"{self.url}: {type(e).__name__}: {e}"))
+        finally:
+            self._queue.put(self._END)
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is self._END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+# Same test as gallery_has_c1(), in SQL; the partial index lists exactly these rows
+MISSING_C1_SQL = "instr(coalesce(gallery, ''), '_C1') = 0"
+MISSING_C1_INDEX_SQL = f"""
+    CREATE INDEX IF NOT EXISTS idx_products_missing_c1 ON products(name)
+    WHERE {MISSING_C1_SQL}
+"""
+PRODUCT_COLUMNS = ("id", "name", "slug", "format", "gallery")
+
+
+class SqliteFeed:
+    """Products missing C1 read from the local products table (--source sqlite:PATH).
+
+    Same interface as ProductFeed, in the API's order (by name). The query
+    goes through a partial index over the rows without C1, so the rows that
+    already have one are never read. The database is opened read-only unless
+    `writable` (--apply), which is also the only time the index is created.
+    """
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.writable = writable
+        self.total = 0
+        self.has_c1 = 0
+        self.missing = 0
+        self.complete = True
+        self._db = None
+
+    def start(self):
+        # Iterated from the pipeline's feed thread
+        if self.writable:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            with self._db:
+                self._db.execute(MISSING_C1_INDEX_SQL)
+        else:
+            uri = f"file:{quote(os.path.abspath(self.path))}?mode=ro"
+            self._db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self.total = self._db.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+        self.missing = self._db.execute(
+            f"SELECT COUNT(*) FROM products WHERE {MISSING_C1_SQL}").fetchone()[0]
+        self.has_c1 = self.total - self.missing
+        return self
+
+    def __iter__(self):
+        rows = self._db.execute(
+            f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products WHERE {MISSING_C1_SQL} ORDER BY name")
+        for row in rows:
+            yield dict(zip(PRODUCT_COLUMNS, row))
+
+    def close(self):
+        self._db.close()
+
+
+def apply_results(path, results):
+    """Append each found C1 URL ({id: url}) to its product's gallery, in one transaction.
+
+    Products that got a C1 image some other way since the search are left
+    alone. Returns the number of products updated.
+    """
+    db = sqlite3.connect(path)
+    try:
+        with db:
+            galleries = dict(db.execute(f"SELECT id, gallery FROM products WHERE {MISSING_C1_SQL}"))
+            updates = []
+            for pid, url in results.items():
+                if int(pid) not in galleries:
+                    continue
+                try:
+                    gallery = json.loads(galleries[int(pid)] or "[]")
+                except (json.JSONDecodeError, TypeError):
+                    gallery = []
+                if not isinstance(gallery, list):
+                    gallery = []
+                gallery.append(url)
+                # Compact, like the JSON.stringify() that wrote the other galleries
+                updates.append((json.dumps(gallery, ensure_ascii=False, separators=(",", ":")), int(pid)))
+            db.executemany(
+                f"UPDATE products SET gallery = ?, updated_at = CURRENT_TIMESTAMP "
+                f"WHERE id = ? AND {MISSING_C1_SQL}", updates)
+    finally:
+        db.close()
+    return len(updates)
+
+
+def parse_source(value):
+    """'api' or 'sqlite:PATH' (PATH defaults to data/cesantoni.db) -> (kind, path)."""
+    if value == "api":
+        return "api", None
+    if value.startswith("sqlite:"):
+        return "sqlite", value[len("sqlite:"):] or DB_PATH
+    raise argparse.ArgumentTypeError(f"expected 'api' or 'sqlite:PATH', got {value!r}")
+
+
+class PageAnalysis:
+    """Per-run memo of product pages: each URL is fetched and scanned for C1 images once.
+
+    Strategies A, C and D all look at product pages; they share the scanned
+    and scored C1Page here instead of downloading and scanning it again.
+    """
+
+    def __init__(self):
+        self.requested = 0
+        self.fetched = 0
+        self._results = {}
+        self._url_locks = {}
+        self._lock = threading.Lock()
+
+    def c1_images(self, url):
+        """The page's C1 images as a C1Page, or None if the page could not be fetched."""
+        with self._lock:
+            self.requested += 1
+            url_lock = self._url_locks.setdefault(url, threading.Lock())
+        with url_lock:
+            if url not in self._results:
+                host_throttle.wait(url)
+                with metrics.timer("fetch"):
+                    html = fetch_page(url, timeout=25)
+                with self._lock:
+                    self.fetched += 1
+                with metrics.timer("parse"):
+                    page = C1Page(html) if html else None
+                    if page and dimension_probe is not None:
+                        page.widths = srcset_widths(html)
+                    self._results[url] = page
+            return self._results[url]
+
+    def format_summary(self):
+        return f"Pages: {self.requested} requested, {self.fetched} fetched"
+
+
+# Replaced with a fresh instance at the start of every run
+pages = PageAnalysis()
+
+
 def scrape_product_page(slug, product_name):
     """Scrape a product page for C1 images matching the product name."""
     if not slug:
         return None
 
     url = PRODUCT_URL_TEMPLATE.format(slug=slug)
-    html = fetch_url(url, timeout=25)
-    if not html:
+    all_c1 = pages.c1_images(url)
+    if not all_c1:
         return None
 
-    all_c1 = extract_c1_images_from_html(html)
-    own_c1 = filter_own_c1(all_c1, product_name)
+    return pick_c1(all_c1, name_tokens(product_name))
 
-    if own_c1:
-        return get_best_c1(own_c1)
 
-    return None
+def pick_c1(page, tokens):
+    """The C1 image of `page` for the name `tokens`: the largest real image when probing.
 
+    Candidates with the same _C1 marker are ranked by width and height (from
+    the page's srcset, or else from a Range probe of the file header), then
+    file size; candidates whose size could not be read come after, in the
+    URL-text order of get_best_c1().
+    """
+    if dimension_probe is None:
+        return page.best(tokens)
+    contenders = page.contenders(tokens, dimension_candidates)
+    if len(contenders) < 2:
+        return contenders[0].url if contenders else None
 
-def try_constructed_urls(product_name, product_format):
-    """Try constructed C1 URLs via HEAD requests."""
-    candidates = construct_c1_candidates(product_name, product_format)
+    unknown = [c.url for c in contenders if c.url not in page.widths]
+    infos = dimension_probe.probe_all(unknown, concurrency=probe_concurrency) if unknown else {}
+
+    def size(candidate):
+        info = infos.get(candidate.url)
+        if info is not None:
+            return (1, info.width, info.height, info.size or 0)
+        if candidate.url in page.widths:
+            return (1, page.widths[candidate.url], 0, 0)
+        return (0, 0, 0, 0)
 
-    for url in candidates:
-        if head_url(url):
-            return url
-        time.sleep(0.15)
+    # contenders is already in URL-text order; max() keeps the first of equals
+    return max(contenders, key=size).url
 
+
+def probe_candidate(candidate):
+    """Check one (pattern, url) candidate, recording network probes in pattern_stats.
+
+    Returns True/False, or None when the probe failed transiently.
+    """
+    pattern, url = candidate
+    exists, probed = lookup_url(url)
+    if probed and exists is not None and pattern_stats is not None:
+        pattern_stats.record(pattern, exists)
+    return exists
+
+
+def try_constructed_urls(product_name, product_format):
+    """Try constructed C1 URLs via HEAD requests.
+
+    Candidates are ordered by observed pattern success rate (when stats are
+    enabled) and probed concurrently, but the result is the first existing URL
+    in that order, exactly as if they had been tried one by one.
+    """
+    candidates = keyed_c1_candidates(product_name, product_format)
+    if pattern_stats is not None:
+        candidates = pattern_stats.rank(candidates)
+    unknown = []
+
+    def test(candidate):
+        exists = probe_candidate(candidate)
+        if exists is None:
+            unknown.append(candidate[1])
+        return exists
+
+    hit = first_true(candidates, test, concurrency=probe_concurrency)
+    if hit:
+        return hit[1]
+    if unknown:
+        # Some candidates could not be checked: "not found" would not be reliable
+        raise TransientError(f"{len(unknown)} probes failed, e.g. {unknown[0]}")
     return None
 
 
-def main():
+Found = namedtuple("Found", "url by_probe how")
+
+
+class Search:
+    """One product on its way through the search stages; `found` is set by the stage that finds its C1."""
+
+    def __init__(self, product):
+        self.product = product
+        self.key = str(product["id"])
+        self.found = None
+        self.started = None
+
+
+def by_page(search):
+    """Stage 1, strategy A: scrape the product page."""
+    if product_pace is not None:
+        with metrics.timer("sleep"):
+            product_pace.acquire()
+    search.started = time.perf_counter()
+    product = search.product
+    slug = product.get("slug")
+    if slug:
+        c1_url = scrape_product_page(slug, product["name"])
+        if c1_url:
+            search.found = Found(c1_url, False, "page scrape")
+    return search.found
+
+
+def by_probe(search):
+    """Stage 2, strategy B: try constructed URLs via HEAD requests."""
+    product = search.product
+    c1_url = try_constructed_urls(product["name"], product.get("format", ""))
+    if c1_url:
+        search.found = Found(c1_url, True, "URL probe")
+    return search.found
+
+
+def by_fallback(search):
+    """Stage 3, strategies C-E: alternate slug, partial name match, parent product name."""
+    product = search.product
+    name = product["name"]
+    slug = product.get("slug")
+    fmt = product.get("format", "")
+
+    # Strategy C: Try alternate slug variants for page scrape
+    if slug:
+        alt_name = name.lower().strip().replace(" ", "-")
+        alt_name = re.sub(r'[^a-z0-9-]', '', alt_name)
+        alt_name = re.sub(r'-+', '-', alt_name).strip('-')
+        if alt_name != slug:
+            c1_url = scrape_product_page(alt_name, name)
+            if c1_url:
+                search.found = Found(c1_url, False, f"alt slug '{alt_name}'")
+                return search.found
+
+    # Strategy D: Broader search on page - try partial name matching
+    if slug:
+        url = PRODUCT_URL_TEMPLATE.format(slug=slug)
+        all_c1 = pages.c1_images(url)
+        if all_c1:
+            # Try matching with just the first word of the product name
+            first_word = name.split()[0].upper()
+            if len(first_word) >= 4:
+                c1_url = pick_c1(all_c1, (first_word,))
+                if c1_url:
+                    search.found = Found(c1_url, False, "partial match")
+                    return search.found
+
+    # Strategy E: For Malla/Paver products, try parent product name
+    if not slug:
+        # e.g., "Alpes Malla" -> try "ALPES" C1
+        parts = name.split()
+        if len(parts) >= 2 and parts[-1] in ("Malla", "Paver"):
+            parent_name = " ".join(parts[:-1])
+            c1_url = try_constructed_urls(parent_name, fmt)
+            if c1_url:
+                search.found = Found(c1_url, True, f"parent '{parent_name}' probe")
+    return search.found
+
+
+SEARCH_STAGES = [("page", by_page), ("probe", by_probe), ("fallback", by_fallback)]
+
+
+def search_product(product):
+    """Run strategies A-E for one product; returns (c1_url or None, found by probing?)"""
+    search = Search(product)
+    for _, step in SEARCH_STAGES:
+        if step(search):
+            return search.found.url, search.found.by_probe
+    return None, False
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find C1 tile images for products missing them")
+    parser.add_argument("--pool-size", type=int, default=8,
+                        help="keep-alive connections per host (default: 8)")
+    parser.add_argument("--cache", default=DEFAULT_PATH,
+                        help="page cache file (default: .cache/pages.sqlite)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="disable the page and probe caches")
+    parser.add_argument("--max-age", type=float, default=None,
+                        help="reuse cached pages younger than this many seconds without revalidating")
+    parser.add_argument("--probe-cache", default=probecache.DEFAULT_PATH,
+                        help="probe result cache file (default: .cache/probes.sqlite)")
+    parser.add_argument("--hit-ttl", type=float, default=probecache.DEFAULT_HIT_TTL,
+                        help="seconds a cached 'exists' answer stays valid (default: 30 days)")
+    parser.add_argument("--miss-ttl", type=float, default=probecache.DEFAULT_MISS_TTL,
+                        help="seconds a cached 'missing' answer stays valid (default: 7 days)")
+    parser.add_argument("--explore", type=float, default=0.1,
+                        help="chance of still probing a pruned low-success pattern (default: 0.1)")
+    parser.add_argument("--prune-below", type=float, default=0.01,
+                        help="prune patterns whose hit rate is below this after 25 tries (default: 0.01)")
+    parser.add_argument("--probe-concurrency", type=int, default=probe_concurrency,
+                        help=f"candidate URLs probed at once (default: {probe_concurrency})")
+    parser.add_argument("--dimension-candidates", type=int, default=dimension_candidates,
+                        help="C1 images per product compared by their real size "
+                             f"(default: {dimension_candidates})")
+    parser.add_argument("--no-dimensions", action="store_true",
+                        help="rank C1 images by URL text only, without reading their size")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="retries with exponential backoff for errors and 5xx/429 (default: 3)")
+    parser.add_argument("--breaker-cooldown", type=float, default=30.0,
+                        help="seconds a host is paused when its error rate spikes (default: 30)")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE,
+                        help="per-product progress journal (default: .cache/tiles-checkpoint.jsonl)")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip products already searched in the checkpoint, retry failed ones")
+    parser.add_argument("--source", type=parse_source, default="api",
+                        help="where to read products: 'api' (default) or 'sqlite:PATH' "
+                             "for the local database (sqlite: alone means data/cesantoni.db)")
+    parser.add_argument("--api-url", default=API_URL,
+                        help="products API read with --source api (default: the Render deployment)")
+    parser.add_argument("--apply", action="store_true",
+                        help="with --source sqlite:PATH, append the C1 images found to the "
+                             "products' galleries in that database (otherwise it is only read)")
+    parser.add_argument("--concurrency", type=int, default=search_concurrency,
+                        help=f"products searched at once (default: {search_concurrency})")
+    parser.add_argument("--rate", type=float, default=host_throttle.rate,
+                        help="requests per second per host, shared by page fetches, URL probes "
+                             f"and image size reads (default: {host_throttle.rate:g})")
+    # Older name of --rate, from when only the probes were throttled
+    parser.add_argument("--probe-rate", type=float, dest="rate", default=argparse.SUPPRESS,
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="minimum seconds between the start of two product searches "
+                             "(default: 0, only --rate applies)")
+    parser.add_argument("--output", default=OUTPUT_FILE,
+                        help="results file (default: scripts/tile-images.json)")
+    parser.add_argument("--metrics", default=None,
+                        help="per-phase timing report (default: <output>.metrics.json)")
+    parser.add_argument("--profile", nargs="?", const="tiles.prof", default=None, metavar="FILE",
+                        help="save a cProfile dump of the run (default: tiles.prof)")
+    parser.add_argument("--record", default=None, metavar="FILE",
+                        help="record every HTTP exchange to a JSONL cassette (use with --no-cache)")
+    parser.add_argument("--proxy", default=None, metavar="URL",
+                        help="send all requests through this HTTP proxy (e.g. the replay stub server)")
+    env_defaults(parser, "TILES")
+    args = parser.parse_args(argv)
+    if args.apply and args.source[0] != "sqlite":
+        parser.error("--apply needs --source sqlite:PATH")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with profile_to(args.profile):
+        run(args)
+    if args.profile:
+        print(f"cProfile stats written to: {args.profile} (python3 -m pstats {args.profile})")
+
+
+def run(args):
+    global client, page_cache, probe_cache, pattern_stats, pages, host_throttle, probe_concurrency
+    global metrics, dimension_probe, dimension_candidates, product_pace, search_concurrency
+    metrics = Metrics()
+    pages = PageAnalysis()
+    host_throttle = HostThrottle(rate=args.rate, metrics=metrics)
+    product_pace = TokenBucket(1 / args.delay) if args.delay > 0 else None
+    search_concurrency = args.concurrency
+    probe_concurrency = args.probe_concurrency
+    recorder = Recorder(args.record) if args.record else None
+    client = HttpClient(pool_size=args.pool_size, timeout=client.timeout,
+                        retry=RetryPolicy(retries=args.retries, backoff=1.0),
+                        breaker=HostBreaker(cooldown=args.breaker_cooldown),
+                        ssl_context=ssl_ctx, headers={"User-Agent": USER_AGENT},
+                        metrics=metrics, proxy=args.proxy, recorder=recorder)
+    dimension_candidates = args.dimension_candidates
+    dimension_probe = None if args.no_dimensions else DimensionProbe(
+        client, throttle=host_throttle, metrics=metrics)
+    if not args.no_cache:
+        page_cache = PageCache(args.cache, max_age=args.max_age)
+        probe_cache = probecache.ProbeCache(args.probe_cache, hit_ttl=args.hit_ttl,
+                                            miss_ttl=args.miss_ttl)
+        pattern_stats = PatternStats(args.probe_cache, prune_below=args.prune_below,
+                                     explore=args.explore)
+
     print("=" * 70)
     print("CESANTONI C1 TILE IMAGE SCRAPER")
     print("=" * 70)
     print()
 
-    # Step 1: Fetch all products
-    print("[1/4] Fetching products from API...")
-    html = fetch_url(API_URL, timeout=30)
-    if not html:
-        print("ERROR: Could not fetch products from API")
-        sys.exit(1)
-
-    products = json.loads(html)
-    print(f"      Found {len(products)} total products")
-
-    # Step 2: Identify products without C1
-    print("[2/4] Identifying products without C1 images...")
-    missing_c1 = []
-    has_c1_count = 0
-
-    for p in products:
-        gallery = p.get("gallery", "[]")
-        if isinstance(gallery, str):
-            try:
-                gallery = json.loads(gallery)
-            except (json.JSONDecodeError, TypeError):
-                gallery = []
-        if not gallery:
-            gallery = []
-
-        found = False
-        for img in gallery:
-            if "_C1" in img:
-                found = True
-                break
-
-        if found:
-            has_c1_count += 1
-        else:
-            missing_c1.append(p)
-
-    print(f"      {has_c1_count} products already have C1 images")
-    print(f"      {len(missing_c1)} products are MISSING C1 images")
+    # Steps 1-2: Stream the products, keeping only those without C1
+    source, db_path = args.source
+    if source == "sqlite":
+        print(f"[1/4] Reading products from {db_path}...")
+        try:
+            feed = SqliteFeed(db_path, writable=args.apply).start()
+        except sqlite3.Error as e:
+            print(f"ERROR: Could not read products from {db_path}: {e}")
+            sys.exit(1)
+        print(f"[2/4] {feed.missing} of {feed.total} products have no C1 image")
+    else:
+        print("[1/4] Streaming products from API...")
+        print("[2/4] Products without C1 images are searched as they arrive")
+        feed = ProductFeed(args.api_url).start()
     print()
 
     # Step 3: Scrape for C1 images
@@ -258,103 +764,135 @@ def main():
     print("-" * 70)
 
     results = {}
+    names = {}
     found_count = 0
+    probe_found = 0
     not_found = []
+    failed = []
+
+    checkpoint = Checkpoint(args.checkpoint, resume=args.resume)
+    if args.resume:
+        print(f"      Resuming from {args.checkpoint}: products already searched are skipped")
+
+    def already_searched(search):
+        # Searched in a previous run: reuse the outcome without any request
+        return not checkpoint.pending([search.key])
 
-    for i, product in enumerate(missing_c1):
+    def finish(i, search, error):
+        nonlocal found_count, probe_found
+        product = search.product
         pid = product["id"]
         name = product["name"]
         slug = product.get("slug")
         fmt = product.get("format", "")
+        key = search.key
 
-        progress = f"[{i+1}/{len(missing_c1)}]"
-        print(f"  {progress} {name} (id={pid}, slug={slug}, format={fmt})")
-
-        c1_url = None
-
-        # Strategy A: Scrape the product page
-        if slug:
-            c1_url = scrape_product_page(slug, name)
-            if c1_url:
-                print(f"         FOUND (page scrape): {c1_url}")
-
-        # Strategy B: Try constructed URLs via HEAD requests
-        if not c1_url:
-            c1_url = try_constructed_urls(name, fmt)
-            if c1_url:
-                print(f"         FOUND (URL probe): {c1_url}")
-
-        # Strategy C: Try alternate slug variants for page scrape
-        if not c1_url and slug:
-            alt_name = name.lower().strip().replace(" ", "-")
-            alt_name = re.sub(r'[^a-z0-9-]', '', alt_name)
-            alt_name = re.sub(r'-+', '-', alt_name).strip('-')
-            if alt_name != slug:
-                c1_url = scrape_product_page(alt_name, name)
-                if c1_url:
-                    print(f"         FOUND (alt slug '{alt_name}'): {c1_url}")
-
-        # Strategy D: Broader search on page - try partial name matching
-        if not c1_url and slug:
-            url = PRODUCT_URL_TEMPLATE.format(slug=slug)
-            page_html = fetch_url(url, timeout=25)
-            if page_html:
-                all_c1 = extract_c1_images_from_html(page_html)
-                # Try matching with just the first word of the product name
-                first_word = name.split()[0].upper()
-                if len(first_word) >= 4:
-                    partial_matches = [img for img in all_c1 if first_word in img.upper()]
-                    if partial_matches:
-                        c1_url = get_best_c1(partial_matches)
-                        if c1_url:
-                            print(f"         FOUND (partial match): {c1_url}")
-
-        # Strategy E: For Malla/Paver products, try parent product name
-        if not c1_url and not slug:
-            # e.g., "Alpes Malla" -> try "ALPES" C1
-            parts = name.split()
-            if len(parts) >= 2 and parts[-1] in ("Malla", "Paver"):
-                parent_name = " ".join(parts[:-1])
-                c1_url = try_constructed_urls(parent_name, fmt)
-                if c1_url:
-                    print(f"         FOUND (parent '{parent_name}' probe): {c1_url}")
+        if search.started is None and error is None:
+            c1_url, by_probe = checkpoint.result(key)
+        else:
+            # The total is only known once the whole list has arrived
+            progress = f"[{i+1}/{feed.missing}{'' if feed.complete else '+'}]"
+            print(f"  {progress} {name} (id={pid}, slug={slug}, format={fmt})")
+            if search.started is not None:
+                metrics.observe("product", time.perf_counter() - search.started)
+            if error is not None:
+                metrics.count("failed")
+                checkpoint.failed(key, f"{type(error).__name__}: {error}")
+                failed.append({"id": pid, "name": name, "reason": str(error)})
+                print(f"         FAILED: {error}")
+                return
+            found = search.found
+            c1_url, by_probe = (found.url, found.by_probe) if found else (None, False)
+            checkpoint.done(key, [c1_url, by_probe])
+            if found:
+                print(f"         FOUND ({found.how}): {c1_url}")
+            else:
+                print(f"         NOT FOUND")
+            metrics.count("found" if c1_url else "not_found")
 
         if c1_url:
-            results[str(pid)] = c1_url
+            results[key] = c1_url
+            names[key] = name
             found_count += 1
+            probe_found += by_probe
         else:
             not_found.append({"id": pid, "name": name, "slug": slug, "format": fmt})
-            print(f"         NOT FOUND")
-
-        # Rate limiting - be respectful
-        time.sleep(0.5)
 
+    # Products stream through the page / probe / fallback stages, many at once;
+    # finish() sees them in feed order
+    pipeline = StagePipeline(SEARCH_STAGES, concurrency=search_concurrency, metrics=metrics)
+    try:
+        pipeline.run((Search(product) for product in feed), finish, skip=already_searched)
+    except TransientError as e:
+        if not feed.total:
+            print(f"ERROR: Could not fetch products from API: {e}")
+            sys.exit(1)
+        # Products already searched are in the checkpoint; --resume picks up from there
+        print(f"  ERROR: product list cut short after {feed.total} products: {e}")
+
+    checkpoint.close()
     print("-" * 70)
+    print(f"      Found {feed.total} total products")
+    print(f"      {feed.has_c1} products already have C1 images")
+    print(f"      {feed.missing} products are MISSING C1 images")
     print()
 
-    # Step 4: Save results
+    # Step 4: Save results, by product id whatever order the searches finished in
     print("[4/4] Saving results...")
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
-    print(f"      Saved to: {OUTPUT_FILE}")
+    results = dict(sorted(results.items(), key=lambda item: int(item[0])))
+    with metrics.timer("write"):
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"      Saved to: {args.output}")
+    if source == "sqlite":
+        feed.close()
+    if args.apply:
+        with metrics.timer("apply"):
+            applied = apply_results(db_path, results)
+        print(f"      Applied {applied} C1 images to the galleries in {db_path}")
+    if pattern_stats is not None:
+        pattern_stats.save()
     print()
 
     # Summary
     print("=" * 70)
     print("SUMMARY")
     print("=" * 70)
-    print(f"  Total products:           {len(products)}")
-    print(f"  Already had C1:           {has_c1_count}")
-    print(f"  Missing C1 (searched):    {len(missing_c1)}")
+    print(f"  Total products:           {feed.total}")
+    print(f"  Already had C1:           {feed.has_c1}")
+    print(f"  Missing C1 (searched):    {feed.missing}")
     print(f"  C1 images FOUND:          {found_count}")
     print(f"  C1 images NOT FOUND:      {len(not_found)}")
+    if failed:
+        print(f"  Failed (retry --resume):  {len(failed)}")
+    print(f"  {pages.format_summary()}")
+    for line in pipeline.format_summary().splitlines():
+        print(f"  {line}")
+    if dimension_probe is not None:
+        print(f"  {dimension_probe.format_summary()}")
+    print(f"  {client.format_summary()}")
+    if page_cache is not None:
+        print(f"  {page_cache.format_summary()}")
+    if probe_cache is not None:
+        print(f"  {probe_cache.format_summary()}")
+    print(f"  {checkpoint.format_summary()}")
+    if recorder is not None:
+        recorder.close()
+        print(f"  Recorded {recorder.recorded} exchanges to {args.record}")
+    if pattern_stats is not None:
+        per_image = pattern_stats.probes / probe_found if probe_found else float(pattern_stats.probes)
+        print(f"  Probes per image found:   {per_image:.1f} ({pattern_stats.probes} probes, "
+              f"{probe_found} found by probing)")
+        print()
+        print("Candidate pattern stats (all runs):")
+        for line in pattern_stats.format_table().splitlines():
+            print(f"  {line}")
     print()
 
     if results:
         print("FOUND C1 images:")
         for pid, url in results.items():
-            pname = next((p["name"] for p in products if str(p["id"]) == pid), "?")
-            print(f"  id={pid} ({pname}): {url}")
+            print(f"  id={pid} ({names[pid]}): {url}")
         print()
 
     if not_found:
@@ -363,7 +901,20 @@ def main():
             print(f"  id={item['id']} ({item['name']}) [slug={item['slug']}, format={item['format']}]")
         print()
 
-    print(f"Results written to: {OUTPUT_FILE}")
+    if failed:
+        print("Failed (run again with --resume to retry):")
+        for item in failed:
+            print(f"  id={item['id']} ({item['name']}): {item['reason']}")
+        print()
+
+    print(f"Results written to: {args.output}")
+
+    metrics_file = args.metrics or os.path.splitext(args.output)[0] + ".metrics.json"
+    metrics.write_json(metrics_file, extra={"http": client.summary(), "stages": pipeline.summary()})
+    print()
+    print(f"Phase timings (written to {metrics_file}):")
+    for line in metrics.format_table().splitlines():
+        print(f"  {line}")
 
 
 if __name__ == "__main__":
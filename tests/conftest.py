@@ -0,0 +1,25 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('bench', 'benchmarks/suite.py scenarios (tests/test_benchmarks.py)')
+    group.addoption('--bench-sizes', default='100',
+                    help='catalog sizes for the scrape/import/tiles scenarios (default: 100)')
+    group.addoption('--bench-save', default=None, metavar='FILE',
+                    help='save the scenario results, like suite.py --save')
+    group.addoption('--bench-baseline', default=None, metavar='FILE',
+                    help='fail a scenario that regressed against results saved with --bench-save '
+                         'or suite.py --save')
+    group.addoption('--bench-tolerance', type=float, default=0.2,
+                    help='slowdown allowed against the baseline (default: 0.2 = 20%%)')
+
+
+def pytest_generate_tests(metafunc):
+    if 'bench_size' in metafunc.fixturenames:
+        sizes = [int(x) for x in metafunc.config.getoption('bench_sizes').split(',')]
+        metafunc.parametrize('bench_size', sizes)
@@ -0,0 +1,71 @@
+"""
+benchmarks/suite.py's end-to-end scenarios as tests: the real scripts run
+against the stub server and must process the whole catalog.
+
+With pytest-benchmark installed each scenario is timed by its `benchmark`
+fixture; without it they still run as smoke tests. --bench-baseline fails a
+scenario that got slower than --bench-tolerance allows, issued more
+requests or processed fewer items than in the saved results, the same gate
+as `suite.py --baseline`.
+"""
+
+import json
+
+import pytest
+
+import suite
+
+
+@pytest.fixture(scope='session')
+def bench_args():
+    return suite.parse_args([])
+
+
+@pytest.fixture(scope='session')
+def bench_results(request):
+    """{escenario: resultado} de la sesión; --bench-save lo escribe al final"""
+    results = {}
+    yield results
+    path = request.config.getoption('bench_save')
+    if path and results:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+@pytest.fixture
+def run_scenario(request, bench_results):
+    def run(name, fn, *fn_args):
+        if request.config.pluginmanager.hasplugin('benchmark'):
+            benchmark = request.getfixturevalue('benchmark')
+            result = benchmark.pedantic(fn, args=fn_args, rounds=1, iterations=1)
+        else:
+            result = fn(*fn_args)
+        result = {k: v for k, v in result.items() if k != 'stream'}
+        bench_results[name] = result
+        path = request.config.getoption('bench_baseline')
+        if path:
+            with open(path, encoding='utf-8') as f:
+                baseline = json.load(f)
+            tolerance = request.config.getoption('bench_tolerance')
+            assert suite.compare({name: result}, baseline, tolerance) == []
+        return result
+    return run
+
+
+def test_scrape(run_scenario, bench_args, bench_size, tmp_path):
+    result = run_scenario(f'scrape/{bench_size}', suite.scrape, bench_args, str(tmp_path), bench_size)
+    # Índice + sitemap de productos + una página por producto
+    assert result['items'] == bench_size
+    assert result['requests'] == bench_size + 2
+
+
+def test_import(run_scenario, bench_size, tmp_path):
+    stream = suite.synthetic_stream(str(tmp_path), bench_size)
+    result = run_scenario(f'import/{bench_size}', suite.import_stream, str(tmp_path), bench_size, stream)
+    assert result['items'] == bench_size
+
+
+def test_tiles(run_scenario, bench_args, bench_size, tmp_path):
+    result = run_scenario(f'tiles/{bench_size}', suite.tiles, bench_args, str(tmp_path), bench_size)
+    # Uno de cada cien productos no tiene C1, y se encuentra en su página
+    assert result['items'] == (bench_size + 99) // 100
@@ -0,0 +1,64 @@
+"""
+The per-host circuit breaker must always get the outcome of its half-open
+trial request back, however that request fails.
+"""
+
+import pytest
+
+from cesantoni_tools.breaker import CLOSED, HostBreaker
+from cesantoni_tools.httpclient import HttpClient, RetryPolicy
+
+URL = 'https://www.cesantoni.com.mx/producto/alabama/'
+
+
+class FakeClock:
+    """Monotonic clock whose sleep() just moves time forward."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.slept += seconds
+        if self.slept > 1000:
+            raise AssertionError('before() never returned: the host is blocked for good')
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    breaker = HostBreaker(min_requests=1, cooldown=5.0, clock=clock, sleep=clock.sleep)
+    breaker.record(URL, False)
+    assert breaker.tripped(URL)
+    return breaker
+
+
+@pytest.mark.parametrize('error', [ValueError('invalid literal for int(): Content-Length'),
+                                   EOFError('truncated gzip'), RuntimeError('recorder failed')])
+def test_trial_failing_outside_oserror_reopens_the_circuit(breaker, clock, error):
+    client = HttpClient(breaker=breaker, retry=RetryPolicy(retries=3))
+
+    def send():
+        raise error
+
+    with pytest.raises(type(error)):
+        client._request_with_retries(URL, 'GET', client.retry, send)
+    # The trial counted as a failure: the circuit is open again, cooldown doubled
+    assert breaker.tripped(URL)
+    assert client.stats.errors == 1 and client.stats.retries == 0
+    assert breaker.before(URL) == pytest.approx(10.0)
+
+
+def test_successful_trial_closes_the_circuit(breaker, clock):
+    assert breaker.before(URL) == pytest.approx(5.0)
+    breaker.record(URL, True)
+    assert breaker.breaker('www.cesantoni.com.mx').state == CLOSED
+    assert breaker.before(URL) == 0.0
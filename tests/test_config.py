@@ -0,0 +1,66 @@
+"""
+CESANTONI_<COMMAND>_<OPTION> defaults: a value must mean what the same flag
+would on the command line.
+"""
+
+import argparse
+
+import pytest
+
+from cesantoni_tools.config import env_defaults
+
+
+def make_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--resume', action='store_true')
+    parser.add_argument('--rate', type=float, default=1.0)
+    parser.add_argument('--mode', choices=['merge', 'replace'], default=None)
+    parser.add_argument('--discover', nargs='?', const='https://example.com/sitemap_index.xml',
+                        default=None, metavar='URL')
+    parser.add_argument('--profile', nargs='?', const='scraper.prof', default=None)
+    return parser
+
+
+def parse(environ, argv=()):
+    parser = make_parser()
+    env_defaults(parser, 'SCRAPE', environ)
+    return parser.parse_args(list(argv))
+
+
+@pytest.mark.parametrize('raw', ['1', 'true', 'Yes', ' on '])
+def test_optional_value_on_means_const(raw):
+    args = parse({'CESANTONI_SCRAPE_DISCOVER': raw, 'CESANTONI_SCRAPE_PROFILE': raw})
+    assert args.discover == 'https://example.com/sitemap_index.xml'
+    assert args.profile == 'scraper.prof'
+
+
+@pytest.mark.parametrize('raw', ['0', 'false', 'no', 'off', ''])
+def test_optional_value_off_means_default(raw):
+    args = parse({'CESANTONI_SCRAPE_DISCOVER': raw, 'CESANTONI_SCRAPE_PROFILE': raw})
+    assert args.discover is None
+    assert args.profile is None
+
+
+def test_optional_value_keeps_other_values():
+    args = parse({'CESANTONI_SCRAPE_DISCOVER': 'http://127.0.0.1:8000/sitemap_index.xml',
+                  'CESANTONI_SCRAPE_PROFILE': '/tmp/run.prof'})
+    assert args.discover == 'http://127.0.0.1:8000/sitemap_index.xml'
+    assert args.profile == '/tmp/run.prof'
+
+
+def test_flags_typed_values_and_command_line_precedence():
+    environ = {'CESANTONI_SCRAPE_RESUME': 'yes', 'CESANTONI_SCRAPE_RATE': '2.5',
+               'CESANTONI_SCRAPE_MODE': 'merge'}
+    args = parse(environ)
+    assert (args.resume, args.rate, args.mode) == (True, 2.5, 'merge')
+    args = parse(environ, ['--rate', '4', '--mode', 'replace'])
+    assert (args.rate, args.mode) == (4.0, 'replace')
+
+
+@pytest.mark.parametrize('environ', [{'CESANTONI_SCRAPE_RESUME': 'maybe'},
+                                     {'CESANTONI_SCRAPE_RATE': 'fast'},
+                                     {'CESANTONI_SCRAPE_MODE': 'append'}])
+def test_bad_values_fail_like_bad_flags(environ):
+    with pytest.raises(SystemExit) as e:
+        parse(environ)
+    assert e.value.code == 2
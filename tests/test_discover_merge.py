@@ -0,0 +1,75 @@
+"""
+--discover scrapes only what changed in the sitemap; merge_catalog() must
+apply that delta to the catalog already in --output, never replace it.
+"""
+
+import contextlib
+import io
+import json
+
+from cesantoni_tools.scripts import load_script
+from cesantoni_tools.stubserver import StubServer
+
+scraper = load_script('scraper')
+
+BASE = 'https://www.cesantoni.com.mx/producto'
+
+
+def product(slug, name=None):
+    return {'slug': slug, 'url': f'{BASE}/{slug}/', 'name': name or slug.title()}
+
+
+def write(path, products):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(products, f, ensure_ascii=False, indent=2)
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_empty_delta_keeps_the_catalog(tmp_path):
+    path = str(tmp_path / 'productos.json')
+    catalog = [product('alabama'), product('berlin')]
+    write(path, catalog)
+    assert scraper.merge_catalog(path, [], []) == (2, 0, 0, 0)
+    assert read(path) == catalog
+
+
+def test_delta_updates_adds_and_removes(tmp_path):
+    path = str(tmp_path / 'productos.json')
+    write(path, [product('alabama'), product('berlin'), product('cairo')])
+    delta = [product('berlin', 'Berlin Gris'), product('dakar')]
+    counts = scraper.merge_catalog(path, delta, [f'{BASE}/cairo/'])
+    assert counts == (3, 1, 1, 1)
+    assert read(path) == [product('alabama'), product('berlin', 'Berlin Gris'), product('dakar')]
+
+
+def test_first_run_writes_the_delta(tmp_path):
+    path = str(tmp_path / 'productos.json')
+    assert scraper.merge_catalog(path, [product('alabama')], []) == (1, 1, 0, 0)
+    assert read(path) == [product('alabama')]
+
+
+def test_discover_nights_keep_the_whole_catalog(tmp_path):
+    catalog = {f'producto-{i}': '2025-01-01' for i in range(5)}
+    out = str(tmp_path / 'productos.json')
+
+    def night(server):
+        before = server.requests
+        with contextlib.redirect_stdout(io.StringIO()):
+            scraper.main(['--discover', server.url('/sitemap_index.xml'), '--rate', '1000',
+                          '--no-cache', '--output', out,
+                          '--sitemap-state', str(tmp_path / 'sitemap.sqlite'),
+                          '--checkpoint', str(tmp_path / 'checkpoint.jsonl')])
+        return server.requests - before, sorted(p['slug'] for p in read(out))
+
+    with StubServer(catalog=catalog) as server:
+        assert night(server) == (7, sorted(catalog))
+        # Nothing changed: only the index is read and the catalog stays whole
+        assert night(server) == (1, sorted(catalog))
+        catalog['producto-1'] = '2025-02-01'
+        del catalog['producto-2']
+        catalog['nuevo'] = '2025-02-01'
+        assert night(server) == (4, sorted(catalog))
@@ -0,0 +1,44 @@
+"""
+import-products.py's ensure_schema() on databases it did not create.
+"""
+
+import sqlite3
+
+from cesantoni_tools.scripts import load_script
+
+importer = load_script('importer')
+
+
+def products_table(*indexes):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, sku TEXT, slug TEXT)")
+    for sql in indexes:
+        conn.execute(sql)
+    return conn.cursor()
+
+
+def test_plain_sku_slug_indexes_get_a_unique_one(capsys):
+    # Los nombres que database.js da a sus índices no únicos
+    cursor = products_table("CREATE INDEX idx_products_sku ON products(sku)",
+                            "CREATE INDEX idx_products_slug ON products(slug)")
+    assert importer.ensure_schema(cursor)
+    assert importer.has_unique_index(cursor, 'sku') and importer.has_unique_index(cursor, 'slug')
+    # Una segunda corrida no crea nada
+    capsys.readouterr()
+    assert importer.ensure_schema(cursor)
+    assert 'creado' not in capsys.readouterr().out
+
+
+def test_existing_unique_index_is_kept():
+    cursor = products_table("CREATE UNIQUE INDEX idx_products_sku ON products(sku)")
+    assert importer.ensure_schema(cursor)
+    names = [row[1] for row in cursor.execute("PRAGMA index_list(products)")]
+    assert 'uq_products_sku' not in names and 'uq_products_slug' in names
+
+
+def test_duplicates_stop_the_upgrade():
+    cursor = products_table()
+    cursor.executemany("INSERT INTO products (name, sku, slug) VALUES (?, ?, ?)",
+                       [('A', 'CES-1', 'a'), ('B', 'CES-1', 'b')])
+    assert not importer.ensure_schema(cursor)
+    assert not importer.has_unique_index(cursor, 'sku')
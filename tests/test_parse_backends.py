@@ -0,0 +1,100 @@
+"""
+The scraper's extraction backends against the original BeautifulSoup one.
+
+html.parser (the default) must give exactly the product the original
+extraction gave, on saved product pages (tests/pages/*.html), on the
+benchmark's synthetic pages and on the markup edge cases below; lxml must
+too, except for the unclosed-cell case it repairs differently, which is why
+it is not the default.
+"""
+
+import glob
+import os
+
+import pytest
+
+from bench_parse import BASE, legacy_extract, synthetic_pages
+from cesantoni_tools.scripts import load_script
+from cesantoni_tools.stubserver import product_page
+
+scraper = load_script('scraper')
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+SAVED_PAGES = sorted(glob.glob(os.path.join(PAGES_DIR, '*.html')))
+
+BACKENDS = ['html.parser', pytest.param('lxml', marks=pytest.mark.skipif(
+    not scraper.have_lxml(), reason='lxml no está instalado'))]
+
+# Fragmentos que se insertan en una página del stub antes de </body>
+EDGE_CASES = {
+    'script-en-specs': '<div class="specs">Formato: 60x60<script>var x = "a: b";</script></div>',
+    'style-en-specs': '<div class="product-details"><style>.a{color: red}</style>Uso: Muro</div>',
+    'template-con-specs': '<template><div class="specs">Tráfico: Alto</div>'
+                          '<table><tr><td>Piezas</td><td>9</td></tr></table></template>',
+    'comentario-en-specs': '<ul class="caracteristicas"><li>Acabado: Mate</li><!-- Oculto: sí --></ul>',
+    'ruby-en-specs': '<dl class="spec"><dt>Nombre: <ruby>漢<rt>kan: ji</rt></ruby></dt></dl>',
+    'script-en-celda': '<table><tr><td>SKU<script>document.write("x")</script></td>'
+                       '<td>CES-1</td></tr></table>',
+    'h1-con-script': '<h1>Alabama<script>track("h1")</script> Gris</h1>',
+    'specs-anidados': '<div class="specs"><div class="spec-row">Peso: 20 kg</div>Color: Gris</div>',
+}
+
+# html.parser no cierra el <td> implícito: la primera celda es "Piezas6"
+UNCLOSED_CELLS = '<table><tr><td>Piezas<td>6</table>'
+
+
+def page_with(fragment, slug='alabama'):
+    html = product_page(slug, BASE)
+    return f'{BASE}/producto/{slug}/', html.replace('</body>', fragment + '</body>', 1)
+
+
+def saved_page(path):
+    slug = os.path.splitext(os.path.basename(path))[0]
+    with open(path, encoding='utf-8', errors='replace') as f:
+        return f'{BASE}/producto/{slug}/', f.read()
+
+
+def assert_same_as_original(url, html, backend):
+    assert scraper.extract_product(html, url, parser=backend) == legacy_extract(html, url)
+
+
+def test_default_backend_is_html_parser():
+    assert scraper.parse_args([]).parser == 'html.parser'
+
+
+@pytest.mark.skipif(not SAVED_PAGES, reason='no hay páginas guardadas en tests/pages (ver README.md)')
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('path', SAVED_PAGES, ids=os.path.basename)
+def test_saved_pages(path, backend):
+    assert_same_as_original(*saved_page(path), backend)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_synthetic_pages(backend):
+    slugs = [scraper.extract_slug(url) for url in scraper.PRODUCT_URLS][:30]
+    for url, html in synthetic_pages(slugs):
+        assert_same_as_original(url, html, backend)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('case', EDGE_CASES)
+def test_edge_cases(case, backend):
+    assert_same_as_original(*page_with(EDGE_CASES[case]), backend)
+
+
+def test_hidden_text_is_not_a_spec():
+    url, html = page_with(EDGE_CASES['script-en-specs'] + EDGE_CASES['template-con-specs'])
+    for backend in ('html.parser', 'lxml') if scraper.have_lxml() else ('html.parser',):
+        specs = scraper.extract_product(html, url, parser=backend)['specs']
+        assert 'var x = "a' not in specs
+        assert 'tráfico' not in specs
+
+
+def test_unclosed_cells_html_parser():
+    assert_same_as_original(*page_with(UNCLOSED_CELLS), 'html.parser')
+
+
+@pytest.mark.skipif(not scraper.have_lxml(), reason='lxml no está instalado')
+@pytest.mark.xfail(strict=True, reason='lxml cierra el <td> implícito: clave "piezas" en vez de "piezas6"')
+def test_unclosed_cells_lxml():
+    assert_same_as_original(*page_with(UNCLOSED_CELLS), 'lxml')
@@ -0,0 +1,69 @@
+"""
+Streamed exchanges (the Render API, Range probes, image downloads) must end
+up in a --record cassette like the plain ones, and replay from it.
+"""
+
+import json
+
+from cesantoni_tools.fixtures import Cassette, Recorder
+from cesantoni_tools.httpclient import HttpClient
+from cesantoni_tools.jsonstream import iter_json_array
+from cesantoni_tools.stubserver import StubServer
+
+PRODUCTS = [{'id': 1, 'slug': 'alabama'}, {'id': 2, 'slug': 'berlin'}]
+
+
+def record(tmp_path, requests):
+    """Run requests(client, server) against the stub while recording; returns the records."""
+    path = str(tmp_path / 'cassette.jsonl')
+    with StubServer(products=PRODUCTS) as server, Recorder(path) as recorder, \
+            HttpClient(recorder=recorder) as client:
+        requests(client, server)
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_streamed_api_is_recorded(tmp_path):
+    def requests(client, server):
+        with client.stream(server.url('/api/products')) as resp:
+            assert list(iter_json_array(resp.iter_content())) == PRODUCTS
+
+    [record_] = record(tmp_path, requests)
+    assert record_['status'] == 200
+    assert 'truncated' not in record_
+    assert json.loads(record_['body']) == PRODUCTS
+
+
+def test_range_stream_is_recorded_as_partial(tmp_path):
+    def requests(client, server):
+        url = server.url('/producto/alabama/')
+        with client.stream(url, headers={'Range': 'bytes=0-99'}) as resp:
+            assert len(b''.join(resp.iter_content())) == 100
+        with client.stream(url) as resp:
+            next(resp.iter_content(chunk_size=10))
+
+    ranged, cut_short = record(tmp_path, requests)
+    assert ranged['status'] == 206
+    assert ranged['headers']['Content-Range'].startswith('bytes 0-99/')
+    assert len(ranged['body']) == 100
+    assert cut_short['status'] == 200 and cut_short['truncated'] is True
+
+
+def test_partial_never_replaces_complete(tmp_path):
+    def requests(client, server):
+        url = server.url('/producto/alabama/')
+        with client.stream(url) as resp:
+            b''.join(resp.iter_content())
+        with client.stream(url, headers={'Range': 'bytes=0-99'}) as resp:
+            b''.join(resp.iter_content())
+
+    complete, ranged = record(tmp_path, requests)
+    assert ranged['status'] == 206
+    cassette = Cassette([complete, ranged])
+    # Replayed through the stub as a proxy, so the recorded URL is kept
+    with StubServer(cassette=cassette) as server, HttpClient(proxy=server.base_url) as client:
+        assert client.get(complete['url']).text == complete['body']
+        with client.stream(complete['url'], headers={'Range': 'bytes=0-99'}) as resp:
+            assert resp.status_code == 206
+            assert b''.join(resp.iter_content()) == complete['body'].encode('utf-8')[:100]
+        assert server.misses == 0
@@ -0,0 +1,134 @@
+"""
+Sitemap discovery against the stub's sitemap index, night after night:
+only new or modified product pages are queued, an unchanged product
+sitemap is not even fetched, and nothing is forgotten when a run fails.
+"""
+
+import gzip
+
+import pytest
+
+from cesantoni_tools.httpclient import HttpClient
+from cesantoni_tools.sitemap import SitemapState, commit, discover, iter_sitemap
+from cesantoni_tools.stubserver import StubServer, sitemap_xml
+
+OLD = '2025-01-01T00:00:00+00:00'
+NEW = '2025-02-01T00:00:00+00:00'
+
+
+class Site:
+    """The stub's sitemaps, fetched through HttpClient; remembers what was fetched."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.fetched = []
+
+    def __enter__(self):
+        self.server = StubServer(catalog=self.catalog).start()
+        self.client = HttpClient()
+        return self
+
+    def __exit__(self, *exc):
+        self.client.close()
+        self.server.stop()
+
+    @property
+    def index(self):
+        return self.server.url('/sitemap_index.xml')
+
+    def page(self, slug):
+        return self.server.url(f'/producto/{slug}/')
+
+    def fetch(self, url):
+        self.fetched.append(url.rsplit('/', 1)[-1])
+        resp = self.client.get(url)
+        return resp.content if resp.ok else None
+
+    def night(self, state, failed=()):
+        """discover() + commit() as the scraper does; `failed` slugs are not committed."""
+        self.fetched = []
+        found = discover(self.fetch, self.index, state)
+        failed = {self.page(slug) for slug in failed}
+        commit(state, found, [e.loc for e in found.queued if e.loc not in failed])
+        return found
+
+
+def slugs(entries):
+    return sorted(e.loc.rstrip('/').rsplit('/', 1)[-1] for e in entries)
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = SitemapState(str(tmp_path / 'sitemap.sqlite'))
+    yield state
+    state.close()
+
+
+def test_three_nights(state):
+    catalog = {f'producto-{i}': OLD for i in range(6)}
+    with Site(catalog) as site:
+        first = site.night(state)
+        assert slugs(first.queued) == sorted(catalog)
+        assert (first.new, first.modified, first.unchanged) == (6, 0, 0)
+        assert site.fetched == ['sitemap_index.xml', 'product-sitemap.xml']
+
+        second = site.night(state)
+        assert second.queued == [] and second.removed == []
+        assert second.unchanged == 6
+        # The index says the product sitemap has not moved: it is not read
+        assert site.fetched == ['sitemap_index.xml']
+        assert [s.loc for s in second.skipped] == [site.server.url('/product-sitemap.xml')]
+
+        catalog['producto-1'] = NEW
+        del catalog['producto-2']
+        catalog['nuevo'] = NEW
+        third = site.night(state)
+        assert slugs(third.queued) == ['nuevo', 'producto-1']
+        assert (third.new, third.modified, third.unchanged) == (1, 1, 4)
+        assert third.removed == [site.page('producto-2')]
+        assert site.fetched == ['sitemap_index.xml', 'product-sitemap.xml']
+
+        # The removed page is forgotten and the rest recorded: quiet again
+        assert site.night(state).queued == []
+        assert site.page('producto-2') not in state.load()
+
+
+def test_failed_pages_are_queued_again(state):
+    catalog = {f'producto-{i}': OLD for i in range(3)}
+    with Site(catalog) as site:
+        first = site.night(state, failed=['producto-1'])
+        assert len(first.queued) == 3
+        # The product sitemap was not fully done, so it is read again
+        second = site.night(state)
+        assert slugs(second.queued) == ['producto-1']
+        assert site.fetched == ['sitemap_index.xml', 'product-sitemap.xml']
+        assert site.night(state).queued == []
+        assert site.fetched == ['sitemap_index.xml']
+
+
+def test_unreachable_index_commits_nothing(state):
+    with Site({'producto-0': OLD}) as site:
+        found = discover(lambda url: None, site.index, state)
+        assert found.failed == [site.index] and found.queued == []
+        commit(state, found, [])
+        assert state.load() == {}
+        assert len(site.night(state).queued) == 1
+
+
+def test_gzipped_child_and_plain_urlset(state):
+    base = 'https://www.cesantoni.com.mx'
+    urlset = sitemap_xml('url', [(f'{base}/producto/alabama/', OLD), (f'{base}/contacto/', None),
+                                 (f'{base}/producto/berlin/', None)]).encode('utf-8')
+    documents = {
+        f'{base}/sitemap_index.xml': sitemap_xml('sitemap', [
+            (f'{base}/page-sitemap.xml', OLD), (f'{base}/product-sitemap.xml.gz', OLD)]).encode('utf-8'),
+        f'{base}/product-sitemap.xml.gz': gzip.compress(urlset),
+    }
+    found = discover(documents.get, f'{base}/sitemap_index.xml', state)
+    # Only product sitemaps are followed, and only product URLs are queued
+    assert slugs(found.sitemaps) == ['product-sitemap.xml.gz']
+    assert slugs(found.queued) == ['alabama', 'berlin']
+    commit(state, found, [e.loc for e in found.queued])
+    # A URL without lastmod cannot be compared and is always queued
+    assert slugs(discover(lambda url: urlset, f'{base}/product-sitemap.xml', state).queued) == ['berlin']
+    assert [e.kind for e in iter_sitemap(gzip.compress(urlset))] == ['url'] * 3
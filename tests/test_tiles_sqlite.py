@@ -0,0 +1,65 @@
+"""
+scrape-tile-images.py --source sqlite:PATH: read-only unless --apply.
+"""
+
+import hashlib
+import json
+import sqlite3
+
+import pytest
+
+from cesantoni_tools.scripts import load_script
+
+tiles = load_script('tiles')
+
+ROWS = [(1, 'Alabama', 'alabama', '60x60', json.dumps(['https://x/alabama_C1.jpg'])),
+        (2, 'Berlin', 'berlin', '30x60', '[]'),
+        (3, 'Cairo', 'cairo', '60x60', None)]
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / 'cesantoni.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, slug TEXT, format TEXT, "
+                 "gallery TEXT, updated_at TEXT)")
+    conn.executemany("INSERT INTO products (id, name, slug, format, gallery) VALUES (?, ?, ?, ?, ?)", ROWS)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def indexes(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [row[1] for row in conn.execute("PRAGMA index_list(products)")]
+    finally:
+        conn.close()
+
+
+def test_without_apply_the_database_is_only_read(db):
+    before = digest(db)
+    feed = tiles.SqliteFeed(db).start()
+    assert [p['slug'] for p in feed] == ['berlin', 'cairo']
+    assert (feed.total, feed.has_c1, feed.missing) == (3, 1, 2)
+    with pytest.raises(sqlite3.OperationalError):
+        feed._db.execute("CREATE TABLE nope (x)")
+    feed.close()
+    assert digest(db) == before
+    assert indexes(db) == []
+
+
+def test_with_apply_the_index_is_created_and_results_written(db):
+    feed = tiles.SqliteFeed(db, writable=True).start()
+    assert [p['slug'] for p in feed] == ['berlin', 'cairo']
+    feed.close()
+    assert indexes(db) == ['idx_products_missing_c1']
+    assert tiles.apply_results(db, {'2': 'https://x/berlin_C1.jpg'}) == 1
+    feed = tiles.SqliteFeed(db).start()
+    assert [p['slug'] for p in feed] == ['cairo']
+    feed.close()